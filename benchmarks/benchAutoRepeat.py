@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Compares holding j down (autorepeat key events, gathered and applied once per
+frame) with pressing it as many times.
+
+The editor is shown offscreen so the cursor moves are repainted and scrolled like they
+are in the IDE.
+
+Requires PyQt4.
+
+Usage: python benchmarks/benchAutoRepeat.py [keys] [lines]
+
+'''
+
+import sys
+import time
+import timeit
+
+from benchUtils import createVimja
+
+from PyQt4.QtCore import QEvent
+from PyQt4.QtCore import Qt
+from PyQt4.QtGui import QKeyEvent
+
+
+def holdKey(app, editor, keys, autoRepeat):
+    ''' Sends the key events, letting the event loop run in between '''
+
+    for _ in range(keys):
+        editor.keyPressEvent(QKeyEvent(QEvent.KeyPress, Qt.Key_J, Qt.NoModifier, 'j',
+            autoRepeat))
+        app.processEvents()
+
+
+def main():
+    keys = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+
+    print('{0:>12} {1:>12} {2:>12}'.format('', 'time (ms)', 'line'))
+
+    for name, autoRepeat in (('pressed', False), ('held', True)):
+        app, vimja, editor = createVimja(lines)
+        editor.show()
+
+        elapsed = timeit.timeit(lambda: holdKey(app, editor, keys, autoRepeat),
+            number=1)
+
+        #the last frame's repeats
+        time.sleep(0.05)
+        app.processEvents()
+
+        print('{0:>12} {1:>12.2f} {2:>12}'.format(name, elapsed * 1e3,
+            editor.textCursor().blockNumber()))
+
+        editor.hide()
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Times % across a document of nested brackets: the first, one pass index, a
+warm jump and the jump following an edit that shifts the depth of every later line.
+
+Requires PyQt4.
+
+Usage: python benchmarks/benchBracketMatch.py [lines]
+
+'''
+
+import sys
+import timeit
+
+from benchUtils import createVimja
+
+from PyQt4.QtGui import QTextCursor
+
+LINE = '    if (cursor.position() > [count][0]) { return {"a": (1, 2)} }'
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    app, vimja, editor = createVimja(0)
+    editor.setPlainText('\n'.join(['def f() {'] + [LINE] * lines + ['}']))
+
+    index = vimja.state.bracketIndex
+    index.attach(editor.document())
+    opening = len('def f() ')
+
+    def match():
+        index.match(opening)
+
+    def edit():
+        cursor = QTextCursor(editor.document())
+        cursor.setPosition(opening + 1)
+        cursor.insertText('{')
+        index.match(opening)
+
+    cold = timeit.timeit(match, number=1)
+
+    runs = 20
+    print('{0:>12} {1:>12}'.format('', 'time (us)'))
+    print('{0:>12} {1:>12.1f}'.format('cold', cold * 1e6))
+    print('{0:>12} {1:>12.1f}'.format('warm', timeit.timeit(match,
+        number=runs) / runs * 1e6))
+    print('{0:>12} {1:>12.1f}'.format('after edit', timeit.timeit(edit,
+        number=runs) / runs * 1e6))
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
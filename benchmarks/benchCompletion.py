@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Times the keyword completion index on a generated corpus: the first lookup (which
+indexes the whole document), lookups of prefixes of 1 to 4 characters, and lookups
+right after an edit (which index the edited block again).
+
+Requires PyQt4.
+
+Usage: python benchmarks/benchCompletion.py [words] [vocabulary]
+
+'''
+
+import random
+import sys
+import timeit
+
+from benchUtils import createVimja
+
+from PyQt4.QtGui import QTextCursor
+
+WORDS_PER_LINE = 10
+
+
+def main():
+    words = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    vocabulary = int(sys.argv[2]) if len(sys.argv) > 2 else 50000
+
+    random.seed(0)
+    keywords = ['{0}{1}'.format(random.choice('abcdefghijklmnopqrstuvwxyz'), i)
+        for i in range(vocabulary)]
+
+    lines = [' '.join(random.choice(keywords) for _ in range(WORDS_PER_LINE))
+        for _ in range(words // WORDS_PER_LINE)]
+
+    app, vimja, editor = createVimja(0)
+    editor.setPlainText('\n'.join(lines))
+
+    index = vimja.state.completionIndex
+    index.attach(editor.document())
+
+    cold = timeit.timeit(lambda: index.complete('a'), number=1)
+
+    prefixes = [random.choice(keywords)[:random.randint(1, 4)] for _ in range(1000)]
+    iterator = iter(prefixes)
+    warm = timeit.timeit(lambda: index.complete(next(iterator)), number=len(prefixes))
+
+    cursor = QTextCursor(editor.document())
+
+    def edited():
+        cursor.setPosition(random.randint(0, editor.document().characterCount() - 1))
+        cursor.insertText(' {0}x '.format(random.choice(keywords)))
+        index.complete(random.choice(prefixes))
+
+    edits = 1000
+    edit = timeit.timeit(edited, number=edits)
+
+    print('{0} words, {1} distinct'.format(words, len(index.words)))
+    print('{0:>14} {1:>12}'.format('', 'time (us)'))
+    print('{0:>14} {1:>12.1f}'.format('first lookup', cold * 1e6))
+    print('{0:>14} {1:>12.1f}'.format('lookup', warm / len(prefixes) * 1e6))
+    print('{0:>14} {1:>12.1f}'.format('edit + lookup', edit / edits * 1e6))
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Compares 1000dd, executed as a single batched deletion, with 1000 individual dd.
+
+Requires PyQt4.
+
+Usage: python benchmarks/benchCountedDelete.py [lines]
+
+'''
+
+import sys
+import timeit
+
+from benchUtils import createVimja
+from benchUtils import pressKeys
+
+from PyQt4.QtCore import Qt
+
+DD = [Qt.Key_D, Qt.Key_D]
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    countKeys = [Qt.Key_0 + int(digit) for digit in str(lines)]
+
+    app, vimja, editor = createVimja(lines + 1)
+    batched = timeit.timeit(lambda: pressKeys(vimja, countKeys + DD), number=1)
+    assert editor.document().blockCount() == 1
+
+    app, vimja, editor = createVimja(lines + 1)
+    individual = timeit.timeit(lambda: pressKeys(vimja, DD * lines), number=1)
+    assert editor.document().blockCount() == 1
+
+    print('{0:>12} {1:>12}'.format('', 'time (ms)'))
+    print('{0:>12} {1:>12.2f}'.format('{0}dd'.format(lines), batched * 1e3))
+    print('{0:>12} {1:>12.2f}'.format('{0} x dd'.format(lines), individual * 1e3))
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
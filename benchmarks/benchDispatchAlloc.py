@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Measures the memory allocated per key press while dispatching motions.
+
+Compares the compiled command objects with the old per key event dictionaries and
+getattr(QTextCursor, ...) lookups using tracemalloc. Runs headless against an
+offscreen QPlainTextEdit, Ninja-IDE is replaced by a minimal stand-in when missing.
+
+Requires Python 3 (tracemalloc) and PyQt4.
+
+Usage: python benchmarks/benchDispatchAlloc.py [keys]
+
+'''
+
+import sys
+import tracemalloc
+
+from benchUtils import createVimja
+
+from PyQt4.QtCore import Qt
+from PyQt4.QtGui import QTextCursor
+
+
+def perKeyPeak(dispatch, keys):
+    ''' @ret tuple (mean, max) transient bytes allocated while dispatching a key '''
+
+    peaks = []
+    for i in range(keys):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        dispatch(Qt.Key_J if i % 2 else Qt.Key_K)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+
+    return sum(peaks) / float(keys), max(peaks)
+
+
+def main():
+    keys = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    app, vimja, editor = createVimja()
+
+    #what every key press used to go through: the buffer string (formatted for the
+    #log as well), the event dictionary and the getattr on QTextCursor
+    legacyMap = {Qt.Key_J: {'MoveOperation': 'Down', 'N': 1.0},
+        Qt.Key_K: {'MoveOperation': 'Up', 'N': 1.0}}
+    legacy = {'buffer': ''}
+
+    def legacyAppend(newVal, string, resetVal, delimiter):
+        if newVal == resetVal or string == '':
+            string = newVal
+        else:
+            string = '{0}{1}{2}'.format(string, delimiter, newVal)
+
+        'string: {0}'.format(string)
+        return string
+
+    def legacyMove(event):
+        operation = getattr(QTextCursor, event['details']['MoveOperation'], False)
+        cursor = editor.textCursor()
+        cursor.movePosition(operation, QTextCursor.MoveAnchor,
+            int(event['details']['N']))
+        editor.setTextCursor(cursor)
+
+    def legacyDispatch(key):
+        legacy['buffer'] = legacyAppend(key, legacy['buffer'], Qt.Key_Escape, ',')
+        event = {'details': legacyMap.get(legacy['buffer'], False), 'key': key}
+
+        if event['details']:
+            legacyMove(event)
+            legacy['buffer'] = ''
+
+    tracemalloc.start()
+    results = [('legacy', perKeyPeak(legacyDispatch, keys)),
+        ('compiled', perKeyPeak(vimja.normalKeyEventMapper, keys))]
+    tracemalloc.stop()
+
+    print('{0:>10} {1:>16} {2:>16}'.format('dispatch', 'mean bytes/key', 'max bytes/key'))
+    for name, (mean, peak) in results:
+        print('{0:>10} {1:>16.1f} {2:>16}'.format(name, mean, peak))
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
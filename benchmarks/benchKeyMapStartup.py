@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Startup benchmark for loading keyMap.json.
+
+Compares a cold start (no cache, the json is parsed and validated), a start after
+keyMap.json was touched (the file is hashed and the cache reused) and a warm start
+(the mtime matches and the file isn't even read).
+
+Usage: python benchmarks/benchKeyMapStartup.py [runs]
+
+'''
+
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'vimja')
+sys.path.insert(0, PATH)
+
+from keyMapLoader import loadKeyMap
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    workDir = tempfile.mkdtemp()
+    keyMapPath = os.path.join(workDir, 'keyMap.json')
+    cachePath = os.path.join(workDir, 'keyMap.cache')
+    shutil.copy(os.path.join(PATH, 'keyMap.json'), keyMapPath)
+
+    def cold():
+        if os.path.exists(cachePath):
+            os.remove(cachePath)
+
+        loadKeyMap(keyMapPath, cachePath)
+
+    def touched():
+        os.utime(keyMapPath, None)
+        loadKeyMap(keyMapPath, cachePath)
+
+    def warm():
+        loadKeyMap(keyMapPath, cachePath)
+
+    try:
+        print('{0:>10} {1:>12}'.format('start', 'time (us)'))
+        for name, start in (('cold', cold), ('touched', touched), ('warm', warm)):
+            start()
+            print('{0:>10} {1:>12.1f}'.format(name,
+                timeit.timeit(start, number=runs) / runs * 1e6))
+
+    finally:
+        shutil.rmtree(workDir)
+
+
+if __name__ == '__main__':
+    main()
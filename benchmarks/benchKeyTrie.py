@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Micro-benchmark for the key sequence dispatcher.
+
+Compares the per-key cost of the trie against the old comma joined keyPressBuffer
+lookup after a growing number of unmatched keys. The trie stays flat, the string
+buffer grows with every key that was not cleared by Escape.
+
+Usage: python benchmarks/benchKeyTrie.py [keysPerRun]
+
+'''
+
+import json
+import os
+import sys
+import timeit
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'vimja')
+sys.path.insert(0, PATH)
+
+from keyTrie import KeySequenceTrie
+from keyTrie import parseKeySequence
+
+#keys that don't start any binding (F1 - F4)
+UNMATCHED = [16777264, 16777265, 16777266, 16777267]
+PREFIXES = [0, 100, 1000, 10000]
+
+
+def loadBindings():
+    ''' @ret list bindings (sequence, key name) pairs from keyMap.json '''
+
+    with open(os.path.join(PATH, 'keyMap.json')) as keyMapFile:
+        keyMap = json.load(keyMapFile)
+
+    keyMap.pop('BUFFER_COMMANDS')
+    return [(parseKeySequence(keys), details['Key']) for keys, details in keyMap.items()]
+
+
+def legacyLookup(keyMap, buffer, key):
+    ''' The lookup Vimja used to do on each key press '''
+
+    buffer = key if buffer == '' else '{0}{1}{2}'.format(buffer, ',', key)
+    return buffer, keyMap.get(buffer, False)
+
+
+def benchLegacy(bindings, prefix, keys):
+    keyMap = dict((','.join(str(key) for key in sequence), name)
+        for sequence, name in bindings)
+
+    buffer = ''
+    for i in range(prefix):
+        buffer, _ = legacyLookup(keyMap, buffer, UNMATCHED[i % 4])
+
+    state = {'buffer': buffer}
+
+    def run():
+        state['buffer'], _ = legacyLookup(keyMap, state['buffer'], UNMATCHED[0])
+
+    return timeit.timeit(run, number=keys) / keys
+
+
+def benchTrie(bindings, prefix, keys):
+    trie = KeySequenceTrie(bindings)
+
+    for i in range(prefix):
+        trie.advance(UNMATCHED[i % 4])
+
+    return timeit.timeit(lambda: trie.advance(UNMATCHED[0]), number=keys) / keys
+
+
+def main():
+    keys = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    bindings = loadBindings()
+
+    print('{0:>16} {1:>14} {2:>14}'.format('unmatched keys', 'legacy (us)', 'trie (us)'))
+    for prefix in PREFIXES:
+        print('{0:>16} {1:>14.3f} {2:>14.3f}'.format(prefix,
+            benchLegacy(bindings, prefix, keys) * 1e6,
+            benchTrie(bindings, prefix, keys) * 1e6))
+
+
+if __name__ == '__main__':
+    main()
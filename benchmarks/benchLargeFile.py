@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Compares large file mode with the default one on a big document: typing a search
+whose only match is at the end of the file, and a counted j/k down and back up.
+
+Requires PyQt4.
+
+Usage: python benchmarks/benchLargeFile.py [lines]
+
+'''
+
+import sys
+import timeit
+
+from benchUtils import createVimja
+from benchUtils import headless
+
+QUERY = 'needle'
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 500000
+
+    app, vimja, editor = createVimja(0)
+    editor.resize(800, 600)
+    editor.setPlainText('\n'.join('line {0}'.format(i) for i in range(lines)) +
+        '\n' + QUERY)
+
+    def search():
+        editor.set_cursor_position(0)
+        headless.replayKeys(editor, '/{0}<Esc>'.format(QUERY))
+
+    def motion():
+        headless.replayKeys(editor, '{0}j{0}k'.format(lines - 1))
+
+    print('{0:>12} {1:>12} {2:>12}'.format('', 'default (ms)', 'large (ms)'))
+
+    for name, bench in (('search', search), ('j/k', motion)):
+        times = []
+
+        for largeFile in (False, True):
+            vimja.state.largeFile = largeFile
+            times.append(timeit.timeit(bench, number=1) * 1e3)
+
+        print('{0:>12} {1:>12.1f} {2:>12.1f}'.format(name, *times))
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Compares replaying a 50 key macro on every line (N@a), executed on a single cursor
+as one edit, with typing the same keys on every line.
+
+Requires PyQt4.
+
+Usage: python benchmarks/benchMacroReplay.py [lines]
+
+'''
+
+import sys
+import timeit
+
+from benchUtils import createVimja
+from benchUtils import pressKeys
+
+from PyQt4.QtCore import Qt
+
+#0, 20 x w, 20 x b, 8 x x, j
+MACRO = [Qt.Key_0] + [Qt.Key_W] * 20 + [Qt.Key_B] * 20 + [Qt.Key_X] * 8 + [Qt.Key_J]
+
+LINE = ' '.join(['word'] * 30)
+
+
+def createEditor(lines):
+    app, vimja, editor = createVimja(0)
+    editor.setPlainText('\n'.join([LINE] * (lines + 1)))
+
+    return app, vimja, editor
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+
+    countKeys = [Qt.Key_0 + int(digit) for digit in str(lines)]
+
+    app, vimja, editor = createEditor(lines)
+    vimja.normalKeyEventMapper(Qt.Key_Q, 'q')
+    vimja.normalKeyEventMapper(Qt.Key_A, 'a')
+    pressKeys(vimja, MACRO)
+    vimja.normalKeyEventMapper(Qt.Key_Q, 'q')
+
+    def replay():
+        pressKeys(vimja, countKeys)
+        vimja.normalKeyEventMapper(Qt.Key_At, '@')
+        vimja.normalKeyEventMapper(Qt.Key_A, 'a')
+
+    replayed = timeit.timeit(replay, number=1)
+    expected = editor.toPlainText()
+
+    app, vimja, editor = createEditor(lines)
+    typed = timeit.timeit(lambda: pressKeys(vimja, MACRO * (lines + 1)), number=1)
+    assert editor.toPlainText() == expected
+
+    print('{0:>12} {1:>12}'.format('', 'time (ms)'))
+    print('{0:>12} {1:>12.2f}'.format('{0}@a'.format(lines), replayed * 1e3))
+    print('{0:>12} {1:>12.2f}'.format('typed', typed * 1e3))
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Measures 100p of a 1 MB linewise register: Vimja's paste, inserting the copies in
+chunks within one edit block, against the paste it replaced, which inserted the
+register once per p pressed, each time on a new line below the cursor's within an
+edit block of its own, with the document laid out after every key press.
+
+The wall time covers the paste and the layout of the document, peak is the most
+memory Python allocated during the paste and rss how far the paste took the
+resident size of the process past its size before the paste (Qt's own allocations,
+the document included). Every method runs in a process of its own, so that its rss
+isn't hidden by the peak of the one before.
+
+Requires Python 3 (tracemalloc), Linux (/proc) and PyQt4.
+
+Usage: python benchmarks/benchPaste.py [count] [megabytes] [chunked|presses]
+
+'''
+
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchUtils import createVimja
+from benchUtils import headless
+
+from PyQt4.QtGui import QTextCursor
+
+LINE = 'x' * 99
+
+METHODS = ('chunked', 'presses')
+
+
+def currentRss():
+    ''' @ret float size the resident size of the process in MB '''
+
+    with open('/proc/self/statm') as statm:
+        pages = int(statm.read().split()[1])
+
+    return pages * os.sysconf('SC_PAGE_SIZE') / 1024.0 / 1024.0
+
+
+def peakRss():
+    ''' @ret float size the peak resident size of the process in MB '''
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def measure(app, editor, paste):
+    ''' @ret tuple (seconds, peak, rss) the wall time and memory of the paste '''
+
+    rss = currentRss()
+    tracemalloc.start()
+
+    start = time.perf_counter()
+    paste()
+
+    #let the editor lay out the pasted text
+    editor.document().documentLayout().documentSize()
+    app.processEvents()
+    seconds = time.perf_counter() - start
+
+    peak = tracemalloc.get_traced_memory()[1] / 1024.0 / 1024.0
+    tracemalloc.stop()
+
+    return seconds, peak, peakRss() - rss
+
+
+def run(count, megabytes, method):
+    ''' Pastes the register count times with the method and prints its row '''
+
+    text = '\n'.join([LINE] * int(megabytes * 1024 * 1024 / (len(LINE) + 1)))
+    app, vimja, editor = createVimja(0)
+
+    def chunked():
+        headless.replayKeys(editor, 'gg{0}p'.format(count))
+
+    def presses():
+        for _ in range(count):
+            cursor = editor.textCursor()
+            cursor.beginEditBlock()
+
+            cursor.movePosition(QTextCursor.EndOfLine, QTextCursor.MoveAnchor)
+            cursor.insertBlock()
+            cursor.movePosition(QTextCursor.StartOfLine, QTextCursor.MoveAnchor)
+            cursor.insertText(text)
+
+            cursor.endEditBlock()
+
+            #the editor is laid out and painted between two key presses
+            editor.document().documentLayout().documentSize()
+            app.processEvents()
+
+    editor.setPlainText(text)
+    vimja.registers.yank(text, True)
+
+    seconds, peak, rss = measure(app, editor,
+        chunked if method == 'chunked' else presses)
+    assert editor.document().characterCount() >= len(text) * (count + 1)
+
+    print('{0:>10} {1:>10.1f} {2:>10.1f} {3:>10.1f}'.format(method, seconds * 1e3,
+        peak, rss))
+
+    app.quit()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    megabytes = float(sys.argv[2]) if len(sys.argv) > 2 else 1
+    methods = sys.argv[3:] or list(METHODS)
+
+    print('{0:>10} {1:>10} {2:>10} {3:>10}'.format('', 'time (ms)', 'peak (MB)',
+        'rss (MB)'))
+    sys.stdout.flush()
+
+    if len(methods) == 1:
+        run(count, megabytes, methods[0])
+        return
+
+    for method in methods:
+        output = subprocess.check_output([sys.executable, os.path.abspath(__file__),
+            str(count), str(megabytes), method])
+        sys.stdout.write(output.decode().splitlines()[-1] + '\n')
+
+
+if __name__ == '__main__':
+    main()
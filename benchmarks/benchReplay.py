@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Replays key traces against documents of growing size and reports the per key
+latency (p50/p99) and the peak memory allocated by Python while replaying.
+
+Every key goes through Vimja's key press interceptor exactly like it does in the IDE,
+the editor is the offscreen one of vimja/headless.py. The rss column is the peak
+resident size of the process so far, Qt's own allocations (the document) included.
+
+The default sizes run in about fifteen seconds, --large adds the documents of 100k
+lines (a minute and a half) and 1M lines (well over five minutes).
+
+Requires Python 3 (tracemalloc) and PyQt4.
+
+Usage: python benchmarks/benchReplay.py [--large] [lines ...]
+
+'''
+
+import resource
+import sys
+import time
+import tracemalloc
+
+from benchUtils import headless
+
+SIZES = [1000, 10000]
+LARGE_SIZES = [100000, 1000000]
+
+#key traces in vim's notation
+TRACES = [
+    ('motions', 'jjjjwwwwbbbbkkkk$0}{' * 40 + '500j500kGgg' * 10),
+    ('deletes', 'ddxxdw3dd' * 100 + 'jdjd}' * 20),
+    ('pastes', 'yyp5pywPjj' * 100),
+    ('search', ('/line 5<CR>' + 'n' * 20 + 'N' * 20) * 10),
+]
+
+
+def percentile(values, fraction):
+    ''' @ret float value the value below which the fraction of the values fall '''
+
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def replay(app, editor, events):
+    ''' @ret list latencies the seconds each key press took '''
+
+    latencies = []
+    for event in events:
+        start = time.perf_counter()
+        editor.keyPressEvent(event)
+        latencies.append(time.perf_counter() - start)
+
+        #let the queued signals (ex: finished search scans) through like the IDE's
+        #event loop would between two key presses
+        app.processEvents()
+
+    return latencies
+
+
+def main():
+    arguments = sys.argv[1:]
+    large = '--large' in arguments
+
+    sizes = [int(size) for size in arguments if size != '--large'] or SIZES
+    if large:
+        sizes = sizes + LARGE_SIZES
+
+    app, vimja, editor = headless.createVimja()
+
+    print('{0:>8} {1:>8} {2:>6} {3:>10} {4:>10} {5:>10} {6:>8}'.format(
+        'lines', 'trace', 'keys', 'p50 (us)', 'p99 (us)', 'peak (KB)', 'rss (MB)'))
+
+    for lines in sizes:
+        text = '\n'.join('line {0}'.format(i) for i in range(lines))
+
+        for name, trace in TRACES:
+            keys = headless.parseKeys(trace)
+
+            editor.setPlainText(text)
+            vimja.normalKeyEventMapper(headless.SPECIAL_KEYS['esc'][0])
+
+            latencies = sorted(replay(app, editor, headless.keyEvents(keys)))
+
+            #the allocations are traced on a second run, tracing slows every key down
+            tracemalloc.start()
+            replay(app, editor, headless.keyEvents(keys))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+            print('{0:>8} {1:>8} {2:>6} {3:>10.1f} {4:>10.1f} {5:>10.1f} {6:>8.1f}'.format(
+                lines, name, len(keys), percentile(latencies, 0.5) * 1e6,
+                percentile(latencies, 0.99) * 1e6, peak / 1024.0, rss / 1024.0))
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
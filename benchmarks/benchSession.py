@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Startup benchmark for the session file: loading it (only its header is read)
+against loading it and reading every register, as a session file read in full would.
+A full register budget of text is saved, spread over the named registers and the
+yank ring.
+
+Usage: python benchmarks/benchSession.py [runs] [megabytes]
+
+'''
+
+import os
+import random
+import shutil
+import sys
+import tempfile
+import timeit
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'vimja')
+sys.path.insert(0, PATH)
+
+from registers import RegisterStore
+
+from session import SessionStore
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    megabytes = float(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    random.seed(0)
+    registers = RegisterStore(int(megabytes * 1024 * 1024))
+
+    #random words compress about as well as code does
+    words = ['{0:x}'.format(random.getrandbits(32)) for _ in range(5000)]
+    names = 'abcdefghijklmnopqrstuvwxyz'
+    size = int(megabytes * 1024 * 1024) // (len(names) + registers.ringSize)
+
+    for index in range(len(names) + registers.ringSize):
+        text = ' '.join(random.choice(words) for _ in range(size // 9))
+        name = names[index] if index < len(names) else None
+        registers.yank(text, False, name)
+
+    workDir = tempfile.mkdtemp()
+    sessionPath = os.path.join(workDir, 'vimja.session')
+
+    try:
+        SessionStore(sessionPath).save(registers.entries(), {}, []).join()
+
+        def header():
+            SessionStore(sessionPath).load().close()
+
+        def full():
+            session = SessionStore(sessionPath).load()
+            for _, register in session.registers:
+                register.text()
+
+            session.close()
+
+        print('{0} registers, {1:.1f} MB session file'.format(len(registers.entries()),
+            os.path.getsize(sessionPath) / 1024.0 / 1024.0))
+        print('{0:>10} {1:>12}'.format('load', 'time (us)'))
+
+        for name, load in (('header', header), ('full', full)):
+            print('{0:>10} {1:>12.1f}'.format(name,
+                timeit.timeit(load, number=runs) / runs * 1e6))
+
+    finally:
+        shutil.rmtree(workDir)
+
+
+if __name__ == '__main__':
+    main()
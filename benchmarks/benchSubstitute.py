@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Times :%s/pattern/replacement/g and :g/pattern/d over log like documents, along
+with the peak of the memory allocated by Python while they run (the document itself
+lives in Qt and isn't counted), which stays at a few lines' worth whatever the size
+of the document. The times include tracemalloc's overhead.
+
+Requires Python 3 (tracemalloc) and PyQt4.
+
+Usage: python benchmarks/benchSubstitute.py [lines...]
+
+'''
+
+import sys
+import time
+import tracemalloc
+
+from benchUtils import createVimja
+
+LINE = '2016-03-{0:02d} 12:{1:02d}:07 INFO worker-{2} handled request {3} in 12ms'
+
+COMMANDS = ('%s/INFO/WARN/g', '%s/(\\d+)ms/\\1 ms/', 'g/worker-3/d')
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [10000, 100000, 1000000]
+
+    print('{0:>9} {1:>20} {2:>10} {3:>10}'.format('lines', 'command', 'time (s)',
+        'peak (KB)'))
+
+    for lines in sizes:
+        app, vimja, editor = createVimja(0)
+        editor.setPlainText('\n'.join(LINE.format(i % 28 + 1, i % 60, i % 8, i)
+            for i in range(lines)))
+
+        for command in COMMANDS:
+            tracemalloc.start()
+            start = time.time()
+            vimja.runExCommand(command)
+            elapsed = time.time() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            print('{0:>9} {1:>20} {2:>10.2f} {3:>10.1f}'.format(lines, command,
+                elapsed, peak / 1024.0))
+
+        editor.setPlainText('')
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
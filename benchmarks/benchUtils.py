@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Helpers shared by the benchmarks that need a running Vimja.
+
+Vimja is attached to the offscreen editor of vimja/headless.py, Ninja-IDE is replaced
+by a minimal stand-in when it isn't installed.
+
+'''
+
+import os
+import sys
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'vimja')
+sys.path.insert(0, PATH)
+
+import headless
+
+
+def createVimja(lines=1000):
+    ''' Creates a Vimja in normal mode attached to an offscreen editor
+
+    @arg int lines the number of lines in the editor
+
+    @ret tuple (app, vimja, editor) the application, the plugin and the editor
+
+    '''
+
+    return headless.createVimja('\n'.join('line {0}'.format(i) for i in range(lines)))
+
+
+def pressKeys(vimja, keys):
+    ''' Dispatches the keys as if they were pressed in normal mode
+
+    @arg Vimja vimja the plugin
+    @arg list keys the Qt key codes to press
+
+    '''
+
+    for key in keys:
+        if vimja.state.mode == vimja.NORMAL_MODE:
+            vimja.normalKeyEventMapper(key)
+        else:
+            vimja.bufferKeyEventMapper(key)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Compares counted word motions resolved on the cached word index with Qt's
+NextWord stepped one word at a time.
+
+Requires PyQt4.
+
+Usage: python benchmarks/benchWordMotion.py [count] [lines]
+
+'''
+
+import sys
+import timeit
+
+from benchUtils import createVimja
+
+from PyQt4.QtGui import QTextCursor
+
+LINE = 'def motion(self, cursor, anchor, count=1): return cursor.position() + count'
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    app, vimja, editor = createVimja(0)
+    editor.setPlainText('\n'.join([LINE] * lines))
+    index = vimja.getWordIndex()
+
+    def stepped():
+        cursor = QTextCursor(editor.document())
+        cursor.movePosition(QTextCursor.NextWord, QTextCursor.MoveAnchor, count)
+
+    def indexed():
+        index.nextStart(0, count)
+
+    #the first indexed run fills the cache of the blocks it walks over
+    cold = timeit.timeit(indexed, number=1)
+
+    runs = 100
+    print('{0:>12} {1:>12}'.format('', 'time (us)'))
+    print('{0:>12} {1:>12.1f}'.format('Qt stepped', timeit.timeit(stepped,
+        number=runs) / runs * 1e6))
+    print('{0:>12} {1:>12.1f}'.format('index cold', cold * 1e6))
+    print('{0:>12} {1:>12.1f}'.format('index warm', timeit.timeit(indexed,
+        number=runs) / runs * 1e6))
+
+    app.quit()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,322 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Applies a Vimja key script to many files at once, without the IDE.
+
+Every file is opened in normal mode in an offscreen editor (see headless.py) and the
+keys are typed into it through Vimja's own key press interceptor, so the script runs
+exactly like it would in the IDE (ex: 'gg/TODO<CR>dd', ':%s/foo/bar/g<CR>'). The
+files are spread over a pool of processes, each one with its own Vimja. A worker
+writes its file back as soon as the script is done with it, to a temporary file that
+then replaces the original, and the summaries are printed as the files complete.
+
+Requires PyQt4 and an offscreen capable Qt platform (ex: QT_QPA_PLATFORM=offscreen
+or a virtual X server).
+
+Usage: python vimja/batch.py [-j N] (-k KEYS | -s SCRIPT) GLOB [GLOB ...]
+
+'''
+
+import argparse
+import glob
+import io
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from traceback import format_exc as stackTrace
+
+from PyQt4.QtCore import Qt
+
+import headless
+
+from keyMapLoader import loadBindings
+
+from registers import RegisterStore
+
+PATH = os.path.dirname(os.path.abspath(__file__))
+
+#encoding the files are read and written in
+ENCODING = 'utf-8'
+
+#the worker's Vimja and the parsed key script, created once per process
+worker = {}
+
+
+def expandGlobs(patterns):
+    ''' @ret list paths the files matching the patterns (** spans directories on
+        python 3), sorted and without duplicates
+
+    '''
+
+    paths = set()
+
+    for pattern in patterns:
+        try:
+            matches = glob.glob(pattern, recursive=True)
+
+        except TypeError:
+            matches = glob.glob(pattern)
+
+        paths.update(path for path in matches if os.path.isfile(path))
+
+    return sorted(paths)
+
+
+def writeAtomically(path, text):
+    ''' Replaces the file's contents with the text, readers either see the old file or
+    the new one in full. The temporary file is created next to the original so that
+    it can be renamed over it and given the original's permissions.
+
+    @arg filePath path the file to be written
+    @arg str text the new contents
+
+    '''
+
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, tmpPath = tempfile.mkstemp(prefix='.vimja-', dir=directory)
+
+    try:
+        with io.open(handle, 'w', encoding=ENCODING, newline='') as tmpFile:
+            tmpFile.write(text)
+
+        shutil.copymode(path, tmpPath)
+
+        #os.replace only exists on python 3, os.rename replaces the file on posix
+        getattr(os, 'replace', os.rename)(tmpPath, path)
+
+    except Exception:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+
+        raise
+
+
+def initWorker(keys):
+    ''' Pool initializer, creates the process' Vimja and parses the key script
+
+    @arg str keys the key script in vim's notation
+
+    '''
+
+    app, vimja, editor = headless.createVimja()
+
+    worker['app'] = app
+    worker['vimja'] = vimja
+
+    #the events of each key of the script, a failing key stops the script
+    worker['events'] = [headless.keyEvents([key]) for key in headless.parseKeys(keys)]
+
+
+def openDocument(vimja, text):
+    ''' Opens the text in a new editor in normal mode, dropping what the previous
+    file left behind (registers, macros, the change repeated by ., the searches n, N
+    and :s// repeat) so that every file gets the same script regardless of the ones
+    the worker ran it on before
+
+    @arg Vimja vimja the worker's plugin
+    @arg str text the file's contents
+
+    @ret HeadlessEditor editor the editor holding the text
+
+    '''
+
+    registers = vimja.registers
+    vimja.registers = RegisterStore(registers.budget, registers.compressThreshold,
+        registers.ringSize)
+
+    vimja.macros = {}
+    vimja.lastMacro = None
+    vimja.pendingChange = None
+    vimja.lastChange = None
+    vimja.failed = False
+    vimja.status = ''
+
+    #the new editor's state starts from the last search (see attachEditor)
+    vimja.searchHistory = []
+
+    editor = headless.HeadlessEditor()
+
+    #there is no undo in a batch, the file on disk is the only history
+    editor.document().setUndoRedoEnabled(False)
+    editor.setPlainText(text)
+
+    vimja.editorService.editor = editor
+    vimja.activateEditor(editor)
+
+    #the keys are typed without waiting on background scans, the searches have to
+    #go through the whole file straight away
+    vimja.state.largeFile = False
+
+    vimja.ensureKeyMap()
+    vimja.normalKeyEventMapper(Qt.Key_Escape)
+
+    return editor
+
+
+def processFile(path):
+    ''' Runs the key script on the file and writes it back if it changed. A key that
+    fails (ex: a search without a match, an ex command error) stops the script like it
+    stops a macro, and the file is left untouched.
+
+    @arg filePath path the file to edit
+
+    @ret tuple (path, lines, size, seconds, changed, error) the summary of the file,
+        error is None unless the file couldn't be edited
+
+    '''
+
+    start = time.time()
+
+    try:
+        with io.open(path, 'r', encoding=ENCODING, newline='') as sourceFile:
+            original = sourceFile.read()
+
+        #the editor only knows \n, the file keeps its own line breaks. The lines of
+        #a file mixing both can't all be given back theirs once lines were moved
+        crlf = original.count('\r\n')
+        if crlf and crlf != original.count('\n'):
+            return (path, 0, len(original), time.time() - start, False,
+                'mixed line breaks (\\n and \\r\\n), left untouched')
+
+        newline = '\r\n' if crlf else '\n'
+        vimja = worker['vimja']
+        editor = openDocument(vimja, original.replace('\r\n', '\n'))
+
+        app = worker['app']
+        for number, events in enumerate(worker['events'], 1):
+            for event in events:
+                editor.keyPressEvent(event)
+
+                #the IDE's event loop runs between key presses
+                app.processEvents()
+
+            if vimja.failed:
+                return (path, 0, len(original), time.time() - start, False,
+                    'key {0} of the script failed: {1}'.format(number,
+                    vimja.status or 'see the log'))
+
+        text = editor.toPlainText().replace('\n', newline)
+        changed = text != original
+
+        if changed:
+            writeAtomically(path, text)
+
+        return (path, text.count('\n') + 1, len(original), time.time() - start,
+            changed, None)
+
+    except (IOError, OSError, UnicodeError) as e:
+        return (path, 0, 0, time.time() - start, False, str(e))
+
+    #a bug in a command shouldn't take the whole batch down
+    except Exception:
+        return (path, 0, 0, time.time() - start, False, stackTrace())
+
+
+def formatRow(columns):
+    return '{0:>10} {1:>10} {2:>10} {3:>8}  {4}'.format(*columns)
+
+
+def run(keys, paths, jobs=None, out=sys.stdout):
+    ''' Runs the key script on the files in a pool of processes
+
+    @arg str keys the key script in vim's notation
+    @arg list paths the files to edit
+    @arg int jobs the number of processes, one per core by default
+    @arg file out where the summaries are printed
+
+    @ret int errors the number of files that couldn't be edited
+
+    '''
+
+    #load the key map once up front, the workers then all find its cache up to date
+    #rather than each of them rewriting it
+    loadBindings(os.path.join(PATH, 'keyMap.json'), None,
+        os.path.join(PATH, 'keyMap.cache'))
+
+    jobs = max(1, min(jobs or multiprocessing.cpu_count(), len(paths) or 1))
+
+    files = changed = errors = lines = size = 0
+    busy = 0.0
+
+    out.write(formatRow(('lines', 'KB', 'ms', 'changed', 'file')) + '\n')
+    start = time.time()
+
+    pool = multiprocessing.Pool(jobs, initWorker, (keys,))
+
+    try:
+        for path, fileLines, fileSize, seconds, fileChanged, error in \
+                pool.imap_unordered(processFile, paths):
+            files += 1
+            busy += seconds
+
+            if error is not None:
+                errors += 1
+                out.write('error {0}: {1}\n'.format(path, error.strip()))
+                continue
+
+            changed += fileChanged
+            lines += fileLines
+            size += fileSize
+
+            out.write(formatRow((fileLines, '{0:.1f}'.format(fileSize / 1024.0),
+                '{0:.1f}'.format(seconds * 1e3), 'yes' if fileChanged else 'no',
+                path)) + '\n')
+
+    except BaseException:
+        pool.terminate()
+        raise
+
+    else:
+        pool.close()
+
+    finally:
+        pool.join()
+
+    elapsed = max(time.time() - start, 1e-9)
+
+    out.write('\n{0} files ({1} changed, {2} failed) in {3:.2f}s on {4} processes, '
+        '{5:.1f} files/s, {6:.0f} lines/s, {7:.2f} MB/s, {8:.0f}% busy\n'.format(files,
+        changed, errors, elapsed, jobs, files / elapsed, lines / elapsed,
+        size / elapsed / 1024.0 / 1024.0, 100.0 * busy / (elapsed * jobs)))
+
+    return errors
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Applies a Vimja key script (in '
+        "vim's notation, ex: 'gg/TODO<CR>dd') to every file matching the globs.")
+
+    script = parser.add_mutually_exclusive_group(required=True)
+    script.add_argument('-k', '--keys', help='the keys to type')
+    script.add_argument('-s', '--script', help='a file holding the keys to type (its '
+        'final line break is dropped)')
+
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+        help='number of processes (default: one per core)')
+    parser.add_argument('globs', nargs='+', help='files to edit (** spans directories)')
+
+    args = parser.parse_args(argv)
+
+    keys = args.keys
+    if args.script is not None:
+        with io.open(args.script, 'r', encoding=ENCODING) as scriptFile:
+            keys = scriptFile.read()
+
+        #the line break editors end the file with isn't part of the script, the
+        #ones before it are typed like <CR>
+        if keys.endswith('\n'):
+            keys = keys[:-1]
+
+    paths = expandGlobs(args.globs)
+    if not paths:
+        parser.error('no file matches {0}'.format(' '.join(args.globs)))
+
+    return 1 if run(keys, paths, args.jobs) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
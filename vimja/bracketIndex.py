@@ -0,0 +1,497 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Bracket pairs of a QTextDocument, indexed per block.
+
+Each block keeps the depth of every kind of bracket ((), {} and []) at its start,
+the change of depth over it and the lowest depth reached in it, its brackets are
+only listed once a lookup goes through it. The whole document is summarized in one
+pass the first time it's needed, after an edit only the edited blocks are
+summarized again and the depths of the ones after them are shifted all at once. The
+lowest depths are also kept per chunk of blocks, so finding a match jumps over the
+chunks and then the blocks whose depth never gets down to the bracket's level.
+
+'''
+
+import re
+
+from bisect import bisect_left
+
+#bracket -> (kind, depth change)
+BRACKETS = {
+    '(': (0, 1),
+    ')': (0, -1),
+    '{': (1, 1),
+    '}': (1, -1),
+    '[': (2, 1),
+    ']': (2, -1),
+}
+
+BRACKET = re.compile(r'[(){}\[\]]')
+
+#the opening and closing bracket of each kind
+PAIRS = (('(', ')'), ('{', '}'), ('[', ']'))
+
+NO_CHANGE = (0, 0, 0)
+
+#blocks per chunk whose lowest depth is kept, see nextLow
+CHUNK_SIZE = 256
+
+#indices of the entries kept per block
+REVISION, OFFSETS, TOKENS, CHANGE, LOWEST = range(5)
+
+
+def scanBlock(text):
+    ''' Finds the brackets of a block
+
+    @arg str text the text of the block
+
+    @ret tuple (offsets, tokens) the offsets of the brackets and their (kind, depth
+        change)
+
+    '''
+
+    offsets = []
+    tokens = []
+
+    for match in BRACKET.finditer(text):
+        offsets.append(match.start())
+        tokens.append(BRACKETS[match.group()])
+
+    return offsets, tokens
+
+
+def summarizeBlock(text):
+    ''' Sums up the brackets of a block without going through them one by one
+
+    @arg str text the text of the block
+
+    @ret tuple (change, lowest) per kind, the depth change over the block and the
+        lowest depth reached in it, relative to its start
+
+    '''
+
+    #the pairs closed within the block neither change its depth nor take it below
+    #its start, most lines of code are left without any bracket once they are gone
+    left = ''.join(BRACKET.findall(text))
+    while True:
+        reduced = left.replace('()', '').replace('{}', '').replace('[]', '')
+        if reduced == left:
+            break
+
+        left = reduced
+
+    if not left:
+        return NO_CHANGE, NO_CHANGE
+
+    change = []
+    lowest = []
+
+    for opening, closing in PAIRS:
+        opened = left.count(opening)
+        closed = left.count(closing)
+        change.append(opened - closed)
+
+        #the other kinds in between hid some of the pairs (ex: ({)})
+        if opened and closed:
+            kindLeft = ''.join(char for char in left if char in (opening, closing))
+            pair = opening + closing
+            while pair in kindLeft:
+                kindLeft = kindLeft.replace(pair, '')
+
+            closed = kindLeft.count(closing)
+
+        lowest.append(-closed)
+
+    return tuple(change), tuple(lowest)
+
+
+class BracketIndex(object):
+    ''' Bracket depths of the blocks of a document. '''
+
+    def __init__(self):
+        self.document = None
+
+        #[revision, offsets, tokens, change, lowest] of each block, None when the
+        #block has to be summarized again, its offsets and tokens are None until they
+        #are listed
+        self.blocks = []
+
+        #per kind, the depth at the start of each block, the lowest depth reached in
+        #each block and the lowest one reached in each chunk of blocks
+        self.starts = ([], [], [])
+        self.lows = ([], [], [])
+        self.chunkLows = ([], [], [])
+
+        #the blocks between these two were edited, the start depths from dirtyFrom
+        #on are not up to date, shifted is set when lines were added or removed (the
+        #chunks after the edit don't hold the same blocks any more)
+        self.dirtyFrom = None
+        self.dirtyTo = None
+        self.shifted = False
+
+    def attach(self, document):
+        ''' Indexes the given document from now on
+
+        @arg QTextDocument document the document to be indexed
+
+        '''
+
+        if document is self.document:
+            return
+
+        self.detach()
+
+        self.document = document
+        self.blocks = [None] * document.blockCount()
+        self.starts = tuple([0] * len(self.blocks) for _ in PAIRS)
+        self.lows = tuple([0] * len(self.blocks) for _ in PAIRS)
+        self.dirtyFrom = 0
+        self.dirtyTo = len(self.blocks) - 1
+        self.shifted = True
+        document.contentsChange.connect(self.documentChanged)
+
+    def detach(self):
+        ''' Stops following the document and drops its index (ex: ahead of an edit
+        touching most of its lines, the next lookup indexes it again)
+
+        '''
+
+        if self.document is not None:
+            try:
+                self.document.contentsChange.disconnect(self.documentChanged)
+
+            except (TypeError, RuntimeError):
+                pass
+
+        self.document = None
+        self.blocks = []
+        self.starts = ([], [], [])
+        self.lows = ([], [], [])
+        self.chunkLows = ([], [], [])
+        self.dirtyFrom = None
+        self.dirtyTo = None
+        self.shifted = False
+
+    def documentChanged(self, position, removed, added):
+        ''' Drops the edited blocks, they are summarized again by the next lookup '''
+
+        document = self.document
+        first = document.findBlock(position).blockNumber()
+
+        #lines added or removed by the edit are right after the edited block
+        delta = document.blockCount() - len(self.blocks)
+        if delta > 0:
+            self.blocks[first + 1:first + 1] = [None] * delta
+            for depths in self.starts + self.lows:
+                depths[first + 1:first + 1] = [0] * delta
+
+        elif delta < 0:
+            for entries in (self.blocks,) + self.starts + self.lows:
+                del entries[first + 1:first + 1 - delta]
+
+        end = min(position + added, document.characterCount() - 1)
+        last = document.findBlock(end).blockNumber()
+        self.blocks[first:last + 1] = [None] * (last + 1 - first)
+
+        if delta:
+            self.shifted = True
+
+        if self.dirtyFrom is None:
+            self.dirtyFrom = first
+            self.dirtyTo = last
+
+        else:
+            if self.dirtyTo > first:
+                self.dirtyTo = max(first, self.dirtyTo + delta)
+
+            self.dirtyFrom = min(self.dirtyFrom, first)
+            self.dirtyTo = max(self.dirtyTo, last)
+
+    def refresh(self):
+        ''' Summarizes the edited blocks and shifts the depths of the blocks after
+        them by as much as the edit changed them
+
+        '''
+
+        if self.dirtyFrom is None:
+            return
+
+        blocks = self.blocks
+        starts = self.starts
+        lows = self.lows
+        first = number = self.dirtyFrom
+
+        if number == 0:
+            start = NO_CHANGE
+        else:
+            change = blocks[number - 1][CHANGE]
+            start = tuple(kindStarts[number - 1] + change[kind]
+                for kind, kindStarts in enumerate(starts))
+
+        end = min(self.dirtyTo, len(blocks) - 1)
+        block = self.document.findBlockByNumber(number)
+        while number <= end:
+            entry = blocks[number]
+            revision = block.revision()
+
+            if entry is None or entry[REVISION] != revision:
+                change, lowest = summarizeBlock(block.text())
+                entry = blocks[number] = [revision, None, None, change, lowest]
+
+            for kind in range(len(PAIRS)):
+                starts[kind][number] = start[kind]
+                lows[kind][number] = start[kind] + entry[LOWEST][kind]
+
+            if entry[CHANGE] != NO_CHANGE:
+                start = tuple(depth + change for depth, change in
+                    zip(start, entry[CHANGE]))
+
+            block = block.next()
+            number += 1
+
+        #the blocks after the edited ones keep their brackets, their depths all move
+        #by the same amount
+        last = number - 1
+        for kind, (kindStarts, kindLows) in enumerate(zip(starts, lows)):
+            shift = start[kind] - kindStarts[number] if number < len(blocks) else 0
+            if shift:
+                kindStarts[number:] = [depth + shift for depth in kindStarts[number:]]
+                kindLows[number:] = [depth + shift for depth in kindLows[number:]]
+                last = len(blocks) - 1
+
+        #the chunks holding the blocks updated, up to the end once the blocks moved
+        if self.shifted:
+            last = len(blocks) - 1
+
+        self.refreshChunks(first // CHUNK_SIZE, last // CHUNK_SIZE)
+
+        self.dirtyFrom = None
+        self.dirtyTo = None
+        self.shifted = False
+
+    def refreshChunks(self, first, last):
+        ''' Updates the lowest depths of the chunks between the two (included) '''
+
+        count = (len(self.blocks) + CHUNK_SIZE - 1) // CHUNK_SIZE
+
+        for lows, chunkLows in zip(self.lows, self.chunkLows):
+            del chunkLows[count:]
+            chunkLows.extend([0] * (count - len(chunkLows)))
+
+            for chunk in range(first, min(last + 1, count)):
+                chunkLows[chunk] = min(lows[chunk * CHUNK_SIZE:
+                    (chunk + 1) * CHUNK_SIZE])
+
+    def tokens(self, number):
+        ''' Lists the brackets of the block the first time a lookup goes through it
+
+        @ret tuple (offsets, tokens) the offsets of the brackets and their (kind,
+            depth change), see scanBlock
+
+        '''
+
+        entry = self.blocks[number]
+        if entry[TOKENS] is None:
+            text = self.document.findBlockByNumber(number).text()
+            entry[OFFSETS], entry[TOKENS] = scanBlock(text)
+
+        return entry[OFFSETS], entry[TOKENS]
+
+    def depthBefore(self, number, index, kind):
+        ''' @ret int depth the depth of the kind of bracket before the index'th
+            bracket of the block '''
+
+        depth = self.starts[kind][number]
+
+        for tokenKind, delta in self.tokens(number)[1][:index]:
+            if tokenKind == kind:
+                depth += delta
+
+        return depth
+
+    def nextLow(self, number, kind, level):
+        ''' Finds the first block from the given one on whose depth gets down to the
+        level, skipping whole chunks at a time
+
+        @ret int number the number of the block or None
+
+        '''
+
+        lows = self.lows[kind]
+        chunkLows = self.chunkLows[kind]
+
+        first = number
+        chunk = first // CHUNK_SIZE
+        while chunk < len(chunkLows):
+            if chunkLows[chunk] <= level:
+                for number in range(max(first, chunk * CHUNK_SIZE),
+                        min((chunk + 1) * CHUNK_SIZE, len(lows))):
+                    if lows[number] <= level:
+                        return number
+
+            chunk += 1
+
+        return None
+
+    def previousLow(self, number, kind, level):
+        ''' Finds the last block up to the given one whose depth gets down to the
+        level, see nextLow
+
+        @ret int number the number of the block or None
+
+        '''
+
+        lows = self.lows[kind]
+        chunkLows = self.chunkLows[kind]
+
+        last = number
+        chunk = last // CHUNK_SIZE
+        while chunk >= 0:
+            if chunkLows[chunk] <= level:
+                for number in range(min(last, (chunk + 1) * CHUNK_SIZE - 1),
+                        chunk * CHUNK_SIZE - 1, -1):
+                    if lows[number] <= level:
+                        return number
+
+            chunk -= 1
+
+        return None
+
+    def forward(self, number, index, kind, depth, level):
+        ''' Finds the first closing bracket from the index'th bracket of the block on
+        that brings the depth down to the level
+
+        @ret tuple (number, index) the block number and index of the bracket or None
+
+        '''
+
+        while True:
+            tokens = self.tokens(number)[1]
+
+            for tokenIndex in range(index, len(tokens)):
+                tokenKind, delta = tokens[tokenIndex]
+
+                if tokenKind == kind:
+                    depth += delta
+                    if delta < 0 and depth == level:
+                        return number, tokenIndex
+
+            #jump over the blocks that never get down to the level
+            number = self.nextLow(number + 1, kind, level)
+            if number is None:
+                return None
+
+            index = 0
+            depth = self.starts[kind][number]
+
+    def backward(self, number, index, kind, depth, level):
+        ''' Finds the last opening bracket before the index'th bracket of the block
+        that the depth is at the level before
+
+        @ret tuple (number, index) the block number and index of the bracket or None
+
+        '''
+
+        blocks = self.blocks
+
+        while True:
+            tokens = self.tokens(number)[1]
+
+            for tokenIndex in range(index - 1, -1, -1):
+                tokenKind, delta = tokens[tokenIndex]
+
+                if tokenKind == kind:
+                    depth -= delta
+                    if delta > 0 and depth == level:
+                        return number, tokenIndex
+
+            #jump over the blocks that never get down to the level
+            number = self.previousLow(number - 1, kind, level)
+            if number is None:
+                return None
+
+            index = len(self.tokens(number)[1])
+            depth = self.starts[kind][number] + blocks[number][CHANGE][kind]
+
+    def position(self, found):
+        ''' @ret int position the document offset of the (number, index) bracket '''
+
+        number, index = found
+        block = self.document.findBlockByNumber(number)
+
+        return block.position() + self.tokens(number)[0][index]
+
+    def locate(self, position):
+        ''' @ret tuple (number, column) the block and column of the position '''
+
+        self.refresh()
+        block = self.document.findBlock(position)
+
+        return block.blockNumber(), position - block.position()
+
+    def match(self, position):
+        ''' Finds the bracket matching the first bracket at or after the position on
+        its line (%)
+
+        @arg int position the cursor position
+
+        @ret int position the offset of the matching bracket or None
+
+        '''
+
+        number, column = self.locate(position)
+        offsets, tokens = self.tokens(number)
+        index = bisect_left(offsets, column)
+
+        if index == len(offsets):
+            return None
+
+        kind, delta = tokens[index]
+        depth = self.depthBefore(number, index, kind)
+
+        if delta > 0:
+            found = self.forward(number, index + 1, kind, depth + 1, depth)
+        else:
+            found = self.backward(number, index, kind, depth, depth - 1)
+
+        return None if found is None else self.position(found)
+
+    def enclosing(self, position, bracket, count=1):
+        ''' Finds the count'th pair of the kind of bracket around the position, a
+        bracket at the position belongs to the pair it's part of
+
+        @arg int position the cursor position
+        @arg str bracket one of the brackets of the pair
+        @arg int count 1 for the innermost pair, 2 for the one around it...
+
+        @ret tuple (opening, closing) the offsets of the brackets or None
+
+        '''
+
+        kind = BRACKETS[bracket][0]
+        number, column = self.locate(position)
+        offsets, tokens = self.tokens(number)
+
+        index = bisect_left(offsets, column)
+
+        #an opening bracket under the cursor is inside of its own pair
+        if index < len(offsets) and offsets[index] == column and \
+                tokens[index] == (kind, 1):
+            index += 1
+
+        depth = self.depthBefore(number, index, kind)
+        level = depth - count
+
+        if level < 0:
+            return None
+
+        opening = self.backward(number, index, kind, depth, level)
+        if opening is None:
+            return None
+
+        closing = self.forward(opening[0], opening[1] + 1, kind, level + 1, level)
+        if closing is None:
+            return None
+
+        return self.position(opening), self.position(closing)
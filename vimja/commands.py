@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Immutable command objects compiled from keyMap.json.
+
+Everything a key press needs (the QTextCursor operation, the anchor, the count and
+the bound handler) is resolved once when the key map is loaded so dispatching a
+command is a single call with no dictionary allocation or getattr lookups.
+
+'''
+
+from functools import partial
+
+from PyQt4.QtGui import QTextCursor
+
+
+class Command(object):
+    ''' Base class of all the compiled commands.
+
+    Subclasses list their extra fields in FIELDS, every field is set once in the
+    constructor and can't be changed afterwards. Commands with ARGUMENT set take the
+    next key typed as an argument (ex: the register of qa), the ones with MOTION set
+    also apply after an operator (ex: the w of dw).
+
+    '''
+
+    __slots__ = ('name', 'handler', 'count', 'changes')
+
+    FIELDS = ()
+
+    ARGUMENT = False
+
+    MOTION = False
+
+    def __init__(self, name, handler, count=1, changes=False, **fields):
+        ''' @arg str name the key(s) the command is bound to (ex: 'gg')
+        @arg func handler the bound Vimja method that executes the command
+        @arg int count the number of times the command is applied
+        @arg bool changes whether the command starts a change repeated by .
+        @arg dict fields values for the subclass' FIELDS
+
+        '''
+
+        setField = super(Command, self).__setattr__
+        setField('name', name)
+        setField('handler', handler)
+        setField('count', count)
+        setField('changes', changes)
+
+        for field in self.FIELDS:
+            setField(field, fields[field])
+
+    def __setattr__(self, name, value):
+        raise AttributeError('{0} is immutable'.format(type(self).__name__))
+
+    def __repr__(self):
+        return '<{0} {1}>'.format(type(self).__name__, self.name)
+
+    @classmethod
+    def fromDetails(cls, plugin, details):
+        ''' Compiles a keyMap.json entry
+
+        @arg Vimja plugin the plugin whose methods and constants are bound
+        @arg dict details the normalized json object of the binding
+
+        @ret Command command the compiled command
+
+        '''
+
+        return cls(details['Key'], getattr(plugin, details['Function']),
+            details.get('N', 1), cls.isChange(details),
+            **cls.convertFields(plugin, details))
+
+    @classmethod
+    def isChange(cls, details):
+        ''' @ret bool changes whether the command edits the document '''
+
+        return False
+
+    @classmethod
+    def convertFields(cls, plugin, details):
+        ''' @ret dict fields the subclass specific fields of the json object '''
+
+        return {}
+
+
+class MoveCommand(Command):
+    ''' A cursor movement, the anchor is None when it follows the current mode.
+
+    The operation is either a QTextCursor.MoveOperation or, for the motions Qt doesn't
+    have (custom is True), a Vimja method taking (cursor, anchor, count). Linewise and
+    inclusive describe the range the motion covers when used after an operator, jump
+    adds the position moved from to the jumplist (ex: G, %).
+
+    '''
+
+    __slots__ = ('operation', 'custom', 'anchor', 'linewise', 'inclusive', 'jump')
+
+    FIELDS = __slots__
+
+    MOTION = True
+
+    @classmethod
+    def convertFields(cls, plugin, details):
+        anchor = details.get('Anchor')
+        operation = getattr(QTextCursor, details['MoveOperation'], None)
+
+        return {'operation': operation if operation is not None else
+                getattr(plugin, details['MoveOperation']),
+            'custom': operation is None,
+            'anchor': None if anchor is None else getattr(plugin, anchor),
+            'linewise': details.get('Linewise', False),
+            'inclusive': details.get('Inclusive', False),
+            'jump': details.get('Jump', False)}
+
+
+class ModeCommand(Command):
+    ''' A change of mode along with the anchor and cursor width of said mode. '''
+
+    __slots__ = ('mode', 'anchor', 'cursorWidth')
+
+    FIELDS = __slots__
+
+    #modes that start a change (i...<Esc>, d{motion}, c{motion})
+    CHANGE_MODES = ('INSERT_MODE', 'DELETE_MODE', 'CHANGE_MODE')
+
+    @classmethod
+    def isChange(cls, details):
+        return details['Mode'] in cls.CHANGE_MODES
+
+    @classmethod
+    def convertFields(cls, plugin, details):
+        return {'mode': getattr(plugin, details['Mode']),
+            'anchor': getattr(plugin, details['Anchor']),
+            'cursorWidth': details['CursorWidth']}
+
+
+class BufferCommand(Command):
+    ''' A copy/cut of the text picked out by the bound selection method.
+
+    Text objects (ex: i(, aw) give the selection method their bracket, if any, and
+    whether the brackets or blanks are left out (Inner) ahead of the cursor and count.
+
+    '''
+
+    __slots__ = ('select', 'isLine', 'remove')
+
+    FIELDS = __slots__
+
+    @classmethod
+    def isChange(cls, details):
+        return True
+
+    @classmethod
+    def convertFields(cls, plugin, details):
+        select = getattr(plugin, details['MoveOperation'])
+        if 'Bracket' in details:
+            select = partial(select, details['Bracket'], details.get('Inner', False))
+        elif 'Inner' in details:
+            select = partial(select, details['Inner'])
+
+        return {'select': select,
+            'isLine': details['isLine'],
+            'remove': details.get('Remove', False)}
+
+
+class PasteCommand(Command):
+    ''' A paste before or after the cursor. '''
+
+    __slots__ = ('after',)
+
+    FIELDS = __slots__
+
+    @classmethod
+    def isChange(cls, details):
+        return True
+
+    @classmethod
+    def convertFields(cls, plugin, details):
+        return {'after': details['after']}
+
+
+class SearchCommand(Command):
+    ''' A jump to the next or previous match of the last search. '''
+
+    __slots__ = ('forward',)
+
+    FIELDS = __slots__
+
+    @classmethod
+    def convertFields(cls, plugin, details):
+        return {'forward': details['Forward']}
+
+
+class ArgumentCommand(Command):
+    ''' A command taking the next key typed as its argument (ex: qa, @a). '''
+
+    __slots__ = ()
+
+    ARGUMENT = True
+
+
+class MarkCommand(ArgumentCommand):
+    ''' A jump to the mark given as argument, to its line when linewise ('a) and to
+    its exact position otherwise (`a).
+
+    '''
+
+    __slots__ = ('linewise',)
+
+    FIELDS = __slots__
+
+    MOTION = True
+
+    @classmethod
+    def convertFields(cls, plugin, details):
+        return {'linewise': details.get('Linewise', False)}
+
+
+#the command class used for each of the handlers named in keyMap.json
+COMMAND_TYPES = {
+    'move': MoveCommand,
+    'switchMode': ModeCommand,
+    'bufferChars': BufferCommand,
+    'paste': PasteCommand,
+    'startSearch': Command,
+    'searchNext': SearchCommand,
+    'recordMacro': ArgumentCommand,
+    'replayMacro': ArgumentCommand,
+    'selectRegister': ArgumentCommand,
+    'repeatChange': Command,
+    'startCommandLine': Command,
+    'setMark': ArgumentCommand,
+    'jumpToMark': MarkCommand,
+    'jumpBack': Command,
+    'jumpForward': Command,
+}
+
+
+def compileCommand(plugin, details):
+    ''' Compiles a single keyMap.json entry
+
+    @arg Vimja plugin the plugin whose methods and constants are bound
+    @arg dict details the normalized json object of the binding
+
+    @ret Command command the compiled command
+
+    '''
+
+    try:
+        commandType = COMMAND_TYPES[details['Function']]
+
+    except KeyError:
+        raise ValueError('Unknown function: {0}'.format(details.get('Function')))
+
+    return commandType.fromDetails(plugin, details)
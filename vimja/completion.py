@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Keywords of a QTextDocument for insert mode completion (Ctrl-N, Ctrl-P).
+
+The distinct keywords of the document are kept in a sorted list along with the number
+of times each one occurs, so that the completions of a prefix are the slice between
+two bisects. The text every block had when it was last indexed is kept as well: an
+edit only marks the blocks it touched, they are scanned again by the next lookup and
+only the keywords they gained or lost update the list. The whole document is only
+scanned on the first lookup, or again after an edit touching more than
+MAX_DIRTY_BLOCKS blocks.
+
+'''
+
+import re
+
+from bisect import bisect_left
+from bisect import insort
+from collections import Counter
+
+try:
+    unichr
+
+except NameError:
+    unichr = chr
+
+KEYWORD = re.compile(r'\w+', re.UNICODE)
+
+#edited blocks kept track of at most, past them the index is rebuilt from scratch
+MAX_DIRTY_BLOCKS = 1000
+
+
+class Completion(object):
+    ''' The completion being cycled through with Ctrl-N/Ctrl-P. '''
+
+    __slots__ = ('start', 'prefix', 'candidates', 'index', 'end')
+
+    def __init__(self, position, prefix, candidates):
+        ''' @arg int position the cursor position, the end of the prefix
+        @arg str prefix the start of the keyword that was typed
+        @arg list candidates the keywords starting with the prefix
+
+        '''
+
+        #the completed text spans start-end, index is the candidate inserted, the
+        #one past the candidates being the prefix as it was typed
+        self.start = position
+        self.prefix = prefix
+        self.candidates = candidates
+        self.index = len(candidates)
+        self.end = position
+
+
+class CompletionIndex(object):
+    ''' Sorted keywords of a document and their number of occurrences. '''
+
+    def __init__(self, maxDirty=MAX_DIRTY_BLOCKS):
+        ''' @arg int maxDirty the number of edited blocks the index is updated for '''
+
+        self.document = None
+        self.maxDirty = maxDirty
+
+        #the indexed text of each block, the sorted distinct keywords and keyword ->
+        #count, None until the first lookup
+        self.blocks = None
+        self.words = None
+        self.counts = None
+
+        #numbers of the blocks edited since the last lookup
+        self.dirty = set()
+
+    def attach(self, document):
+        ''' Indexes the given document from now on
+
+        @arg QTextDocument document the document to be indexed
+
+        '''
+
+        if document is self.document:
+            return
+
+        self.detach()
+
+        self.document = document
+        document.contentsChange.connect(self.documentChanged)
+
+    def detach(self):
+        ''' Stops following the document and drops its index (ex: ahead of an edit
+        touching most of its lines, the next lookup indexes it again)
+
+        '''
+
+        if self.document is not None:
+            try:
+                self.document.contentsChange.disconnect(self.documentChanged)
+
+            except (TypeError, RuntimeError):
+                pass
+
+        self.document = None
+        self.clear()
+
+    def clear(self):
+        ''' Drops the index, the next lookup scans the whole document '''
+
+        self.blocks = None
+        self.words = None
+        self.counts = None
+        self.dirty = set()
+
+    def documentChanged(self, position, removed, added):
+        ''' Marks the edited blocks, the keywords of the removed ones are dropped
+        straight away since their text is gone
+
+        '''
+
+        if self.blocks is None:
+            return
+
+        document = self.document
+        first = document.findBlock(position).blockNumber()
+
+        #lines added or removed by the edit are right after the edited block
+        delta = document.blockCount() - len(self.blocks)
+        if len(self.dirty) + abs(delta) > self.maxDirty:
+            self.clear()
+            return
+
+        if delta:
+            self.dirty = set(number + delta if number > first else number
+                for number in self.dirty if not first < number <= first - delta)
+
+        if delta > 0:
+            self.blocks[first + 1:first + 1] = [''] * delta
+
+        elif delta < 0:
+            for text in self.blocks[first + 1:first + 1 - delta]:
+                self.forget(KEYWORD.findall(text))
+
+            del self.blocks[first + 1:first + 1 - delta]
+
+        end = min(position + added, document.characterCount() - 1)
+        last = document.findBlock(end).blockNumber()
+        self.dirty.update(range(first, last + 1))
+
+    def learn(self, words):
+        ''' Counts the keywords in, adding the new ones to the sorted list '''
+
+        counts = self.counts
+
+        for word in words:
+            count = counts.get(word, 0)
+            if not count:
+                insort(self.words, word)
+
+            counts[word] = count + 1
+
+    def forget(self, words):
+        ''' Counts the keywords out, removing the ones left without occurrences '''
+
+        counts = self.counts
+
+        for word in words:
+            count = counts[word] - 1
+            if count:
+                counts[word] = count
+
+            else:
+                del counts[word]
+                del self.words[bisect_left(self.words, word)]
+
+    def refresh(self):
+        ''' Indexes the whole document the first time, the edited blocks after that '''
+
+        if self.blocks is None:
+            #one snapshot of the document rather than a call into Qt per block, the
+            #keywords never span lines so they are all found in one go
+            text = self.document.toPlainText()
+            counts = Counter(KEYWORD.findall(text))
+
+            self.blocks = text.split('\n')
+            self.counts = counts
+            self.words = sorted(counts)
+            self.dirty = set()
+            return
+
+        for number in self.dirty:
+            block = self.document.findBlockByNumber(number)
+            if not block.isValid():
+                continue
+
+            #the keywords the block kept are counted in before the old ones are
+            #counted out, so they never leave the sorted list
+            text = block.text()
+            self.learn(KEYWORD.findall(text))
+            self.forget(KEYWORD.findall(self.blocks[number]))
+            self.blocks[number] = text
+
+        self.dirty = set()
+
+    def complete(self, prefix):
+        ''' Gets the keywords starting with the prefix
+
+        @arg str prefix the start of the keyword being typed
+
+        @ret list words the keywords in alphabetical order, the prefix itself left out
+
+        '''
+
+        self.refresh()
+
+        words = self.words
+        start = bisect_left(words, prefix)
+
+        #the keywords past the prefix's range are the ones from its successor on
+        end = bisect_left(words, prefix[:-1] + unichr(ord(prefix[-1]) + 1), start)
+
+        if start < end and words[start] == prefix:
+            start += 1
+
+        return words[start:end]
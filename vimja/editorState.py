@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' The part of Vimja's state that belongs to a single editor (tab).
+
+Vimja keeps one EditorState per editor in a weak keyed map, the state must not refer
+back to its editor so that closing the tab frees it (and its search index) straight
+away.
+
+'''
+
+from search import IncrementalSearch
+
+from matchIndex import MatchIndex
+
+from wordIndex import WordIndex
+
+from bracketIndex import BracketIndex
+
+from marks import MarkIndex
+
+from completion import CompletionIndex
+
+
+class EditorState(object):
+    ''' Mode, pending keys, search, indices and marks of an editor. '''
+
+    def __init__(self, mode, anchor, normalKeys=None, bufferKeys=None):
+        ''' @arg int mode the mode the editor starts in
+        @arg int anchor the cursor move type of said mode
+        @arg KeySequenceTrie normalKeys the normal mode key map, cloned for the editor
+        @arg KeySequenceTrie bufferKeys the delete/yank mode key map, cloned as well
+
+        '''
+
+        self.mode = mode
+        self.defaultCursorMoveType = anchor
+
+        #whether the editor's document was too big for the features that go over all
+        #of it when it was attached (see Vimja.attachEditor)
+        self.largeFile = False
+
+        #tries holding the key presses between valid commands, None until the key
+        #map is compiled (see Vimja.ensureKeyMap)
+        self.normalKeys = None
+        self.bufferKeys = None
+        self.setKeyMaps(normalKeys, bufferKeys)
+
+        #the count typed before the next command (0 when none was typed) and the
+        #one typed before the pending operator
+        self.count = 0
+        self.operatorCount = 1
+
+        #the command waiting on its argument key (ex: q waiting on the register)
+        self.pendingArgument = None
+
+        #the register given with "x for the next yank, delete or paste
+        self.register = None
+
+        #the : command line being typed, None when it's closed
+        self.commandLine = None
+
+        #incremental search (/) state, the regex is kept for n/N, and the entry of
+        #the search history Up/Down are at
+        self.isSearching = False
+        self.regexString = ''
+        self.searchOrigin = 0
+        self.historyIndex = 0
+        self.search = IncrementalSearch()
+
+        #every match of the confirmed search, indexed in the background
+        self.matchIndex = MatchIndex()
+
+        #vim's word boundaries of the editor's document (w, b, e...)
+        self.wordIndex = WordIndex()
+
+        #bracket depths of the editor's document (%, i(, a{...)
+        self.bracketIndex = BracketIndex()
+
+        #marks (ma) and jumplist (Ctrl-O/Ctrl-I), following the document's edits
+        self.marks = MarkIndex()
+
+        #keywords of the editor's document offered by Ctrl-N/Ctrl-P, and the
+        #Completion being cycled through (None when there is none)
+        self.completionIndex = CompletionIndex()
+        self.completion = None
+
+    def setKeyMaps(self, normalKeys, bufferKeys):
+        ''' Gives the editor its own copy of the key maps, sharing their nodes
+
+        @arg KeySequenceTrie normalKeys the normal mode key map or None
+        @arg KeySequenceTrie bufferKeys the delete/yank mode key map or None
+
+        '''
+
+        if normalKeys is not None:
+            self.normalKeys = normalKeys.clone()
+            self.bufferKeys = bufferKeys.clone()
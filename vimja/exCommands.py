@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Parsing of the : command line (ranges, :s and :g arguments).
+
+Line numbers are the document's block numbers (0 based), the user types them 1
+based. Everything in here only looks at the command line, the commands themselves
+(see Vimja.substitute, Vimja.globalCommand...) stream over the document's blocks.
+
+'''
+
+import re
+
+ADDRESS = re.compile(r'\s*(\d+|\.|\$)?((?:\s*[+-]\d*)*)')
+OFFSET = re.compile(r'([+-])(\d*)')
+NAME = re.compile(r'\s*([A-Za-z]*!?)(.*)$')
+
+
+def parseAddress(line, index, current, last):
+    ''' Parses a single line address (ex: 12, ., $, .+3, -2)
+
+    @arg str line the command line
+    @arg int index where the address starts
+    @arg int current the cursor's line
+    @arg int last the last line of the document
+
+    @ret tuple (number, index) the line number, None when there is no address, and
+        the index of the rest of the line
+
+    '''
+
+    match = ADDRESS.match(line, index)
+    base, offsets = match.groups()
+
+    if not base and not offsets.strip():
+        return None, index
+
+    if base == '$':
+        number = last
+
+    elif base and base != '.':
+        number = int(base) - 1
+
+    else:
+        number = current
+
+    for sign, amount in OFFSET.findall(offsets.replace(' ', '')):
+        amount = int(amount) if amount else 1
+        number += amount if sign == '+' else -amount
+
+    return number, match.end()
+
+
+def parseRange(line, current, last):
+    ''' Splits the range off a command line (ex: %, 3,7, .,$, .,+5)
+
+    @arg str line the command line, without the :
+    @arg int current the cursor's line
+    @arg int last the last line of the document
+
+    @ret tuple (lines, rest) the (first, last) line numbers, None when no range was
+        given, and the rest of the command line
+
+    '''
+
+    stripped = line.lstrip()
+    if stripped.startswith('%'):
+        return (0, last), stripped[1:]
+
+    first, index = parseAddress(line, 0, current, last)
+    if first is None:
+        return None, line
+
+    end = first
+    if line[index:].lstrip().startswith(','):
+        index = line.index(',', index) + 1
+        end, index = parseAddress(line, index, current, last)
+
+        if end is None:
+            end = current
+
+    if first > end:
+        first, end = end, first
+
+    if first < 0 or end > last:
+        raise ValueError('Invalid range')
+
+    return (first, end), line[index:]
+
+
+def parseName(line):
+    ''' @ret tuple (name, argument) the command's name (ex: s, g!, VimjaStats) and the
+        rest of the line '''
+
+    name, argument = NAME.match(line).groups()
+
+    return name, argument.strip()
+
+
+def splitDelimited(argument, parts):
+    ''' Splits a /pattern/replacement/flags like argument on its delimiter, the first
+    character, an escaped delimiter standing for the delimiter itself
+
+    @arg str argument the argument of :s or :g
+    @arg int parts the number of delimited parts expected, the last one may be left
+        unterminated
+
+    @ret list parts the delimited parts followed by the rest of the argument
+
+    '''
+
+    if not argument or argument[0].isalnum() or argument[0] in '\\"| ':
+        raise ValueError('Expected a delimiter such as /')
+
+    delimiter = argument[0]
+    result = []
+    current = []
+    index = 1
+
+    while index < len(argument) and len(result) < parts:
+        char = argument[index]
+
+        if char == '\\' and index + 1 < len(argument):
+            following = argument[index + 1]
+            current.append(following if following == delimiter else char + following)
+            index += 2
+            continue
+
+        if char == delimiter:
+            result.append(''.join(current))
+            current = []
+
+        else:
+            current.append(char)
+
+        index += 1
+
+    if len(result) < parts:
+        result.append(''.join(current))
+        current = []
+
+    result.extend([''] * (parts - len(result)))
+    result.append(argument[index:])
+
+    return result
+
+
+def replacementTemplate(replacement):
+    ''' Translates vim's replacement string into re's template syntax: & and \\0 are
+    the whole match, \\1-\\9 the groups, \\r a line break and \\& a literal &
+
+    @arg str replacement the replacement string typed after :s/pattern/
+
+    @ret str template the template for re.sub
+
+    '''
+
+    template = []
+    index = 0
+
+    while index < len(replacement):
+        char = replacement[index]
+
+        if char == '&':
+            template.append('\\g<0>')
+
+        elif char == '\\' and index + 1 < len(replacement):
+            index += 1
+            char = replacement[index]
+
+            if char.isdigit():
+                template.append('\\g<{0}>'.format(char))
+
+            elif char == 'r' or char == 'n':
+                template.append('\n')
+
+            elif char == 't':
+                template.append('\t')
+
+            elif char == '\\':
+                template.append('\\\\')
+
+            else:
+                template.append(char)
+
+        elif char == '\\':
+            template.append('\\\\')
+
+        else:
+            template.append(char)
+
+        index += 1
+
+    return ''.join(template)
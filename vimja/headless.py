@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Runs Vimja outside of Ninja-IDE.
+
+The editor is an offscreen QPlainTextEdit with the few Ninja-IDE editor methods Vimja
+uses, the editor service and locator are plain objects and Ninja-IDE's plugin module is
+replaced by a minimal stand-in when it isn't installed. Key traces are written in vim's
+notation (ex: '3dd/foo<CR>n<Esc>') and turned into the key events the IDE would send.
+
+Used by the benchmarks, requires PyQt4 and an offscreen capable Qt platform (ex:
+QT_QPA_PLATFORM=offscreen or a virtual X server).
+
+'''
+
+import re
+import sys
+import types
+
+from PyQt4.QtCore import QEvent
+from PyQt4.QtCore import Qt
+from PyQt4.QtGui import QApplication
+from PyQt4.QtGui import QKeyEvent
+from PyQt4.QtGui import QPlainTextEdit
+
+#<Name> keys of vim's notation and their Qt key and text
+SPECIAL_KEYS = {
+    'esc': (Qt.Key_Escape, ''),
+    'cr': (Qt.Key_Return, '\r'),
+    'enter': (Qt.Key_Enter, '\r'),
+    'return': (Qt.Key_Return, '\r'),
+    'bs': (Qt.Key_Backspace, '\b'),
+    'del': (Qt.Key_Delete, ''),
+    'tab': (Qt.Key_Tab, '\t'),
+    'space': (Qt.Key_Space, ' '),
+    'lt': (Qt.Key_Less, '<'),
+    'up': (Qt.Key_Up, ''),
+    'down': (Qt.Key_Down, ''),
+    'left': (Qt.Key_Left, ''),
+    'right': (Qt.Key_Right, ''),
+    'home': (Qt.Key_Home, ''),
+    'end': (Qt.Key_End, ''),
+}
+
+#modifiers of vim's notation (ex: <C-o>)
+MODIFIERS = {
+    'c': Qt.ControlModifier,
+    's': Qt.ShiftModifier,
+    'a': Qt.AltModifier,
+    'm': Qt.AltModifier,
+}
+
+#characters typed with shift on a US keyboard
+SHIFTED = '~!@#$%^&*()_+{}|:"<>?'
+
+TOKEN = re.compile(r'<([^<>]+)>|(.)', re.DOTALL)
+
+
+def parseKeys(trace):
+    ''' Turns a key trace in vim's notation into key presses
+
+    @arg str trace the keys (ex: 'gg3dd<Esc>/foo<CR>', '<C-o>', '<lt>')
+
+    @ret list keys (key, modifiers, text) tuples
+
+    '''
+
+    keys = []
+
+    for match in TOKEN.finditer(trace):
+        name, char = match.groups()
+
+        if name is not None:
+            parts = name.split('-')
+            modifiers = Qt.NoModifier
+
+            #<C-S-x>, a lone - is the key itself (<C-->)
+            while len(parts) > 1 and parts[0].lower() in MODIFIERS:
+                modifiers |= MODIFIERS[parts.pop(0).lower()]
+
+            keyName = '-'.join(parts) or '-'
+
+            if keyName.lower() in SPECIAL_KEYS:
+                key, text = SPECIAL_KEYS[keyName.lower()]
+
+            elif len(keyName) == 1:
+                key, text = charKey(keyName)
+
+                #control characters type no text
+                if modifiers & (Qt.ControlModifier | Qt.AltModifier):
+                    text = ''
+
+            else:
+                raise ValueError('Unknown key: <{0}>'.format(name))
+
+            keys.append((key, modifiers, text))
+
+        else:
+            key, text = charKey(char)
+            modifiers = Qt.ShiftModifier if shifted(char) else Qt.NoModifier
+            keys.append((key, modifiers, text))
+
+    return keys
+
+
+def charKey(char):
+    ''' @ret tuple (key, text) the Qt key of a printable character and its text '''
+
+    if char == '\n':
+        return SPECIAL_KEYS['cr']
+
+    return ord(char.upper()), char
+
+
+def shifted(char):
+    ''' @ret bool shifted whether the character is typed with shift '''
+
+    return char.isupper() or char in SHIFTED
+
+
+def keyEvents(keys):
+    ''' Builds the events the IDE sends for the key presses, shift is pressed on its
+    own first like it is on a real keyboard
+
+    @arg list keys (key, modifiers, text) tuples from parseKeys
+
+    @ret list events the QKeyEvents to be sent
+
+    '''
+
+    events = []
+
+    for key, modifiers, text in keys:
+        if modifiers & Qt.ShiftModifier:
+            events.append(QKeyEvent(QEvent.KeyPress, Qt.Key_Shift, Qt.ShiftModifier, ''))
+
+        events.append(QKeyEvent(QEvent.KeyPress, key, modifiers, text))
+
+    return events
+
+
+def stubNinja():
+    ''' Registers just enough of Ninja-IDE for Vimja to be imported '''
+
+    try:
+        import ninja_ide.core.plugin
+        return
+
+    except ImportError:
+        pass
+
+    def module(name, **attrs):
+        sys.modules[name] = types.ModuleType(name)
+        sys.modules[name].__dict__.update(attrs)
+        return sys.modules[name]
+
+    class Plugin(object):
+        def __init__(self, locator):
+            self.locator = locator
+
+    module('ninja_ide')
+    module('ninja_ide.core', plugin=module('ninja_ide.core.plugin', Plugin=Plugin))
+
+
+class HeadlessEditor(QPlainTextEdit):
+    ''' The parts of Ninja-IDE's editor that Vimja uses on top of QPlainTextEdit '''
+
+    def set_cursor_position(self, position):
+        cursor = self.textCursor()
+        cursor.setPosition(position)
+        self.setTextCursor(cursor)
+
+    def get_text(self):
+        return self.toPlainText()
+
+    def highlight_selected_word(self, word=None):
+        pass
+
+
+class Signal(object):
+    ''' A stand-in for the service's pyqtSignals. '''
+
+    def __init__(self):
+        self.slots = []
+
+    def connect(self, slot):
+        self.slots.append(slot)
+
+    def disconnect(self, slot):
+        self.slots.remove(slot)
+
+    def emit(self, *args):
+        for slot in list(self.slots):
+            slot(*args)
+
+
+class HeadlessEditorService(object):
+    ''' Ninja-IDE's editor service with a single, always current, editor. '''
+
+    def __init__(self, editor):
+        self.editor = editor
+        self.editorKeyPressEvent = Signal()
+        self.currentTabChanged = Signal()
+
+    def get_editor(self):
+        return self.editor
+
+
+class HeadlessLocator(object):
+    ''' Ninja-IDE's service locator, only the editor service is available. '''
+
+    def __init__(self, editorService):
+        self.editorService = editorService
+
+    def get_service(self, name):
+        return self.editorService if name == 'editor' else None
+
+
+def createVimja(text=''):
+    ''' Creates a Vimja in normal mode attached to an offscreen editor
+
+    @arg str text the text of the editor
+
+    @ret tuple (app, vimja, editor) the application, the plugin and the editor
+
+    '''
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    stubNinja()
+
+    from vimja import Vimja
+
+    editor = HeadlessEditor()
+    editor.setPlainText(text)
+
+    vimja = Vimja(HeadlessLocator(HeadlessEditorService(editor)))
+    vimja.initialize()
+
+    #the IDE's session is neither read nor overwritten
+    vimja.sessionPath = None
+
+    vimja.connectKeyPressHandler()
+    vimja.ensureKeyMap()
+    vimja.normalKeyEventMapper(Qt.Key_Escape)
+
+    return app, vimja, editor
+
+
+def replayKeys(editor, trace):
+    ''' Types the key trace into the editor, through Vimja's interceptor
+
+    @arg HeadlessEditor editor the editor Vimja is attached to
+    @arg str trace the keys in vim's notation
+
+    '''
+
+    app = QApplication.instance()
+
+    for event in keyEvents(parseKeys(trace)):
+        editor.keyPressEvent(event)
+
+        #the IDE's event loop runs between key presses
+        app.processEvents()
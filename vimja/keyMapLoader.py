@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Loads keyMap.json into a flat, validated list of bindings.
+
+The result is cached on disk next to the key map, keyed by the mtime and the hash of
+keyMap.json, so the json parsing and validation only happen when the file changes.
+
+'''
+
+import hashlib
+import json
+import marshal
+import os
+
+from collections import OrderedDict
+
+from keyTrie import parseKeySequence
+
+#bump whenever the layout of the cached bindings changes
+CACHE_VERSION = 4
+
+#binding contexts, buffer bindings take precedence over the normal ones in the
+#delete/yank modes
+NORMAL_CONTEXT = 'normal'
+BUFFER_CONTEXT = 'buffer'
+
+INT_FIELDS = ('N', 'CursorWidth')
+BOOL_FIELDS = ('isLine', 'after', 'Remove', 'Forward', 'Linewise', 'Inclusive',
+    'Inner', 'Jump')
+
+
+def normalizeDetails(details):
+    ''' Converts the string values of a keyMap.json object into their actual types
+
+    @arg dict details the json object of a binding
+
+    @ret dict details a copy of the object with ints and bools converted, names of
+        handlers, modes and operations are left as strings
+
+    '''
+
+    if 'Function' not in details or 'Key' not in details:
+        raise ValueError('Binding is missing "Function" or "Key": {0}'.format(details))
+
+    normalized = {}
+    for field, value in details.items():
+        field = str(field)
+
+        if field in INT_FIELDS:
+            value = int(value)
+
+        elif field in BOOL_FIELDS:
+            if value not in ('True', 'False'):
+                raise ValueError('{0} must be "True" or "False": {1}'.format(field,
+                    details))
+
+            value = value == 'True'
+
+        else:
+            value = str(value)
+
+        normalized[field] = value
+
+    return normalized
+
+
+def parseKeyMap(keyMap):
+    ''' Flattens and validates the key map, a binding set to null (only meaningful
+    in an override file) is kept with None details
+
+    @arg dict keyMap the key map as read from keyMap.json
+
+    @ret list bindings (context, sequence, details) tuples
+
+    '''
+
+    if not isinstance(keyMap, dict):
+        raise ValueError('The key map must be a json object')
+
+    bindings = []
+
+    for context, mapping in ((NORMAL_CONTEXT, keyMap),
+            (BUFFER_CONTEXT, keyMap.get('BUFFER_COMMANDS', {}))):
+        for keys, details in mapping.items():
+            if keys == 'BUFFER_COMMANDS':
+                continue
+
+            try:
+                sequence = parseKeySequence(keys)
+
+            except ValueError:
+                raise ValueError('Invalid key sequence: {0}'.format(keys))
+
+            bindings.append((context, sequence,
+                None if details is None else normalizeDetails(details)))
+
+    return bindings
+
+
+def readCache(cachePath):
+    ''' @ret dict cache the cached key map or None if it is missing or unreadable '''
+
+    try:
+        with open(cachePath, 'rb') as cacheFile:
+            cache = marshal.loads(cacheFile.read())
+
+    except (IOError, OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if not isinstance(cache, dict) or cache.get('version') != CACHE_VERSION:
+        return None
+
+    return cache
+
+
+def writeCache(cachePath, cache):
+    ''' Atomically writes the cache, failing silently since it is only an optimization '''
+
+    tmpPath = '{0}.tmp'.format(cachePath)
+
+    try:
+        with open(tmpPath, 'wb') as cacheFile:
+            cacheFile.write(marshal.dumps(cache))
+
+        if os.path.exists(cachePath):
+            os.remove(cachePath)
+
+        os.rename(tmpPath, cachePath)
+
+    except (IOError, OSError):
+        pass
+
+
+def loadKeyMap(path, cachePath=None):
+    ''' Gets the bindings of the given key map, using the cache when it is still valid
+
+    @arg filePath path Path to keyMap.json
+    @arg filePath cachePath Path to the cache, None disables the cache
+
+    @ret list bindings (context, sequence, details) tuples
+
+    '''
+
+    mtime = os.path.getmtime(path)
+    cache = readCache(cachePath) if cachePath is not None else None
+
+    #an untouched file doesn't even need to be read
+    if cache is not None and cache['mtime'] == mtime:
+        return cache['bindings']
+
+    with open(path, 'rb') as keyMapFile:
+        data = keyMapFile.read()
+
+    digest = hashlib.sha1(data).hexdigest()
+
+    if cache is not None and cache['sha1'] == digest:
+        bindings = cache['bindings']
+
+    else:
+        bindings = parseKeyMap(json.loads(data.decode('utf-8')))
+
+    if cachePath is not None:
+        writeCache(cachePath, {'version': CACHE_VERSION, 'mtime': mtime,
+            'sha1': digest, 'bindings': bindings})
+
+    return bindings
+
+
+def mergeBindings(bindings, overrides):
+    ''' Applies the bindings of an override file on top of the key map's
+
+    @arg list bindings (context, sequence, details) tuples of the key map
+    @arg list overrides (context, sequence, details) tuples replacing the ones with
+        the same context and sequence, None details removing them
+
+    @ret list bindings the merged (context, sequence, details) tuples
+
+    '''
+
+    merged = OrderedDict(((context, sequence), details)
+        for context, sequence, details in bindings)
+
+    for context, sequence, details in overrides:
+        merged[(context, sequence)] = details
+
+    return [(context, sequence, details)
+        for (context, sequence), details in merged.items() if details is not None]
+
+
+def loadBindings(path, overridePath=None, cachePath=None):
+    ''' Gets the bindings of the key map along with the user's overrides
+
+    @arg filePath path Path to keyMap.json
+    @arg filePath overridePath Path to the override file, it may not exist
+    @arg filePath cachePath Path to the cache of keyMap.json, None disables it
+
+    @ret list bindings (context, sequence, details) tuples
+
+    '''
+
+    overrides = []
+
+    if overridePath is not None and os.path.exists(overridePath):
+        with open(overridePath, 'rb') as overrideFile:
+            data = overrideFile.read()
+
+        try:
+            overrides = parseKeyMap(json.loads(data.decode('utf-8')))
+
+        except ValueError as e:
+            raise ValueError('{0}: {1}'.format(os.path.basename(overridePath), e))
+
+    return mergeBindings(loadKeyMap(path, cachePath), overrides)
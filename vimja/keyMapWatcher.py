@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Reloads the key map whenever keyMap.json or the user's override file changes.
+
+The files are watched with a QFileSystemWatcher, bursts of changes (editors saving
+in several steps) are gathered for RELOAD_DELAY milliseconds and the new key map is
+loaded, validated and compiled by a worker thread. The result is handed back on the
+GUI thread, between two key presses, as either the compiled bindings or the error
+that kept them from loading.
+
+'''
+
+import os
+import threading
+
+from traceback import format_exc as stackTrace
+
+from PyQt4.QtCore import QFileSystemWatcher
+from PyQt4.QtCore import QObject
+from PyQt4.QtCore import QTimer
+from PyQt4.QtCore import pyqtSignal
+
+from keyMapLoader import loadBindings
+
+#milliseconds to wait for the files to settle before reloading them
+RELOAD_DELAY = 200
+
+
+class KeyMapWatcher(QObject):
+    ''' Watches the key map files and compiles them again in the background. '''
+
+    #emitted on the GUI thread with the compiled bindings
+    reloaded = pyqtSignal(object)
+
+    #emitted on the GUI thread with the error of a key map that failed to load
+    failed = pyqtSignal(str)
+
+    #emitted by the worker thread with (generation, compiled bindings, error)
+    loaded = pyqtSignal(int, object, object)
+
+    def __init__(self, path, overridePath, cachePath, compileBindings,
+            delay=RELOAD_DELAY, parent=None):
+        ''' @arg filePath path Path to keyMap.json
+        @arg filePath overridePath Path to the user's override file, it may not exist
+        @arg filePath cachePath Path to the cache of keyMap.json
+        @arg func compileBindings turns the (context, sequence, details) bindings into
+            whatever reloaded carries, raising ValueError if they are not valid. It's
+            called from the worker thread.
+        @arg int delay milliseconds to wait for the files to settle
+
+        '''
+
+        QObject.__init__(self, parent)
+
+        self.path = path
+        self.overridePath = overridePath
+        self.cachePath = cachePath
+        self.compileBindings = compileBindings
+
+        #bumped for every reload so that the result of an older one is dropped
+        self.generation = 0
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay)
+        self.timer.timeout.connect(self.reload)
+
+        self.watcher = QFileSystemWatcher()
+        self.watcher.fileChanged.connect(self.fileChanged)
+        self.watcher.directoryChanged.connect(self.directoryChanged)
+
+        self.loaded.connect(self.loadFinished)
+
+    def start(self):
+        ''' Starts watching the key map, the override file and the directory the
+        latter is created in
+
+        '''
+
+        self.watcher.addPath(self.path)
+        self.watcher.addPath(os.path.dirname(self.overridePath) or '.')
+
+        if os.path.exists(self.overridePath):
+            self.watcher.addPath(self.overridePath)
+
+    def stop(self):
+        ''' Stops watching the files, a reload under way is dropped '''
+
+        self.timer.stop()
+        self.generation += 1
+
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+
+    def fileChanged(self, path):
+        ''' Schedules a reload, watching the file again if it was replaced rather
+        than written to (the watcher drops replaced files)
+
+        '''
+
+        if os.path.exists(path) and path not in self.watcher.files():
+            self.watcher.addPath(path)
+
+        self.timer.start()
+
+    def directoryChanged(self, path):
+        ''' Schedules a reload when the override file was created or deleted '''
+
+        watched = self.overridePath in self.watcher.files()
+
+        if os.path.exists(self.overridePath) != watched:
+            if not watched:
+                self.watcher.addPath(self.overridePath)
+
+            self.timer.start()
+
+    def reload(self):
+        ''' Loads and compiles the key map in a worker thread '''
+
+        self.generation += 1
+
+        worker = threading.Thread(target=self.load, name='vimja-keymap',
+            args=(self.generation,))
+        worker.daemon = True
+        worker.start()
+
+    def load(self, generation):
+        ''' Worker thread, loads, validates and compiles the key map '''
+
+        compiled = None
+        error = None
+
+        try:
+            compiled = self.compileBindings(loadBindings(self.path, self.overridePath,
+                self.cachePath))
+
+        except (ValueError, IOError, OSError) as e:
+            error = str(e)
+
+        #anything else is a binding the plugin can't compile (ex: an unknown mode)
+        except Exception:
+            error = stackTrace()
+
+        try:
+            self.loaded.emit(generation, compiled, error)
+
+        #the watcher is gone (ex: the IDE is shutting down)
+        except RuntimeError:
+            pass
+
+    def loadFinished(self, generation, compiled, error):
+        ''' Hands the result of the latest reload over to the plugin '''
+
+        if generation != self.generation:
+            return
+
+        if error is not None:
+            self.failed.emit(error)
+        else:
+            self.reloaded.emit(compiled)
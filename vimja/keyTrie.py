@@ -0,0 +1,279 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Prefix trie used by Vimja to dispatch multi key commands.
+
+Each key press advances the trie by exactly one node, a dead end resets it straight
+away and no intermediate string is ever built for the lookup.
+
+'''
+
+import time
+
+from numbers import Number
+
+#Qt's keyboard modifiers (Qt::KeyboardModifier), the keypad modifier is left out so
+#that the keypad's digits count like the other ones
+SHIFT = 0x02000000
+CONTROL = 0x04000000
+ALT = 0x08000000
+META = 0x10000000
+MODIFIER_MASK = SHIFT | CONTROL | ALT | META
+
+#names of the modifiers in keyMap.json
+MODIFIERS = {
+    'shift': SHIFT,
+    'ctrl': CONTROL,
+    'alt': ALT,
+    'meta': META,
+}
+
+#Qt key codes of the letters and of the first non printable key (Key_Escape)
+KEY_A = 0x41
+KEY_Z = 0x5a
+SPECIAL_KEYS = 0x01000000
+
+#keys that are only ever pressed along with other keys (shift, control, meta, alt,
+#caps lock, num lock, scroll lock and alt gr), they are never dispatched
+MODIFIER_KEYS = frozenset(range(0x01000020, 0x01000027)) | frozenset([0x01001103])
+
+
+def encodeKey(key, modifiers=0):
+    ''' Packs a key press into a single int, the key code along with the modifiers
+    held down. The shift of a symbol is dropped since the symbol has a key of its
+    own (ex: $ is Key_Dollar whatever the keyboard layout), the one of a letter is
+    kept (P is Shift+Key_P).
+
+    @arg int key the Qt key code (QKeyEvent.key())
+    @arg int modifiers the Qt keyboard modifiers (QKeyEvent.modifiers())
+
+    @ret int code the packed key
+
+    '''
+
+    modifiers = int(modifiers) & MODIFIER_MASK
+
+    if modifiers & SHIFT and not KEY_A <= key <= KEY_Z and key < SPECIAL_KEYS:
+        modifiers &= ~SHIFT
+
+    return key | modifiers
+
+
+def parseKeySequence(keys):
+    ''' Turns a keyMap.json index into a tuple of packed key codes
+
+    @arg mixed keys either a single key code or a comma delimited string of key codes,
+        each one optionally prefixed with modifiers (ex: "71,71", "Shift+80",
+        "Ctrl+79")
+
+    @ret tuple sequence the packed key codes that make up the sequence
+
+    '''
+
+    if isinstance(keys, Number):
+        return (int(keys),)
+
+    sequence = []
+    for key in str(keys).split(','):
+        parts = key.strip().split('+')
+        modifiers = 0
+
+        for name in parts[:-1]:
+            try:
+                modifiers |= MODIFIERS[name.strip().lower()]
+
+            except KeyError:
+                raise ValueError('Unknown modifier: {0}'.format(name))
+
+        code = int(parts[-1])
+
+        #modifier presses never reach the trie, they're part of the key they modify
+        if code in MODIFIER_KEYS:
+            raise ValueError('Modifier key {0} in "{1}", use Shift+key'.format(code,
+                keys))
+
+        sequence.append(encodeKey(code, modifiers))
+
+    return tuple(sequence)
+
+
+class KeyNode(object):
+    ''' A single node of the key sequence trie. '''
+
+    __slots__ = ('children', 'command')
+
+    def __init__(self):
+        self.children = {}
+        self.command = None
+
+
+class KeySequenceTrie(object):
+    ''' Compiled key sequence state machine.
+
+    A sequence that is both a command and the prefix of a longer command (an
+    ambiguous prefix) is held as pending until either the next key resolves it or
+    the optional timeout expires.
+
+    '''
+
+    def __init__(self, bindings=(), timeout=None, clock=time.time):
+        ''' Builds the trie
+
+        @arg iterable bindings (sequence, command) pairs to be inserted
+        @arg float timeout seconds to wait on an ambiguous prefix, None waits forever
+        @arg func clock time source used for the timeout
+
+        '''
+
+        self.root = KeyNode()
+        self.timeout = timeout
+        self.clock = clock
+
+        self.node = self.root
+        self.pending = None
+        self.pendingSince = 0
+        self.queued = None
+
+        for sequence, command in bindings:
+            self.insert(sequence, command)
+
+    def clone(self):
+        ''' Creates an idle trie sharing this one's nodes, so that several key
+        sequences (ex: one per editor) can be followed at once
+
+        @ret KeySequenceTrie trie the new trie
+
+        '''
+
+        trie = KeySequenceTrie(timeout=self.timeout, clock=self.clock)
+        trie.root = trie.node = self.root
+
+        return trie
+
+    def insert(self, sequence, command):
+        ''' Adds a command to the trie
+
+        @arg tuple sequence the key codes that trigger the command
+        @arg mixed command the object returned once the sequence is matched
+
+        '''
+
+        node = self.root
+        for key in sequence:
+            node = node.children.setdefault(key, KeyNode())
+
+        node.command = command
+
+    def remove(self, sequence):
+        ''' Removes the command of the sequence, pruning the nodes left empty
+
+        @arg tuple sequence the key codes of the command
+
+        '''
+
+        path = [self.root]
+        for key in sequence:
+            node = path[-1].children.get(key)
+            if node is None:
+                return
+
+            path.append(node)
+
+        path[-1].command = None
+
+        for index in range(len(sequence), 0, -1):
+            node = path[index]
+            if node.children or node.command is not None:
+                break
+
+            del path[index - 1].children[sequence[index - 1]]
+
+    def reset(self):
+        ''' Moves the trie back to its root and drops any pending command '''
+
+        self.node = self.root
+        self.pending = None
+
+    def isIdle(self):
+        ''' @ret bool True if no partial sequence has been entered '''
+
+        return self.node is self.root
+
+    def advance(self, key):
+        ''' Advances the trie by one key
+
+        @arg int key the key that was just pressed
+
+        @ret mixed command the matched command or None if the sequence is incomplete
+            or unmapped. If a pending command was resolved and the new key completed
+            a command as well, the latter is available through popQueued.
+
+        '''
+
+        pending = self.pending
+        if pending is not None and self.timeout is not None and \
+                self.clock() - self.pendingSince >= self.timeout:
+            self.reset()
+            self.queued = self.enter(self.root.children.get(key))
+            return pending
+
+        node = self.node.children.get(key)
+
+        if node is None:
+            wasIdle = self.node is self.root
+            self.reset()
+
+            if pending is not None:
+                self.queued = self.enter(self.root.children.get(key))
+                return pending
+
+            #a dead end part way through a sequence might still be the start of a new one
+            if wasIdle:
+                return None
+
+            node = self.root.children.get(key)
+
+        return self.enter(node)
+
+    def enter(self, node):
+        ''' Moves the trie into the given node
+
+        @arg KeyNode node the node reached by the last key (None for a dead end)
+
+        @ret mixed command the matched command, None if more keys are needed
+
+        '''
+
+        if node is None:
+            return None
+
+        if not node.children:
+            self.reset()
+            return node.command
+
+        self.node = node
+        self.pending = node.command
+        self.pendingSince = self.clock()
+
+        return None
+
+    def expire(self):
+        ''' Resolves the pending command once the timeout has elapsed
+
+        @ret mixed command the pending command or None if there is nothing to resolve
+
+        '''
+
+        pending = self.pending
+        if pending is None or self.timeout is None or \
+                self.clock() - self.pendingSince < self.timeout:
+            return None
+
+        self.reset()
+        return pending
+
+    def popQueued(self):
+        ''' @ret mixed command the command queued behind a resolved pending command '''
+
+        queued, self.queued = self.queued, None
+        return queued
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Logging handlers that keep disk I/O off of the GUI thread.
+
+Records are handed to a background thread through a queue, only their message is
+merged with its arguments beforehand (they may change by the time the thread formats
+the record). The thread keeps them in a bounded ring buffer and only writes them to
+disk when a warning comes in or when a dump is requested.
+
+'''
+
+import logging
+import threading
+
+from collections import deque
+
+try:
+    from Queue import Queue
+
+except ImportError:
+    from queue import Queue
+
+
+class QueueHandler(logging.Handler):
+    ''' Puts the records on a queue, the formatting is left to the listener '''
+
+    def __init__(self, queue):
+        logging.Handler.__init__(self)
+        self.queue = queue
+
+    def prepare(self, record):
+        ''' Merges the arguments and the traceback into the record's message while
+        they are as they were logged (ex: a dict the plugin goes on to change)
+
+        @arg logging.LogRecord record the record being logged
+
+        @ret logging.LogRecord record the record without arguments
+
+        '''
+
+        record.msg = record.getMessage()
+        record.args = None
+
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+    def emit(self, record):
+        self.queue.put_nowait(self.prepare(record))
+
+
+class QueueListener(object):
+    ''' Background thread passing the queued records on to a handler '''
+
+    #put on the queue to stop the thread once everything before it was handled
+    STOP = object()
+
+    def __init__(self, handler):
+        ''' @arg logging.Handler handler the handler that receives the records '''
+
+        self.queue = Queue()
+        self.handler = handler
+        self.thread = None
+
+    def start(self):
+        ''' Starts the background thread '''
+
+        self.thread = threading.Thread(target=self.monitor, name='vimja-log')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def monitor(self):
+        ''' Handles records until STOP is received '''
+
+        while True:
+            record = self.queue.get()
+
+            if record is self.STOP:
+                break
+
+            try:
+                if callable(record):
+                    record()
+
+                else:
+                    self.handler.handle(record)
+
+            except Exception:
+                self.handler.handleError(record)
+
+    def call(self, function):
+        ''' Runs the function on the listener thread after the records queued so far
+
+        @arg func function function that takes no arguments
+
+        '''
+
+        self.queue.put_nowait(function)
+
+    def stop(self):
+        ''' Handles the remaining records and stops the background thread '''
+
+        if self.thread is not None:
+            self.queue.put_nowait(self.STOP)
+            self.thread.join()
+            self.thread = None
+
+
+class RingBufferHandler(logging.Handler):
+    ''' Keeps the last records in memory and writes them to the target handler only
+    when a record at or above flushLevel is handled or when dump is called.
+
+    '''
+
+    def __init__(self, capacity, target, flushLevel=logging.WARNING):
+        ''' @arg int capacity the number of records that are kept
+        @arg logging.Handler target the handler the records are dumped to
+        @arg int flushLevel the level that triggers a dump
+
+        '''
+
+        logging.Handler.__init__(self)
+        self.buffer = deque(maxlen=capacity)
+        self.target = target
+        self.flushLevel = flushLevel
+
+    def emit(self, record):
+        self.buffer.append(record)
+
+        if record.levelno >= self.flushLevel:
+            self.dump()
+
+    def dump(self):
+        ''' Writes all the buffered records to the target and clears the buffer '''
+
+        self.acquire()
+
+        try:
+            while self.buffer:
+                self.target.handle(self.buffer.popleft())
+
+            self.target.flush()
+
+        finally:
+            self.release()
+
+    def close(self):
+        self.dump()
+        self.target.close()
+        logging.Handler.close(self)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Marks (ma, 'a, `a) and the jumplist (Ctrl-O, Ctrl-I) of a QTextDocument.
+
+Marks are document offsets kept sorted, along with their keys, in two parallel
+lists. The document's contentsChange notifications shift them: an edit bisects to the
+first mark at or after it and only moves the marks from there on, so an edit costs
+O(log n + k) for the k marks after it instead of a pass over all of them. The
+jumplist is a capped list of marks, so its entries follow the edits as well.
+
+'''
+
+from bisect import bisect_left
+from bisect import bisect_right
+
+#the mark of the position before the latest jump ('' and ``)
+CONTEXT_MARK = "'"
+
+#positions kept in the jumplist
+JUMPLIST_SIZE = 100
+
+
+class MarkIndex(object):
+    ''' Named and jumplist positions of a document, adjusted as it's edited. '''
+
+    def __init__(self, jumplistSize=JUMPLIST_SIZE):
+        ''' @arg int jumplistSize the number of jumps kept, older ones are dropped '''
+
+        self.document = None
+
+        #sorted offsets and the key of the mark at each of them
+        self.positions = []
+        self.keys = []
+
+        #key -> offset
+        self.marks = {}
+
+        #keys of the jumplist marks, oldest first, and the entry Ctrl-O/Ctrl-I are at
+        #(len(jumps) when not walking the list)
+        self.jumps = []
+        self.jumpIndex = 0
+        self.jumpSerial = 0
+        self.jumplistSize = jumplistSize
+
+    def attach(self, document):
+        ''' Follows the edits of the given document, the marks of the previous one
+        are dropped
+
+        @arg QTextDocument document the document the marks are in
+
+        '''
+
+        if document is self.document:
+            return
+
+        if self.document is not None:
+            try:
+                self.document.contentsChange.disconnect(self.documentChanged)
+
+            except (TypeError, RuntimeError):
+                pass
+
+        self.document = document
+        self.positions = []
+        self.keys = []
+        self.marks = {}
+        self.jumps = []
+        self.jumpIndex = 0
+        document.contentsChange.connect(self.documentChanged)
+
+    def documentChanged(self, position, removed, added):
+        ''' Shifts the marks after the edit, the ones in the replaced text stay in
+        the new text (at its end at most)
+
+        '''
+
+        positions = self.positions
+        marks = self.marks
+        keys = self.keys
+
+        start = bisect_left(positions, position)
+        end = bisect_left(positions, position + removed)
+
+        #(position, removed, added) with removed == added is also sent for formatting
+        #changes, those marks don't move
+        for index in range(start, end):
+            if positions[index] > position + added:
+                positions[index] = marks[keys[index]] = position + added
+
+        delta = added - removed
+        if delta:
+            for index in range(end, len(positions)):
+                positions[index] += delta
+                marks[keys[index]] += delta
+
+    def get(self, key):
+        ''' @ret int position the offset of the mark or None if it isn't set '''
+
+        return self.marks.get(key)
+
+    def set(self, key, position):
+        ''' Sets (or moves) the mark
+
+        @arg mixed key the mark's name (ex: 'a') or a jumplist key
+        @arg int position the document offset
+
+        '''
+
+        self.remove(key)
+
+        index = bisect_right(self.positions, position)
+        self.positions.insert(index, position)
+        self.keys.insert(index, key)
+        self.marks[key] = position
+
+    def remove(self, key):
+        ''' Removes the mark if it's set '''
+
+        position = self.marks.pop(key, None)
+        if position is None:
+            return
+
+        index = bisect_left(self.positions, position)
+        while self.keys[index] != key:
+            index += 1
+
+        del self.positions[index]
+        del self.keys[index]
+
+    def pushJump(self, position):
+        ''' Adds the position at the end of the jumplist, dropping an older entry at
+        the same position and the oldest one once the list is full
+
+        @arg int position the offset jumped from
+
+        '''
+
+        for key in self.jumps:
+            if self.marks[key] == position:
+                self.jumps.remove(key)
+                self.remove(key)
+                break
+
+        self.jumpSerial += 1
+        key = ('jump', self.jumpSerial)
+        self.set(key, position)
+        self.jumps.append(key)
+
+        if len(self.jumps) > self.jumplistSize:
+            self.remove(self.jumps.pop(0))
+
+        self.jumpIndex = len(self.jumps)
+
+    def jump(self, position, count):
+        ''' Walks the jumplist, back for a negative count (Ctrl-O) and forward for a
+        positive one (Ctrl-I)
+
+        @arg int position the cursor's offset, added to the list when walking back
+            from its end so that Ctrl-I can return to it
+        @arg int count the number of entries to move over
+
+        @ret int position the offset of the entry reached or None
+
+        '''
+
+        if count < 0 and self.jumpIndex == len(self.jumps):
+            self.pushJump(position)
+            self.jumpIndex = len(self.jumps) - 1
+
+        index = self.jumpIndex + count
+        if not 0 <= index < len(self.jumps):
+            return None
+
+        self.jumpIndex = index
+
+        return self.marks[self.jumps[index]]
@@ -0,0 +1,361 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Index of every match of a confirmed search, along the lines of vim's hlsearch.
+
+The full scan runs in a worker thread over a snapshot of the document, edits only
+rescan the blocks that changed and the highlighting is only applied to the blocks
+that are visible in the editor's viewport. Edits made while the worker runs only mark
+the index stale, the document is scanned again once, when the worker is done.
+
+'''
+
+import threading
+
+from bisect import bisect_left
+from bisect import bisect_right
+
+from PyQt4.QtCore import QObject
+from PyQt4.QtCore import pyqtSignal
+from PyQt4.QtGui import QColor
+from PyQt4.QtGui import QTextCharFormat
+from PyQt4.QtGui import QTextCursor
+from PyQt4.QtGui import QTextEdit
+from PyQt4.QtGui import QTextFormat
+
+#format property marking the extra selections that belong to the search highlighting
+SEARCH_PROPERTY = QTextFormat.UserProperty + 1
+
+HIGHLIGHT_COLOR = QColor(255, 230, 0, 160)
+
+#format property and color of the match of the search being typed
+MATCH_PROPERTY = QTextFormat.UserProperty + 2
+
+MATCH_COLOR = QColor(255, 150, 0, 200)
+
+
+class MatchIndex(QObject):
+    ''' Match offsets of a single pattern in a single document, kept per block. '''
+
+    #emitted on the GUI thread whenever the matches changed
+    updated = pyqtSignal()
+
+    #emitted by the worker thread with (generation, blockMatches)
+    scanned = pyqtSignal(int, object)
+
+    def __init__(self, parent=None):
+        QObject.__init__(self, parent)
+
+        self.document = None
+        self.pattern = None
+
+        #bumped for every new scan so that stale worker results are dropped
+        self.generation = 0
+        self.building = False
+
+        #the text being scanned by the worker and whether it was edited since
+        self.snapshot = None
+        self.stale = False
+
+        #list with the (start, end) block relative matches of each block, None
+        #until the first scan finished
+        self.blockMatches = None
+
+        #sorted block numbers that have matches and the running match count before
+        #each of them, derived from blockMatches on demand
+        self.matchedBlocks = None
+        self.matchCounts = None
+
+        self.scanned.connect(self.scanFinished)
+
+    def isReady(self, pattern=None):
+        ''' @ret bool True if the index is complete (for the given pattern) '''
+
+        return self.blockMatches is not None and not self.building and \
+            (pattern is None or pattern is self.pattern)
+
+    def build(self, document, pattern):
+        ''' Starts indexing the matches of the pattern in a worker thread
+
+        @arg QTextDocument document the document to be indexed
+        @arg RegexObject pattern the compiled search pattern
+
+        '''
+
+        if document is not self.document:
+            if self.document is not None:
+                try:
+                    self.document.contentsChange.disconnect(self.documentChanged)
+
+                except (TypeError, RuntimeError):
+                    pass
+
+            self.document = document
+            document.contentsChange.connect(self.documentChanged)
+
+        self.pattern = pattern
+        self.rescan()
+
+    def rescan(self):
+        ''' Scans a snapshot of the whole document in a worker thread '''
+
+        self.generation += 1
+        self.building = True
+        self.stale = False
+        self.snapshot = self.document.toPlainText()
+        self.blockMatches = None
+        self.matchedBlocks = None
+
+        worker = threading.Thread(target=self.scan, name='vimja-search',
+            args=(self.generation, self.pattern, self.snapshot))
+        worker.daemon = True
+        worker.start()
+
+    def scan(self, generation, pattern, snapshot):
+        ''' Worker thread, finds the matches of every line of the snapshot '''
+
+        finditer = pattern.finditer
+        blockMatches = [[match.span() for match in finditer(line)]
+            for line in snapshot.split('\n')]
+
+        try:
+            self.scanned.emit(generation, blockMatches)
+
+        #the index is gone (ex: the IDE is shutting down)
+        except RuntimeError:
+            pass
+
+    def scanFinished(self, generation, blockMatches):
+        ''' Installs the result of the worker thread if it is still current '''
+
+        if generation != self.generation:
+            return
+
+        self.snapshot = None
+
+        #the document was edited during the scan, however many times
+        if self.stale:
+            self.rescan()
+            return
+
+        self.building = False
+        self.blockMatches = blockMatches
+        self.updated.emit()
+
+    def clear(self):
+        ''' Forgets the pattern and its matches '''
+
+        self.generation += 1
+        self.building = False
+        self.snapshot = None
+        self.stale = False
+        self.pattern = None
+        self.blockMatches = None
+        self.matchedBlocks = None
+        self.updated.emit()
+
+    def documentChanged(self, position, removed, added):
+        ''' Rescans only the blocks touched by an edit '''
+
+        if self.pattern is None:
+            return
+
+        #the snapshot being scanned is out of date, it's scanned again once the
+        #worker is done
+        if self.building:
+            if not self.stale and not self.unchanged(position, removed, added):
+                self.stale = True
+
+            return
+
+        if self.blockMatches is None:
+            return
+
+        document = self.document
+        end = min(position + added, document.characterCount() - 1)
+
+        first = document.findBlock(position).blockNumber()
+        last = document.findBlock(end).blockNumber()
+
+        #blocks that were added or removed by the edit shift the ones after it
+        oldLast = last - (document.blockCount() - len(self.blockMatches))
+
+        finditer = self.pattern.finditer
+        block = document.findBlockByNumber(first)
+        changed = []
+        for _ in range(first, last + 1):
+            changed.append([match.span() for match in finditer(block.text())])
+            block = block.next()
+
+        self.blockMatches[first:oldLast + 1] = changed
+        self.matchedBlocks = None
+        self.updated.emit()
+
+    def unchanged(self, position, removed, added):
+        ''' @ret bool True if the text of the change is the snapshot's (ex: the
+            highlighter formatting the text sends (position, n, n) changes)
+
+        '''
+
+        if removed != added:
+            return False
+
+        cursor = QTextCursor(self.document)
+        cursor.setPosition(position)
+        cursor.setPosition(min(position + added, self.document.characterCount() - 1),
+            QTextCursor.KeepAnchor)
+
+        return cursor.selectedText().replace(u'\u2029', '\n') == \
+            self.snapshot[position:position + added]
+
+    def summary(self):
+        ''' Builds the sorted offset index from the per block matches
+
+        @ret tuple (matchedBlocks, matchCounts) the sorted block numbers with matches
+            and the number of matches before each of them (the last item being the
+            total number of matches)
+
+        '''
+
+        if self.matchedBlocks is None:
+            self.matchedBlocks = []
+            self.matchCounts = [0]
+
+            total = 0
+            for number, matches in enumerate(self.blockMatches):
+                if matches:
+                    total += len(matches)
+                    self.matchedBlocks.append(number)
+                    self.matchCounts.append(total)
+
+        return self.matchedBlocks, self.matchCounts
+
+    def count(self):
+        ''' @ret int total the number of matches in the document '''
+
+        return self.summary()[1][-1]
+
+    def step(self, position, forward=True, count=1):
+        ''' Gets the count'th match after (or before) the position, wrapping around
+
+        @arg int position the cursor position
+        @arg bool forward True for the next match (n), False for the previous one (N)
+        @arg int count how many matches to step over
+
+        @ret tuple (start, end, number) the document offsets of the match and its
+            1-based number, None if there are no matches
+
+        '''
+
+        matchedBlocks, matchCounts = self.summary()
+        total = matchCounts[-1]
+
+        if not total:
+            return None
+
+        block = self.document.findBlock(position)
+        blockNumber = block.blockNumber()
+        column = position - block.position()
+
+        #the number of matches before the cursor
+        before = matchCounts[bisect_left(matchedBlocks, blockNumber)]
+
+        starts = [start for start, _ in self.blockMatches[blockNumber]]
+        if forward:
+            index = before + bisect_right(starts, column) + count - 1
+        else:
+            index = before + bisect_left(starts, column) - count
+
+        return self.nth(index % total)
+
+    def nth(self, index):
+        ''' @ret tuple (start, end, number) the document offsets of the index'th match '''
+
+        matchedBlocks, matchCounts = self.summary()
+
+        i = bisect_right(matchCounts, index) - 1
+        number = matchedBlocks[i]
+
+        position = self.document.findBlockByNumber(number).position()
+        start, end = self.blockMatches[number][index - matchCounts[i]]
+
+        return position + start, position + end, index + 1
+
+
+def visibleBlocks(editor):
+    ''' Iterates over the blocks that are visible in the editor's viewport
+
+    @arg QPlainTextEdit editor the editor
+
+    '''
+
+    block = editor.firstVisibleBlock()
+    offset = editor.contentOffset()
+    height = editor.viewport().height()
+
+    while block.isValid():
+        if editor.blockBoundingGeometry(block).translated(offset).top() > height:
+            break
+
+        yield block
+        block = block.next()
+
+
+def highlightMatch(editor, match):
+    ''' Highlights the match of the search being typed in place of the previous one,
+    the editor's other extra selections are left untouched
+
+    @arg QPlainTextEdit editor the editor showing the document
+    @arg tuple match (start, end) the document offsets of the match, None only
+        removes the highlighting
+
+    '''
+
+    selections = [selection for selection in editor.extraSelections()
+        if not selection.format.property(MATCH_PROPERTY)]
+
+    if match is not None:
+        highlight = QTextCharFormat()
+        highlight.setBackground(MATCH_COLOR)
+        highlight.setProperty(MATCH_PROPERTY, True)
+
+        selection = QTextEdit.ExtraSelection()
+        selection.format = highlight
+        selection.cursor = QTextCursor(editor.document())
+        selection.cursor.setPosition(match[0])
+        selection.cursor.setPosition(match[1], QTextCursor.KeepAnchor)
+        selections.append(selection)
+
+    editor.setExtraSelections(selections)
+
+
+def highlightViewport(editor, index):
+    ''' Highlights the indexed matches of the visible blocks, the editor's own extra
+    selections are left untouched
+
+    @arg QPlainTextEdit editor the editor showing the document
+    @arg MatchIndex index the matches to be highlighted
+
+    '''
+
+    selections = [selection for selection in editor.extraSelections()
+        if not selection.format.property(SEARCH_PROPERTY)]
+
+    if index.isReady():
+        highlight = QTextCharFormat()
+        highlight.setBackground(HIGHLIGHT_COLOR)
+        highlight.setProperty(SEARCH_PROPERTY, True)
+
+        document = editor.document()
+        for block in visibleBlocks(editor):
+            position = block.position()
+
+            for start, end in index.blockMatches[block.blockNumber()]:
+                selection = QTextEdit.ExtraSelection()
+                selection.format = highlight
+                selection.cursor = QTextCursor(document)
+                selection.cursor.setPosition(position + start)
+                selection.cursor.setPosition(position + end, QTextCursor.KeepAnchor)
+                selections.append(selection)
+
+    editor.setExtraSelections(selections)
@@ -0,0 +1,337 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Vim's registers and a yank history ring, kept within a byte budget.
+
+The text is stored encoded (and compressed once it is large) and only decoded when it
+is pasted. Every entry is accounted once however many registers refer to it (ex: a
+yank is both "0 and the newest entry of the ring) and the least recently used entries
+are dropped once the budget is exceeded, the unnamed register always survives.
+
+'''
+
+import zlib
+
+from collections import OrderedDict
+
+#the register used when none is given, it refers to the last yank or delete
+UNNAMED = '"'
+
+#last yank
+YANKED = '0'
+
+#small deletes (within a line)
+SMALL_DELETE = '-'
+
+#deletes of lines, "1 being the newest and "9 the oldest
+DELETES = tuple('123456789')
+
+#bytes stored at most, all registers included
+DEFAULT_BUDGET = 16 * 1024 * 1024
+
+#texts of this many bytes or more are stored compressed
+COMPRESS_THRESHOLD = 64 * 1024
+
+#number of yanks kept in the history ring
+RING_SIZE = 32
+
+#line separators of QTextCursor.selectedText() and of plain text
+LINE_SEPARATORS = (u'\u2029', '\n')
+
+
+class Register(object):
+    ''' The stored text of one yank or delete. '''
+
+    __slots__ = ('data', 'compressed', 'isLine', 'size', 'refs', 'load')
+
+    def __init__(self, text, isLine, compressThreshold=COMPRESS_THRESHOLD):
+        ''' @arg str text the yanked/deleted text
+        @arg bool isLine True if the text is made up of whole lines
+        @arg int compressThreshold the size from which the text is compressed
+
+        '''
+
+        data = text.encode('utf-8')
+
+        self.compressed = len(data) >= compressThreshold
+        self.data = zlib.compress(data, 1) if self.compressed else data
+        self.isLine = isLine
+        self.size = len(self.data)
+
+        #number of names the register is stored under
+        self.refs = 0
+
+        #reads the data of a register restored from the session, None once it's read
+        self.load = None
+
+    @classmethod
+    def stored(cls, size, compressed, isLine, load):
+        ''' Creates a register whose data is only read when it's first needed (ex:
+        restored from the session file)
+
+        @arg int size the number of bytes of the stored data
+        @arg bool compressed True if the data is compressed
+        @arg bool isLine True if the text is made up of whole lines
+        @arg func load returns the stored data
+
+        @ret Register register the register
+
+        '''
+
+        register = cls.__new__(cls)
+        register.data = None
+        register.compressed = compressed
+        register.isLine = isLine
+        register.size = size
+        register.refs = 0
+        register.load = load
+
+        return register
+
+    def payload(self):
+        ''' @ret bytes data the stored (encoded, maybe compressed) data '''
+
+        if self.load is not None:
+            self.data, self.load = self.load(), None
+
+        return self.data
+
+    def text(self):
+        ''' @ret str text the decoded text '''
+
+        data = self.payload()
+        if self.compressed:
+            data = zlib.decompress(data)
+
+        return data.decode('utf-8')
+
+
+class RegisterStore(object):
+    ''' All the registers of the plugin along with the yank ring. '''
+
+    def __init__(self, budget=DEFAULT_BUDGET, compressThreshold=COMPRESS_THRESHOLD,
+            ringSize=RING_SIZE):
+        ''' @arg int budget the number of bytes stored at most
+        @arg int compressThreshold the size from which texts are compressed
+        @arg int ringSize the number of yanks kept in the history ring
+
+        '''
+
+        self.budget = budget
+        self.compressThreshold = compressThreshold
+        self.ringSize = ringSize
+
+        #name -> Register, least recently used first. The ring's entries are stored
+        #under (ring, serial) names
+        self.registers = OrderedDict()
+        self.ring = []
+        self.serial = 0
+
+        #bytes taken by the distinct registers
+        self.size = 0
+
+    def __contains__(self, name):
+        return self.resolve(name) in self.registers
+
+    def resolve(self, name):
+        ''' @ret str name the name the register is stored under (A-Z append to a-z) '''
+
+        if name is None:
+            return UNNAMED
+
+        return name.lower()
+
+    def get(self, name=None):
+        ''' Gets the text of a register
+
+        @arg str name the register's name, None for the unnamed register
+
+        @ret tuple (text, isLine) the decoded text or None if the register is empty
+
+        '''
+
+        register = self.touch(self.resolve(name))
+
+        if register is None:
+            return None
+
+        return register.text(), register.isLine
+
+    def yank(self, text, isLine, name=None):
+        ''' Stores yanked text in the register ("0 when no register is given) and in
+        the yank ring
+
+        @arg str text the yanked text
+        @arg bool isLine True if the text is made up of whole lines
+        @arg str name the register given with "x, None if there was none
+
+        '''
+
+        register = self.write(name or YANKED, text, isLine)
+
+        if register is not None:
+            self.serial += 1
+            ringName = ('ring', self.serial)
+            self.ring.append(ringName)
+            self.put(ringName, register)
+
+            if len(self.ring) > self.ringSize:
+                self.remove(self.ring[0])
+
+        self.evict()
+
+    def delete(self, text, isLine, name=None):
+        ''' Stores deleted text in the register or, when no register is given, shifts
+        it into "1-"9 (lines) or "-
+
+        @arg str text the deleted text
+        @arg bool isLine True if the text is made up of whole lines
+        @arg str name the register given with "x, None if there was none
+
+        '''
+
+        if name is not None:
+            self.write(name, text, isLine)
+
+        elif isLine or any(separator in text for separator in LINE_SEPARATORS):
+            #"1 -> "2 ... "8 -> "9, "9 is dropped
+            for older, newer in zip(reversed(DELETES[1:]), reversed(DELETES[:-1])):
+                register = self.registers.get(newer)
+
+                if register is None:
+                    self.remove(older)
+                else:
+                    self.put(older, register)
+
+            self.write(DELETES[0], text, isLine)
+
+        else:
+            self.write(SMALL_DELETE, text, isLine)
+
+        self.evict()
+
+    def history(self):
+        ''' @ret list registers the (text, isLine) of the yanks in the ring, newest
+            first '''
+
+        return [(self.registers[name].text(), self.registers[name].isLine)
+            for name in reversed(self.ring)]
+
+    def entries(self):
+        ''' @ret list entries the (name, register) of every register, least recently
+            used first, the yank ring's included '''
+
+        return list(self.registers.items())
+
+    def restore(self, entries):
+        ''' Stores the registers of a previous session, the ones set since then are
+        kept (and stay the most recently used ones)
+
+        @arg list entries (name, register) pairs, least recently used first
+
+        '''
+
+        current = list(self.registers)
+
+        #the restored yanks are older than this session's, their serials end at 0
+        serials = [name[1] for name, _ in entries if isinstance(name, tuple)]
+        last = max(serials) if serials else 0
+        ring = []
+
+        for name, register in entries:
+            if isinstance(name, tuple):
+                name = (name[0], name[1] - last)
+                ring.append(name)
+
+            elif name in self.registers:
+                continue
+
+            self.put(name, register)
+
+        self.ring = sorted(ring, key=lambda name: name[1]) + self.ring
+
+        for name in current:
+            self.touch(name)
+
+        while len(self.ring) > self.ringSize:
+            self.remove(self.ring[0])
+
+        self.evict()
+
+    def write(self, name, text, isLine):
+        ''' Stores the text in the register and makes it the unnamed one, upper case
+        names append to the register
+
+        @ret Register register the stored register
+
+        '''
+
+        key = self.resolve(name)
+
+        if key != name:
+            previous = self.registers.get(key)
+
+            if previous is not None:
+                previousText = previous.text()
+                if previous.isLine or isLine:
+                    previousText += '\n'
+
+                text = previousText + text
+                isLine = previous.isLine or isLine
+
+        register = Register(text, isLine, self.compressThreshold)
+
+        self.put(key, register)
+        self.put(UNNAMED, register)
+
+        return register
+
+    def put(self, name, register):
+        ''' Stores the register under the name, as the most recently used one '''
+
+        self.remove(name)
+
+        self.registers[name] = register
+        register.refs += 1
+
+        if register.refs == 1:
+            self.size += register.size
+
+    def remove(self, name):
+        ''' Drops the register stored under the name, if any '''
+
+        register = self.registers.pop(name, None)
+
+        if register is None:
+            return
+
+        register.refs -= 1
+
+        if register.refs == 0:
+            self.size -= register.size
+
+        if isinstance(name, tuple):
+            self.ring.remove(name)
+
+    def touch(self, name):
+        ''' Gets the register stored under the name and marks it as recently used '''
+
+        register = self.registers.pop(name, None)
+
+        if register is not None:
+            self.registers[name] = register
+
+        return register
+
+    def evict(self):
+        ''' Drops the least recently used registers until the budget is met '''
+
+        unnamed = self.registers.get(UNNAMED)
+
+        for name in list(self.registers):
+            if self.size <= self.budget:
+                break
+
+            #the text that would be pasted by p is kept whatever its size
+            if self.registers[name] is not unnamed:
+                self.remove(name)
@@ -0,0 +1,267 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Incremental, case insensitive search over the blocks of a QTextDocument.
+
+The document is never materialized as one string, each block's text is searched with
+a compiled pattern taken from a small LRU cache. Extending the query with plain
+characters restarts the search from the previous match and the list of all the
+matches used by n/N is cached until the document is edited.
+
+'''
+
+import re
+
+from bisect import bisect_left
+from bisect import bisect_right
+from collections import OrderedDict
+
+#number of compiled patterns kept around
+PATTERN_CACHE_SIZE = 32
+
+#characters with a meaning of their own in a regex, added to the query they can
+#make it match earlier (ex: ab to ab|c, x to x?)
+REGEX_METACHARACTERS = frozenset('.^$*+?{}[]()|\\')
+
+
+class IncrementalSearch(object):
+    ''' Search state of a single document. '''
+
+    def __init__(self, cacheSize=PATTERN_CACHE_SIZE):
+        ''' @arg int cacheSize the number of compiled patterns to keep '''
+
+        self.patterns = OrderedDict()
+        self.cacheSize = cacheSize
+
+        self.document = None
+
+        #the last incremental query and its match as (start, end) offsets
+        self.query = ''
+        self.match = None
+
+        #sorted offsets of all the matches of matchQuery, None when stale
+        self.matchQuery = None
+        self.matchStarts = None
+        self.matchEnds = None
+
+    def attach(self, document):
+        ''' Searches the given document from now on
+
+        @arg QTextDocument document the document to be searched
+
+        '''
+
+        if document is self.document:
+            return
+
+        if self.document is not None:
+            try:
+                self.document.contentsChange.disconnect(self.invalidate)
+
+            except (TypeError, RuntimeError):
+                pass
+
+        self.document = document
+        document.contentsChange.connect(self.invalidate)
+        self.invalidate()
+
+    def invalidate(self, position=0, removed=0, added=0):
+        ''' Drops everything computed from the document's old contents '''
+
+        self.match = None
+        self.matchStarts = None
+        self.matchEnds = None
+
+    def compile(self, query):
+        ''' Gets the compiled pattern of the query
+
+        @arg str query the regex being searched for
+
+        @ret RegexObject pattern the compiled pattern or None if the query is not (yet)
+            a valid regex
+
+        '''
+
+        pattern = self.patterns.pop(query, None)
+
+        if pattern is None:
+            try:
+                pattern = re.compile(query, re.IGNORECASE)
+
+            except re.error:
+                return None
+
+            if len(self.patterns) >= self.cacheSize:
+                self.patterns.popitem(last=False)
+
+        self.patterns[query] = pattern
+        return pattern
+
+    def find(self, pattern, position, limit=None):
+        ''' Finds the first match at or after the position, wrapping around the end of
+        the document
+
+        @arg RegexObject pattern the compiled pattern
+        @arg int position the document offset the search starts from
+        @arg int limit the offset the search stops at, without wrapping around (None
+            searches the whole document)
+
+        @ret tuple (start, end) the document offsets of the match or None
+
+        '''
+
+        startBlock = self.document.findBlock(position)
+        offset = position - startBlock.position()
+
+        block = startBlock
+        while block.isValid():
+            if limit is not None and block.position() >= limit:
+                return None
+
+            match = pattern.search(block.text(), offset)
+            if match is not None:
+                return block.position() + match.start(), block.position() + match.end()
+
+            offset = 0
+            block = block.next()
+
+        if limit is not None:
+            return None
+
+        #wrap around, nothing in the start block can be after the position anymore
+        block = self.document.begin()
+        while block.isValid():
+            match = pattern.search(block.text())
+            if match is not None:
+                return block.position() + match.start(), block.position() + match.end()
+
+            if block == startBlock:
+                break
+
+            block = block.next()
+
+        return None
+
+    def findBefore(self, pattern, position):
+        ''' Finds the last match starting before the position, wrapping around the
+        start of the document
+
+        @arg RegexObject pattern the compiled pattern
+        @arg int position the document offset the search goes back from
+
+        @ret tuple (start, end) the document offsets of the match or None
+
+        '''
+
+        startBlock = self.document.findBlock(position)
+        offset = position - startBlock.position()
+
+        block = startBlock
+        while block.isValid():
+            spans = [match.span() for match in pattern.finditer(block.text())
+                if offset is None or match.start() < offset]
+            if spans:
+                return block.position() + spans[-1][0], block.position() + spans[-1][1]
+
+            offset = None
+            block = block.previous()
+
+        #wrap around, the start block's matches after the position are the last ones
+        block = self.document.lastBlock()
+        while block.isValid():
+            spans = [match.span() for match in pattern.finditer(block.text())]
+            if spans:
+                return block.position() + spans[-1][0], block.position() + spans[-1][1]
+
+            if block == startBlock:
+                break
+
+            block = block.previous()
+
+        return None
+
+    def incremental(self, query, origin, limit=None):
+        ''' Finds the first match of the query being typed after the cursor, the one
+        under it is only found by wrapping around (like vim)
+
+        @arg str query the regex typed so far
+        @arg int origin the cursor position when the search was started
+        @arg int limit the offset the search stops at (see find)
+
+        @ret tuple (start, end) the document offsets of the match or None
+
+        '''
+
+        pattern = self.compile(query) if query else None
+
+        if pattern is None:
+            self.match = None
+
+        else:
+            #a query extended with plain characters can't match before the match of
+            #the shorter one
+            start = origin + 1
+            if self.match is not None and self.query and query.startswith(self.query) \
+                    and not REGEX_METACHARACTERS.intersection(query[len(self.query):]):
+                start = self.match[0]
+
+            self.match = self.find(pattern, start, limit)
+
+        self.query = query
+        return self.match
+
+    def matches(self, query):
+        ''' Gets the offsets of all the matches of the query
+
+        @arg str query the regex being searched for
+
+        @ret tuple (starts, ends) sorted lists of the match offsets
+
+        '''
+
+        if self.matchStarts is None or self.matchQuery != query:
+            starts = []
+            ends = []
+
+            pattern = self.compile(query) if query else None
+            block = self.document.begin() if pattern is not None else None
+
+            while block is not None and block.isValid():
+                position = block.position()
+
+                for match in pattern.finditer(block.text()):
+                    starts.append(position + match.start())
+                    ends.append(position + match.end())
+
+                block = block.next()
+
+            self.matchQuery = query
+            self.matchStarts = starts
+            self.matchEnds = ends
+
+        return self.matchStarts, self.matchEnds
+
+    def step(self, query, position, forward=True, count=1):
+        ''' Gets the count'th match after (or before) the position, wrapping around
+
+        @arg str query the regex being searched for
+        @arg int position the cursor position
+        @arg bool forward True for the next match (n), False for the previous one (N)
+        @arg int count how many matches to step over
+
+        @ret tuple (start, end) the document offsets of the match or None
+
+        '''
+
+        starts, ends = self.matches(query)
+
+        if not starts:
+            return None
+
+        if forward:
+            index = bisect_right(starts, position) + count - 1
+        else:
+            index = bisect_left(starts, position) - count
+
+        index %= len(starts)
+        return starts[index], ends[index]
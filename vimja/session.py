@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' The registers, marks and search history kept from one session to the next (vim's
+viminfo).
+
+The session file starts with a small header, the names of the registers, the marks
+of the files and the searches, followed by the data of every distinct register. Both
+the header and each register's data are records prefixed with their length, so that
+loading the session only reads the header: a register's data is read from the file
+the first time it is pasted. The file is written when the plugin is finished, by a
+background thread, to a temporary file that then replaces the previous one.
+
+'''
+
+import marshal
+import os
+import struct
+import tempfile
+import threading
+import zlib
+
+from registers import Register
+
+#first bytes of a session file, bump the version whenever the layout changes
+MAGIC = b'VIMJA'
+SESSION_VERSION = 1
+
+#length prefix of the records
+LENGTH = struct.Struct('>I')
+
+#files whose marks are kept at most, the most recently used ones
+MAX_FILES = 100
+
+
+def writeRecord(sessionFile, data):
+    ''' Writes the data prefixed with its length '''
+
+    sessionFile.write(LENGTH.pack(len(data)))
+    sessionFile.write(data)
+
+
+def readRecord(sessionFile):
+    ''' @ret bytes data the record at the current position of the file '''
+
+    prefix = sessionFile.read(LENGTH.size)
+    if len(prefix) != LENGTH.size:
+        raise EOFError('Truncated session record')
+
+    length, = LENGTH.unpack(prefix)
+    data = sessionFile.read(length)
+    if len(data) != length:
+        raise EOFError('Truncated session record')
+
+    return data
+
+
+class SessionStore(object):
+    ''' The contents of a session file, its registers are read on demand. '''
+
+    def __init__(self, path):
+        ''' @arg filePath path the session file, it's only read by load '''
+
+        self.path = path
+
+        #the open session file and the offset of each register's record
+        self.sessionFile = None
+        self.offsets = []
+        self.lock = threading.Lock()
+
+        #(name, register) least recently used first, path -> {mark: (line, column)}
+        #most recently used first, and the searches oldest first
+        self.registers = []
+        self.marks = []
+        self.searches = []
+
+    def load(self):
+        ''' Reads the header of the session file, a missing or unreadable file makes
+        for an empty session
+
+        @ret SessionStore session itself
+
+        '''
+
+        try:
+            sessionFile = open(self.path, 'rb')
+
+        except (IOError, OSError):
+            return self
+
+        try:
+            if sessionFile.read(len(MAGIC)) != MAGIC:
+                raise ValueError('Not a session file')
+
+            header = marshal.loads(readRecord(sessionFile))
+
+            if not isinstance(header, dict) or header.get('version') != SESSION_VERSION:
+                raise ValueError('Unknown session version')
+
+            registers = {}
+            for name, index, size, compressed, isLine in header['registers']:
+                #registers stored under several names (ex: "" and "0) are shared
+                register = registers.get(index)
+                if register is None:
+                    register = registers[index] = Register.stored(size, compressed,
+                        isLine, self.reader(index, compressed))
+
+                self.registers.append((name, register))
+
+            start = sessionFile.tell()
+            self.offsets = [start + offset for offset in header['offsets']]
+            self.marks = header['marks']
+            self.searches = header['searches']
+
+        except (IOError, OSError, EOFError, ValueError, TypeError, KeyError):
+            sessionFile.close()
+            self.registers = []
+            self.marks = []
+            self.searches = []
+            return self
+
+        self.sessionFile = sessionFile
+        return self
+
+    def reader(self, index, compressed):
+        ''' @ret func load reads the data of the register's record '''
+
+        def load():
+            try:
+                return self.read(index)
+
+            #a register whose data can't be read any more is pasted empty
+            except (IOError, OSError, EOFError, ValueError):
+                return zlib.compress(b'') if compressed else b''
+
+        return load
+
+    def read(self, index):
+        ''' @ret bytes data the data of the register's record '''
+
+        with self.lock:
+            if self.sessionFile is None:
+                raise ValueError('The session file is closed')
+
+            self.sessionFile.seek(self.offsets[index])
+            return readRecord(self.sessionFile)
+
+    def close(self):
+        ''' Closes the session file, the registers that weren't read stay empty '''
+
+        with self.lock:
+            if self.sessionFile is not None:
+                self.sessionFile.close()
+                self.sessionFile = None
+
+    def fileMarks(self, path):
+        ''' @ret dict marks the mark -> (line, column) of the file, empty if none '''
+
+        for filePath, marks in self.marks:
+            if filePath == path:
+                return marks
+
+        return {}
+
+    def save(self, registers, marks, searches, failed=None):
+        ''' Writes the session in a background thread, the file replaced is read
+        first for the registers that weren't used during the session
+
+        @arg list registers (name, register) pairs, least recently used first
+        @arg dict marks path -> {mark: (line, column)} of the files open now, they come
+            before the marks of the other files
+        @arg list searches the search history, oldest first
+        @arg func failed called with the error if the session couldn't be written
+
+        @ret Thread thread the thread writing the file
+
+        '''
+
+        fileMarks = list(marks.items())
+        fileMarks += [(path, previous) for path, previous in self.marks
+            if path not in marks]
+
+        def write():
+            try:
+                self.write(registers, fileMarks[:MAX_FILES], list(searches))
+
+            except Exception as e:
+                if failed is not None:
+                    failed(e)
+
+        #not a daemon, the interpreter waits for the file to be written on exit
+        thread = threading.Thread(target=write, name='vimja-session')
+        thread.start()
+
+        return thread
+
+    def write(self, registers, marks, searches):
+        ''' Writes the session file, see save '''
+
+        indices = {}
+        entries = []
+        payloads = []
+
+        for name, register in registers:
+            index = indices.get(id(register))
+            if index is None:
+                index = indices[id(register)] = len(payloads)
+                payloads.append(register.payload())
+
+            entries.append((name, index, register.size, register.compressed,
+                register.isLine))
+
+        #the previous file is done with once every register has been read from it
+        self.close()
+
+        #the records' offsets are counted from the end of the header
+        offsets = []
+        offset = 0
+        for data in payloads:
+            offsets.append(offset)
+            offset += LENGTH.size + len(data)
+
+        header = marshal.dumps({'version': SESSION_VERSION, 'registers': entries,
+            'marks': marks, 'searches': searches, 'offsets': offsets})
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        handle, tmpPath = tempfile.mkstemp(prefix='.vimja-', dir=directory)
+
+        try:
+            with os.fdopen(handle, 'wb') as sessionFile:
+                sessionFile.write(MAGIC)
+                writeRecord(sessionFile, header)
+
+                for data in payloads:
+                    writeRecord(sessionFile, data)
+
+            #os.replace only exists on python 3, os.rename replaces the file on posix
+            getattr(os, 'replace', os.rename)(tmpPath, self.path)
+
+        except Exception:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+            raise
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Opt-in latency instrumentation of the key handling.
+
+Every timed call lands in a fixed-size histogram of its command (power of two
+microsecond buckets), so the memory used doesn't grow with the number of key presses.
+A command can also be run under cProfile for its next N invocations.
+
+Nothing in here runs unless the plugin has a Stats object, see Vimja.vimjaStats.
+
+'''
+
+import cProfile
+import json
+
+from timeit import default_timer
+
+#bucket i holds the durations below 2^i microseconds (the last one everything above)
+BUCKETS = 24
+
+
+class Histogram(object):
+    ''' Durations of one command, in power of two microsecond buckets. '''
+
+    __slots__ = ('buckets', 'count', 'total', 'maximum')
+
+    def __init__(self):
+        self.buckets = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, seconds):
+        ''' @arg float seconds the duration of one call '''
+
+        self.buckets[min(int(seconds * 1e6).bit_length(), BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def percentile(self, fraction):
+        ''' @ret float seconds the upper bound of the bucket holding the percentile '''
+
+        rank = fraction * self.count
+        seen = 0
+
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min((1 << index) * 1e-6, self.maximum)
+
+        return self.maximum
+
+    def toDict(self):
+        ''' @ret dict histogram the json friendly summary of the histogram '''
+
+        return {'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'max': self.maximum,
+            'buckets': self.buckets}
+
+
+class Stats(object):
+    ''' Histograms and counters of the plugin's key handling. '''
+
+    def __init__(self, clock=default_timer):
+        ''' @arg func clock high resolution clock returning seconds '''
+
+        self.clock = clock
+        self.histograms = {}
+        self.counters = {}
+
+        #command name -> [profile, remaining invocations, onFinish]
+        self.profiles = {}
+
+    def time(self, name, function, *args):
+        ''' Calls the function, adding its duration to the named histogram
+
+        @arg str name the command (or handler) name the call is accounted to
+        @arg func function the function to be called
+        @arg list args the function's arguments
+
+        @ret mixed result whatever the function returned
+
+        '''
+
+        profile = self.profiles.get(name)
+
+        start = self.clock()
+        try:
+            if profile is None:
+                return function(*args)
+
+            return profile[0].runcall(function, *args)
+
+        finally:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+
+            histogram.add(self.clock() - start)
+
+            if profile is not None:
+                profile[1] -= 1
+
+                if profile[1] <= 0:
+                    del self.profiles[name]
+                    profile[2](name, profile[0])
+
+    def count(self, name):
+        ''' Increments the named counter (ex: misses, resets) '''
+
+        self.counters[name] = self.counters.get(name, 0) + 1
+
+    def profile(self, name, invocations, onFinish):
+        ''' Runs the next invocations of the command under cProfile
+
+        @arg str name the command's name
+        @arg int invocations the number of calls to be profiled
+        @arg func onFinish called with (name, cProfile.Profile) once they were made
+
+        '''
+
+        self.profiles[name] = [cProfile.Profile(), invocations, onFinish]
+
+    def toDict(self):
+        ''' @ret dict stats the json friendly histograms and counters '''
+
+        return {'histograms': dict((name, histogram.toDict())
+                for name, histogram in self.histograms.items()),
+            'counters': dict(self.counters)}
+
+    def dump(self, path):
+        ''' Writes the histograms and counters to a json file
+
+        @arg str path the file to be written
+
+        '''
+
+        with open(path, 'w') as statsFile:
+            json.dump(self.toDict(), statsFile, indent=4, sort_keys=True)
+
+    def report(self, limit=None):
+        ''' @ret list lines the commands, slowest p99 first, followed by the counters '''
+
+        histograms = sorted(self.histograms.items(),
+            key=lambda item: item[1].percentile(0.99), reverse=True)
+
+        lines = ['{0}: n={1} p50={2:.0f}us p99={3:.0f}us max={4:.0f}us'.format(name,
+                histogram.count, histogram.percentile(0.5) * 1e6,
+                histogram.percentile(0.99) * 1e6, histogram.maximum * 1e6)
+            for name, histogram in histograms[:limit]]
+
+        lines.extend('{0}={1}'.format(name, count)
+            for name, count in sorted(self.counters.items()))
+
+        return lines
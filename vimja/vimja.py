@@ -8,18 +8,63 @@ try:
 # ==============================================================================
 
     import os
+    import pstats
+    import re
+    from collections import OrderedDict
+    from weakref import WeakKeyDictionary
+    from weakref import ref
     from traceback import format_exc as stackTrace
 
-    from collections import Iterable
-    from collections import Mapping
+    try:
+        from StringIO import StringIO
+
+    except ImportError:
+        from io import StringIO
 
     from ninja_ide.core import plugin
-    from ninja_ide.tools import json_manager
 
     from PyQt4.QtCore import Qt
+    from PyQt4.QtCore import QTimer
+    from PyQt4.QtGui import QLabel
     from PyQt4.QtGui import QTextCursor
 
-    import re
+    from keyTrie import MODIFIER_KEYS
+    from keyTrie import KeySequenceTrie
+    from keyTrie import encodeKey
+
+    from editorState import EditorState
+
+    from exCommands import parseName
+    from exCommands import parseRange
+    from exCommands import replacementTemplate
+    from exCommands import splitDelimited
+
+    from commands import MoveCommand
+    from commands import compileCommand
+
+    from keyMapLoader import BUFFER_CONTEXT
+    from keyMapLoader import NORMAL_CONTEXT
+    from keyMapLoader import loadBindings
+
+    from keyMapWatcher import KeyMapWatcher
+
+    from logQueue import QueueHandler
+    from logQueue import QueueListener
+    from logQueue import RingBufferHandler
+
+    from registers import RegisterStore
+
+    from session import SessionStore
+
+    from stats import Stats
+
+    from matchIndex import highlightMatch
+    from matchIndex import highlightViewport
+    from matchIndex import visibleBlocks
+
+    from marks import CONTEXT_MARK
+
+    from completion import Completion
 
 # ==============================================================================
 # GLOBAL VARIABLES
@@ -28,13 +73,111 @@ try:
     LOG_FILE = 'vimja.log'
     PATH = os.path.dirname(__file__)
 
+    #the key map, the user's overrides of it (reloaded whenever either changes) and
+    #the compiled copy of the key map, rebuilt whenever it changes
+    KEY_MAP_FILE = 'keyMap.json'
+    USER_KEY_MAP_FILE = 'keyMap.user.json'
+    KEY_MAP_CACHE = 'keyMap.cache'
+
+    #commands the plugin can't do without, a key map missing them isn't loaded
+    REQUIRED_COMMANDS = ('Escape', 'i')
+
+    #seconds to wait for the rest of an ambiguous key sequence (None waits forever)
+    KEY_SEQUENCE_TIMEOUT = 1.0
+
+    #milliseconds a status bar message is shown for
+    STATUS_TIMEOUT = 5000
+
+    #number of log records kept in memory, they are only written to the log file
+    #when a warning is logged or when a dump is requested (see Vimja.dumpLog)
+    LOG_CAPACITY = 1000
+
+    #bytes the registers may take, texts from REGISTER_COMPRESS_SIZE bytes on are
+    #stored compressed
+    REGISTER_BUDGET = 16 * 1024 * 1024
+    REGISTER_COMPRESS_SIZE = 64 * 1024
+
+    #number of yanks kept in the yank ring
+    YANK_RING_SIZE = 32
+
+    #registers, marks and searches kept from one session to the next, next to the log
+    SESSION_FILE = 'vimja.session'
+
+    #searches kept in the history (Up/Down while typing a search)
+    SEARCH_HISTORY_SIZE = 50
+
+    #characters inserted at once by a paste, bigger texts are inserted in chunks
+    PASTE_CHUNK_SIZE = 256 * 1024
+
+    #milliseconds the autorepeats of a held motion key are gathered for before the
+    #cursor is moved, about a frame
+    REPEAT_INTERVAL = 16
+
+    #kinds of the entries recorded for macros (q/@) and the repeated change (.)
+    COMMAND_ENTRY = 'command'
+    INSERT_ENTRY = 'insert'
+    SEARCH_ENTRY = 'search'
+    COMMAND_LINE_ENTRY = 'commandLine'
+
+    #whether the key handling is timed from the start (:VimjaStats on/off otherwise)
+    STATS_ENABLED = False
+
+    #files written by :VimjaStats dump and :VimjaStats profile, next to the log
+    STATS_FILE = 'vimja-stats.json'
+    PROFILE_FILE = 'vimja-{0}.prof'
+
+    #invocations profiled by :VimjaStats profile when no number is given
+    PROFILE_INVOCATIONS = 100
+
+    #editors attached with more lines or characters than these are in large file
+    #mode: the incremental search only looks through the viewport (the rest of the
+    #document is scanned in the background), the text of the commands is only
+    #partially logged and j/k/h/l with a count compute their target offset instead
+    #of walking the (laid out) document step by step
+    LARGE_FILE_LINES = 100000
+    LARGE_FILE_SIZE = 8 * 1024 * 1024
+
+    #characters of the edited text logged at most in large file mode
+    LARGE_FILE_LOG_LIMIT = 200
+
+    #shown in the status bar while the current editor is in large file mode
+    LARGE_FILE_INDICATOR = 'LARGE FILE'
+
+    #how deep macros may call each other (ex: a macro replaying itself)
+    MAX_REPLAY_DEPTH = 100
+
+    #insert mode keyword completion, from the keyword before the cursor
+    COMPLETE_NEXT = encodeKey(Qt.Key_N, Qt.ControlModifier)
+    COMPLETE_PREVIOUS = encodeKey(Qt.Key_P, Qt.ControlModifier)
+    KEYWORD_PREFIX = re.compile(r'\w+$', re.UNICODE)
+
+    #the words, runs of other non blank characters and blanks of a line, as the iw
+    #and aw text objects count them
+    TEXT_RUNS = re.compile(r'\w+|[^\w\s]+|\s+', re.UNICODE)
+
+    #moves of the cursor keys replayed from insert mode
+    INSERT_MOVES = {
+        Qt.Key_Left: QTextCursor.Left,
+        Qt.Key_Right: QTextCursor.Right,
+        Qt.Key_Up: QTextCursor.Up,
+        Qt.Key_Down: QTextCursor.Down,
+        Qt.Key_Home: QTextCursor.StartOfLine,
+        Qt.Key_End: QTextCursor.EndOfLine,
+    }
+
     import logging
     logger = logging.getLogger(LOG_FILE)
-    hdlr = logging.FileHandler(os.path.join(PATH, '..', LOG_FILE))
+    hdlr = logging.FileHandler(os.path.join(PATH, '..', LOG_FILE), delay=True)
     hdlr.setFormatter(logging.Formatter(
         '%(levelname)-8s %(asctime)s %(name)s:%(lineno)-4d %(message)s'))
 
-    logger.addHandler(hdlr)
+    #the records are formatted and written by a background thread so that no key
+    #press ever waits on the disk
+    logRing = RingBufferHandler(LOG_CAPACITY, hdlr)
+    logListener = QueueListener(logRing)
+    logListener.start()
+
+    logger.addHandler(QueueHandler(logListener.queue))
     logger.setLevel(logging.INFO)
 
 except Exception as e:
@@ -62,15 +205,48 @@ class Vimja(plugin.Plugin):
 # PRIVATE HELPERS
 # ==============================================================================
 
-    def addNewLine(self, cursor):
-        ''' Inserts a new line below the current line
+    def showStatus(self, message):
+        ''' Shows a message in the IDE's status bar
 
-        @arg QTextCursor cursor cursor being used
+        @arg str message the message to be shown
 
         '''
 
-        cursor.movePosition(QTextCursor.EndOfLine, QTextCursor.MoveAnchor)
-        cursor.insertBlock()
+        self.status = message
+
+        window = self.editor.window()
+        if hasattr(window, 'statusBar'):
+            window.statusBar().showMessage(message, STATUS_TIMEOUT)
+
+    def updateIndicator(self):
+        ''' Shows the large file indicator in the IDE's status bar while the current
+        editor is in large file mode
+
+        '''
+
+        window = self.editor.window()
+        if not hasattr(window, 'statusBar'):
+            return
+
+        if self.largeFileLabel is None:
+            if not self.state.largeFile:
+                return
+
+            self.largeFileLabel = QLabel(LARGE_FILE_INDICATOR)
+            self.largeFileLabel.setToolTip('Vimja: the search only looks through the '
+                'visible lines while the rest of the file is scanned in the background')
+            window.statusBar().addPermanentWidget(self.largeFileLabel)
+
+        self.largeFileLabel.setVisible(self.state.largeFile)
+
+    def loggedText(self, text):
+        ''' @ret str text the text to be logged, cut short in large file mode '''
+
+        if self.state.largeFile and len(text) > LARGE_FILE_LOG_LIMIT:
+            return '{0}... ({1} characters)'.format(text[:LARGE_FILE_LOG_LIMIT],
+                len(text))
+
+        return text
 
     def getPos(self):
         ''' Get the line and column number of the cursor.
@@ -78,100 +254,255 @@ class Vimja(plugin.Plugin):
         @ret tuple (line, col) A two element tuple containing the line and column numbers
 
         '''
-        line = self.editor.textCursor().blockNumber()
-        col = self.editor.textCursor().columnNumber()
+        line = self.getCursor().blockNumber()
+        col = self.getCursor().columnNumber()
 
         return (line, col)
 
-    def getKeyMap(self, path):
-        ''' Gets the key map from the given json file
+    def getCursor(self):
+        ''' Gets the cursor commands work on, the shared cursor while replaying a
+        macro or a change and the editor's cursor otherwise
+
+        @ret QTextCursor cursor the cursor to be used
+
+        '''
+
+        if self.replayCursor is not None:
+            return self.replayCursor
+
+        return self.editor.textCursor()
+
+    def setCursor(self, cursor):
+        ''' Sets the editor's cursor, replays only set it once they are done
+
+        @arg QTextCursor cursor the cursor to be shown
+
+        '''
+
+        if self.replayCursor is None:
+            self.editor.setTextCursor(cursor)
+
+    def setCursorPosition(self, position):
+        ''' Moves the cursor to the given position
+
+        @arg int position the document offset to be moved to
+
+        '''
+
+        if self.replayCursor is not None:
+            self.replayCursor.setPosition(position)
+        else:
+            self.editor.set_cursor_position(position)
+
+    def recordEntry(self, entry):
+        ''' Records the entry in the macro and the change being recorded, if any
 
-        @arg filePath path Path to keyMap.json
+        @arg tuple entry (kind, ...) a command, an inserted key or a search key
 
         '''
 
-        return self.convertCollection(json_manager.read_json(path))
+        #replays are not recorded again (ex: @a while recording b records the @a)
+        if self.replayDepth:
+            return
 
-    #TODO: Clean this logic to remove multiple returns and have only getattr call
-    def convertCollection(self, data):
-        ''' Converts a collection recursively, turning all unicode strings into
-        either strings, ints or attributes of the Vimja class.
+        if self.recording is not None:
+            self.recording.append(entry)
 
-        @arg mixed data A variable who's contents are to be converted from unicode
+        if self.pendingChange is not None:
+            self.pendingChange.append(entry)
 
-        @ret mixed data The initial variable except the contents have now been changed
-            from unicode to any of the above mentioned types.
+    def compileBindings(self, bindings):
+        ''' Compiles the bindings of the key map into command objects, called from
+        the key map watcher's worker thread as well
+
+        @arg list bindings (context, sequence, details) tuples from the key map loader
+
+        @ret OrderedDict compiled (context, sequence) -> (details, command)
 
         '''
 
-        #If the data is a string (including unicode)
-        if isinstance(data, basestring):
-            #If data is an attribute of Vimja return it as such
-            if getattr(self, data, False) is not False:
-                return getattr(self, data, False)
+        compiled = OrderedDict()
+
+        for context, sequence, details in bindings:
+            try:
+                command = compileCommand(self, details)
+
+            except (KeyError, AttributeError, TypeError) as e:
+                raise ValueError('Invalid binding {0} ({1}): {2!r}'.format(
+                    details.get('Key'), ','.join(str(key) for key in sequence), e))
+
+            compiled[(context, sequence)] = (details, command)
+
+        names = set(command.name for (context, _), (_, command) in compiled.items()
+            if context != BUFFER_CONTEXT)
+
+        for name in REQUIRED_COMMANDS:
+            if name not in names:
+                raise ValueError('The key map must bind {0}'.format(name))
+
+        return compiled
+
+    def compileKeyMap(self, compiled):
+        ''' Builds the key sequence tries used for dispatching the commands
+
+        @arg OrderedDict compiled (context, sequence) -> (details, command) from
+            compileBindings
+
+        @ret tuple (normalKeys, bufferKeys, commands) the tries used in normal mode and
+            in the delete/yank modes respectively, and the normal mode commands by name
 
-            #If the data is a number return it as such
-            if self.isNum(data):
-                return float(data)
+        '''
 
-            #If the data is a boolean value return it as such
-            elif data == 'True' or data == 'False':
-                return True if data == 'True' else False
+        normalBindings = []
+        bufferBindings = []
 
-            #Else return it as a standard string
+        for (context, sequence), (details, command) in compiled.items():
+            if context == BUFFER_CONTEXT:
+                bufferBindings.append((sequence, command))
             else:
-                return str(data)
+                normalBindings.append((sequence, command))
 
-        #If we have a dictionary
-        elif isinstance(data, Mapping):
-            #Iterate through the items of said dictionary
-            return dict(map(self.convertCollection, data.iteritems()))
+        normalKeys = KeySequenceTrie(normalBindings, KEY_SEQUENCE_TIMEOUT)
 
-        #If we have an iterable
-        elif isinstance(data, Iterable):
-            #Iterate through all of items in the iterable
-            return type(data)(map(self.convertCollection, data))
+        #after an operator only the motions apply (ex: dw, d'a), any other key cancels
+        #it, buffer specific functionality (ex: dd or i() takes precedence over them
+        motions = [(sequence, command) for sequence, command in normalBindings
+            if command.MOTION]
+        bufferKeys = KeySequenceTrie(motions + bufferBindings, KEY_SEQUENCE_TIMEOUT)
 
-        else:
-            return data
+        commands = dict((command.name, command) for _, command in normalBindings)
+
+        return normalKeys, bufferKeys, commands
+
+    def ensureKeyMap(self):
+        ''' Loads and compiles the key map the first time it is needed, keeping it off
+        the IDE's startup path, and starts watching it for changes
+
+        '''
+
+        if self.normalKeyMap is None:
+            path = os.path.join(PATH, KEY_MAP_FILE)
+            overridePath = os.path.join(PATH, USER_KEY_MAP_FILE)
+            cachePath = os.path.join(PATH, KEY_MAP_CACHE)
+
+            #a broken override file leaves the default key map in place
+            try:
+                compiled = self.compileBindings(loadBindings(path, overridePath,
+                    cachePath))
+
+            except (ValueError, IOError, OSError) as e:
+                self.keyMapFailed(str(e))
+                compiled = self.compileBindings(loadBindings(path, None, cachePath))
+
+            self.bindings = compiled
+            self.normalKeyMap, self.bufferKeyMap, self.commands = \
+                self.compileKeyMap(compiled)
+
+            logger.info('keyMap: %s', self.commands)
 
-    def isNum(self, string):
-        ''' Checks to see if a given string is a valid number.
+            self.keyMapWatcher = KeyMapWatcher(path, overridePath, cachePath,
+                self.compileBindings)
+            self.keyMapWatcher.reloaded.connect(self.keyMapReloaded)
+            self.keyMapWatcher.failed.connect(self.keyMapFailed)
+            self.keyMapWatcher.start()
 
-        @arg str string A string to be checked as a potential number
+        if self.state.normalKeys is None:
+            self.state.setKeyMaps(self.normalKeyMap, self.bufferKeyMap)
 
-        @ret bool isNum True if the string is a number, False otherwise.
-            Accepts strings of the format: [+-]\d*(\.){1}\d*
+    def keyMapReloaded(self, compiled):
+        ''' Swaps the bindings that changed into the live tries, the unchanged ones
+        keep their command objects (runs on the GUI thread, between key presses)
+
+        @arg OrderedDict compiled (context, sequence) -> (details, command) of the
+            reloaded key map
 
         '''
 
-        isNum = True
-        for c in string:
-            isNum &= c.isdigit() or c == '.' or c == '-' or c == '+'
+        old = self.bindings
+        changed = []
+
+        for key in set(old) | set(compiled):
+            if key in old and key in compiled and old[key][0] == compiled[key][0]:
+                compiled[key] = old[key]
+            else:
+                changed.append(key)
+
+        self.bindings = compiled
 
-        return isNum
+        for context, sequence in changed:
+            normal = compiled.get((NORMAL_CONTEXT, sequence))
+            buffer = compiled.get((BUFFER_CONTEXT, sequence))
 
-    #TODO: Don't flip flop between integer and string
-    def appendDelimitedStr(self, newVal, string, resetVal, delimiter):
-        ''' Adds the passed in value to the passed in string using the passed in
-        delimiter and clears the string if the value is the reset value
+            if context != BUFFER_CONTEXT:
+                self.swapBinding(self.normalKeyMap, sequence, normal)
 
-        @arg mixed newVal value to be added
-        @arg str string the string to be added to
-        @arg mixed resetVal the value that is specified to reset the entire string
-        @arg chr delimiter the char that delimits the string
+            #buffer bindings take precedence over the motions, see compileKeyMap
+            if buffer is None and normal is not None and not normal[1].MOTION:
+                normal = None
 
-        @ret string string the string after processing
+            self.swapBinding(self.bufferKeyMap, sequence, buffer or normal)
+
+        self.commands = dict((command.name, command)
+            for (context, _), (_, command) in compiled.items()
+            if context != BUFFER_CONTEXT)
+
+        #sequences typed part way through may have lost their nodes
+        for state in self.states.values():
+            if state.normalKeys is not None:
+                state.normalKeys.reset()
+                state.bufferKeys.reset()
+
+        logger.info('keyMap reloaded, %s bindings changed', len(changed))
+        self.showStatus('Key map reloaded ({0} bindings changed)'.format(len(changed)))
+
+    def swapBinding(self, keys, sequence, binding):
+        ''' Installs the binding's command in the trie, removing the sequence when
+        the binding is None
 
         '''
 
-        if newVal == resetVal or string == '':
-            string = newVal
+        if binding is None:
+            keys.remove(sequence)
         else:
-            string = '{0}{1}{2}'.format(string, delimiter, newVal)
+            keys.insert(sequence, binding[1])
+
+    def keyMapFailed(self, error):
+        ''' Reports a key map that failed to load, the previous one stays active
+
+        @arg str error the reason it failed
+
+        '''
+
+        logger.warning('keyMap not loaded: %s', error)
+
+        if self.editor is not None:
+            self.showStatus('Key map not loaded: {0}'.format(error.splitlines()[-1]))
+
+    def ensureSession(self):
+        ''' Reads the header of the previous session the first time it is needed, the
+        registers it kept are only read from the file once they are pasted
+
+        '''
+
+        if self.session is not None or self.sessionPath is None:
+            return
+
+        self.session = SessionStore(self.sessionPath).load()
+        self.registers.restore(self.session.registers)
+
+        self.searchHistory = [search for search in self.session.searches
+            if search not in self.searchHistory] + self.searchHistory
+        del self.searchHistory[:-SEARCH_HISTORY_SIZE]
 
-        logger.info('string: {0}'.format(string))
-        return string
+        #n/N repeat the last search of the previous session
+        if self.searchHistory:
+            for state in list(self.states.values()):
+                if not state.regexString:
+                    state.regexString = self.searchHistory[-1]
+
+        logger.info('session: %s registers, %s files with marks, %s searches',
+            len(self.session.registers), len(self.session.marks),
+            len(self.session.searches))
 
 # ==============================================================================
 # PLUGIN INIT
@@ -197,11 +528,22 @@ class Vimja(plugin.Plugin):
         #copy text mode
         self.YANK_MODE = 3
 
-        self.copyPasteBuffer = {0: {'text': '', 'isLine': False}}
+        #cut text then insert mode
+        self.CHANGE_MODE = 4
+
+        #modes waiting on a motion (d{motion}, y{motion}, c{motion})
+        self.OPERATOR_MODES = (self.DELETE_MODE, self.YANK_MODE, self.CHANGE_MODE)
 
-        self.isSearching = False
+        #yanked/deleted text, the register given with "x is used by the next command
+        self.registers = RegisterStore(REGISTER_BUDGET, REGISTER_COMPRESS_SIZE,
+            YANK_RING_SIZE)
 
-        self.regexString = ''
+        #the previous session, its header is only read the first time the user leaves
+        #insert mode (see ensureSession), and the searches typed, oldest first. No
+        #session is read or written without a path (ex: batch mode)
+        self.sessionPath = os.path.join(PATH, '..', SESSION_FILE)
+        self.session = None
+        self.searchHistory = []
 
         #TODO: Get rid of "custom" constants, solution along the same lines as changing
             #the indices of the keyMap from hard code to Qt values
@@ -209,330 +551,1176 @@ class Vimja(plugin.Plugin):
 
         self.KEEP_ANCHOR = QTextCursor.KeepAnchor
 
-        #set the default mode to normal mode
-        self.mode = self.INSERT_MODE
-
-        #set the default cursor movement to MoveAnchor as opposed to KeepAnchor
-        #as when the IDE is in DELETE_MODE
-        self.defaultCursorMoveType = self.MOVE_ANCHOR
-
         #get the key map
-        self.keyMap = self.getKeyMap(os.path.join(PATH, 'keyMap.json'))
-        logger.info('keyMap: {}'.format(self.keyMap))
-
-        #buffer used to hold all of the key presses between valid commands or until
-        #the escape key is pressed
-        self.keyPressBuffer = ''
+        #tries matching the key presses to the commands, each editor follows its own
+        #copy of them (see EditorState). The key map is only compiled once the user
+        #leaves insert mode for the first time (see ensureKeyMap)
+        self.normalKeyMap = None
+        self.bufferKeyMap = None
+        self.commands = None
+
+        #(context, sequence) -> (details, command) of the live key map, and the
+        #watcher reloading it, swapping in the bindings that changed
+        self.bindings = None
+        self.keyMapWatcher = None
+
+        #the commands the : command line can run, they are given their argument and
+        #the (first, last) lines of their range (None when no range was typed)
+        self.exCommands = {
+            's': self.substitute,
+            'substitute': self.substitute,
+            'g': self.globalCommand,
+            'global': self.globalCommand,
+            'g!': self.vglobalCommand,
+            'global!': self.vglobalCommand,
+            'v': self.vglobalCommand,
+            'vglobal': self.vglobalCommand,
+            'd': self.deleteLines,
+            'delete': self.deleteLines,
+            'VimjaStats': self.vimjaStats,
+        }
+
+        #the motion whose autorepeats (held key) are being gathered and their count,
+        #applied at most once per REPEAT_INTERVAL
+        self.repeatKey = None
+        self.repeatCommand = None
+        self.repeatCount = 0
+
+        self.repeatTimer = QTimer()
+        self.repeatTimer.setSingleShot(True)
+        self.repeatTimer.setInterval(REPEAT_INTERVAL)
+        self.repeatTimer.timeout.connect(self.flushRepeat)
+
+        #latency histograms and counters, None unless they were turned on
+        self.stats = Stats() if STATS_ENABLED else None
+
+        #macros by register, the one being recorded and the last one replayed (@@)
+        self.macros = {}
+        self.recording = None
+        self.recordingRegister = None
+        self.lastMacro = None
+
+        #the change being typed and the last complete one, repeated by .
+        self.pendingChange = None
+        self.lastChange = None
+
+        #replays run on a single cursor that is shown once they are done
+        self.replayCursor = None
+        self.replayDepth = 0
+
+        #set when a command, search or ex command that was typed fails (ex: a search
+        #without a match), batch mode stops a file's script there. The status bar's
+        #last message says why.
+        self.failed = False
+        self.status = ''
 
         #get the editor service
         self.editorService = self.locator.get_service('editor')
 
-        #initialize the editor to None
+        #the current editor and its state, editors are attached the first time they
+        #are activated and their state is dropped as soon as they are closed
         self.editor = None
+        self.state = None
+        self.states = WeakKeyDictionary()
+
+        #the status bar's large file indicator, created the first time it's needed
+        self.largeFileLabel = None
 
         #TODO: find a better way to intercept the events
         #hack to get around the fact that there is no editor when the plugin is being
         #initialized, this makes the first key press event connect the editor's event
         #handler to vimja
         self.editorService.editorKeyPressEvent.connect(self.connectKeyPressHandler)
+        self.editorService.currentTabChanged.connect(self.connectKeyPressHandler)
 
 # ==============================================================================
 # EVENT HANDLING
 # ==============================================================================
 
-    def connectKeyPressHandler(self):
-        ''' Connects Vimja's key event interceptor to the default key press events '''
+    def connectKeyPressHandler(self, *args):
+        ''' Makes the IDE's current editor Vimja's current editor, connecting Vimja's
+        key event interceptor to it the first time (called on key presses and tab
+        changes)
+
+        '''
+
+        self.activateEditor(self.editorService.get_editor())
+
+    def activateEditor(self, editor):
+        ''' Switches to the editor and its state, attaching to it if needed
+
+        @arg QPlainTextEdit editor the editor being used (None when there is none)
+
+        '''
+
+        if editor is None or editor is self.editor:
+            return
+
+        #the gathered repeats belong to the previous editor
+        if self.repeatCommand is not None:
+            self.flushRepeat()
+
+        state = self.states.get(editor)
+        if state is None:
+            state = self.attachEditor(editor)
+
+        self.editor = editor
+        self.state = state
+
+        self.updateIndicator()
+
+    def attachEditor(self, editor):
+        ''' Connects Vimja's key event interceptor to the editor's key press events
+        and creates its state
+
+        @arg QPlainTextEdit editor the editor to attach to
+
+        @ret EditorState state the editor's state
+
+        '''
 
         logger.info('connecting')
 
-        #if there is no editor then we haven't captured the key events yet
-        if self.editor is None:
-            #get the actual editor
-            self.editor = self.editorService.get_editor()
+        state = EditorState(self.INSERT_MODE, self.MOVE_ANCHOR, self.normalKeyMap,
+            self.bufferKeyMap)
+        state.matchIndex.updated.connect(self.searchIndexUpdated)
+
+        #n/N repeat the last search, whichever editor it was typed in
+        if self.searchHistory:
+            state.regexString = self.searchHistory[-1]
+
+        document = editor.document()
+        state.largeFile = document.blockCount() > LARGE_FILE_LINES or \
+            document.characterCount() > LARGE_FILE_SIZE
+
+        if state.largeFile:
+            logger.info('large file mode: %s lines, %s characters',
+                document.blockCount(), document.characterCount())
+
+        #set the editor's key press event handler to the interceptor
+        editor.keyPressEvent = self.getKeyEventInterceptor(editor)
+
+        #search matches are only highlighted in the viewport
+        editor.verticalScrollBar().valueChanged.connect(self.highlightSearch)
+
+        self.states[editor] = state
+        return state
+
+    def detachEditors(self):
+        ''' Gives every attached editor its own key press event handler back '''
+
+        for editor in list(self.states.keys()):
+            try:
+                del editor.keyPressEvent
+                editor.verticalScrollBar().valueChanged.disconnect(self.highlightSearch)
+
+            except (AttributeError, TypeError, RuntimeError):
+                pass
 
-            #set the editor's key press event handler to the interceptor
-            self.editor.keyPressEvent = self.getKeyEventInterceptor(
-                self.editor.keyPressEvent)
+        self.states.clear()
+        self.editor = None
+        self.state = None
 
     #TODO: Remove determineEventHandler, make one function. The issue is that
         #said function needs to accept one argument but still needs access to the rest
         #of the Vimja class
     #TODO: Generalize interceptor to take in various events
-    def getKeyEventInterceptor(self, function):
+    def getKeyEventInterceptor(self, editor):
         ''' Returns a key event interceptor that determines how to handle
         said events depending on whether or not the user is in normal mode or
         insert mode
 
-        @arg func function The default event handler.
+        @arg QPlainTextEdit editor the editor whose key presses are intercepted
 
         @ret func intercepKeyEvent A key event interceptor, decides what to do with
             each key press.
 
         '''
 
+        #the default event handler, the editor itself is only referenced weakly so
+        #that closing it frees it along with its state
+        function = type(editor).keyPressEvent
+        editorRef = ref(editor)
+
         def interceptKeyEvent(event):
-            ''' Intercepts all key press events and determines how to handle
-            said events depending on whether or not the user is in normal mode or
-            insert mode
+            ''' Intercepts all key press events, timing them when the stats are on '''
+
+            #the key press might come from an editor other than the current one
+            #(ex: a split view)
+            self.activateEditor(editorRef())
+
+            if self.stats is None:
+                return handleKeyEvent(event)
+
+            return self.stats.time('interceptKeyEvent', handleKeyEvent, event)
+
+        def handleKeyEvent(event):
+            ''' Determines how to handle the key press event depending on whether
+            or not the user is in normal mode or insert mode
 
             '''
 
             try:
+                #a lone modifier (ex: the shift of a capital letter) is part of the
+                #next key press, it's only ever typed in insert mode
+                if event.key() in MODIFIER_KEYS:
+                    if self.state.mode != self.INSERT_MODE or self.state.isSearching or \
+                            self.state.commandLine is not None:
+                        return
+
+                    return function(editorRef(), event)
+
+                #the key along with its modifiers, as the key map is indexed
+                key = encodeKey(event.key(), event.modifiers())
+
+                #a held motion key moves the cursor once per frame
+                if event.isAutoRepeat() and self.coalesceRepeat(key):
+                    return
+
+                #the gathered repeats come before any other key
+                if self.repeatCommand is not None:
+                    self.flushRepeat()
+
+                #every key is part of the : command line until it is closed
+                if self.state.commandLine is not None:
+                    self.recordEntry((COMMAND_LINE_ENTRY, event.key(), event.text(), None))
+                    if self.commandLineKey(event.key(), event.text()) is False:
+                        self.failed = True
+
+                    return
+
+                #While searching every key is part of the search string
+                if self.state.isSearching:
+                    self.recordEntry((SEARCH_ENTRY, event.key(), event.text(), None))
+
+                    if self.stats is None:
+                        success = self.searchDocument(event.key(), event.text())
+                    else:
+                        success = self.stats.time('searchDocument', self.searchDocument,
+                            event.key(), event.text())
+
+                    if success is False:
+                        self.failed = True
+
+                    return
+
                 #If the key was the escape key or the user is in normal mode take over the
                 #event handling
                 #TODO: Add in a check for user defined key binding exceptions
-                if event.key() == Qt.Key_Escape or self.mode == self.NORMAL_MODE:
-                    self.normalKeyEventMapper(event.key())
+                if event.key() == Qt.Key_Escape or self.state.mode == self.NORMAL_MODE:
+                    self.ensureKeyMap()
+                    self.ensureSession()
+                    self.normalKeyEventMapper(key, event.text())
+                    return
+
+                elif self.state.mode in self.OPERATOR_MODES:
+                    self.bufferKeyEventMapper(key, event.text())
                     return
 
-                elif self.mode == self.DELETE_MODE or self.mode == self.YANK_MODE:
-                    self.bufferKeyEventMapper(event.key())
+                elif key in (COMPLETE_NEXT, COMPLETE_PREVIOUS):
+                    self.complete(key == COMPLETE_NEXT)
                     return
 
+                #any other key ends the completion being cycled through
+                self.state.completion = None
+
+                #typed text is part of the change/macro being recorded
+                if self.recording is not None or self.pendingChange is not None:
+                    self.recordEntry((INSERT_ENTRY, event.key(), event.text(), None))
+
             except Exception:
+                self.failed = True
                 logger.warning('There was an error in processing key: {} - trace:\n{}'.
                     format(event.key(), stackTrace()))
 
             #Otherwise allow the editor to handle said event in the default manner
-            return function(event)
+            return function(editorRef(), event)
         return interceptKeyEvent
 
-    #TODO: work on consolidating the event mappers (there seems to be too much duplicate
-        #code for them to have to be separate
-    def normalKeyEventMapper(self, key):
-        ''' Takes in the key event and determines what function should be called
-        in order to handle said event.
+    def dispatchKey(self, keys, key, text=''):
+        ''' Advances the given trie and runs any command that was matched
 
-        @arg int key KeyPressEvent that is used to determine the appropriate handler
+        @arg KeySequenceTrie keys the trie for the current mode
+        @arg int key the key that was just pressed
+        @arg str text the text of the key that was just pressed
 
         @ret mixed success Returns the exit status of the event handler (True or False) or
             it returns None if no handler was found
 
         '''
 
-        self.keyPressBuffer = self.appendDelimitedStr(key, self.keyPressBuffer,
-            Qt.Key_Escape, ',')
+        #the key is the argument of the previous command (ex: the a of qa)
+        if self.state.pendingArgument is not None:
+            if key == Qt.Key_Escape:
+                self.state.pendingArgument = None
 
-        customKeyEvent = {'details': self.keyMap.get(self.keyPressBuffer, False),
-            'key': key}
+            #modifiers (ex: the shift of a capital letter) are waited out
+            elif not text:
+                return None
 
-        if customKeyEvent['details'] and callable(customKeyEvent['details']['Function']):
-            success = customKeyEvent['details']['Function'](customKeyEvent)
-            self.keyPressBuffer = ''
+            else:
+                command, count = self.state.pendingArgument
+                self.state.pendingArgument = None
 
-        else:
-            success = None
+                return self.runCommand(command, count, text)
+
+        if self.isCountKey(keys, key):
+            self.state.count = self.state.count * 10 + key - Qt.Key_0
+            return None
+
+        wasIdle = keys.isIdle()
+        command = keys.advance(key)
+
+        if command is None:
+            #the key didn't start a sequence (a miss) or abandoned the one typed so far
+            if self.stats is not None and keys.isIdle():
+                self.stats.count('misses' if wasIdle else 'resets')
+
+            #wait for the rest of an ambiguous sequence for a limited time only
+            if keys.pending is not None and keys.timeout is not None:
+                QTimer.singleShot(int(keys.timeout * 1000),
+                    lambda: self.expireKeySequence(keys))
+
+            return None
+
+        success = self.runCommand(command)
+
+        queued = keys.popQueued()
+        if queued is not None:
+            success = self.runCommand(queued)
 
         return success
 
-    def bufferKeyEventMapper(self, key):
-        ''' Takes in the key event and determines what function should be called
-        in order to handle said event if we are attempting to cut/copy.
+    def runCommand(self, command, count=None, argument=None):
+        ''' Runs the command once, applying the pending count in a single call
 
-        @arg int key integer value of the key pressed, used to determine the
-            appropriate handler
+        @arg Command command the command to be run
+        @arg int count the count to run it with, None uses the typed count
+        @arg str argument the argument of commands that take one (ex: the a of qa)
 
-        @ret mixed success Returns the exit status of the event handler (True or False) or
-            it returns None if no handler was found
+        @ret bool success the exit status of the command's handler
 
         '''
 
-        self.keyPressBuffer = self.appendDelimitedStr(key, self.keyPressBuffer,
-            Qt.Key_Escape, ',')
+        if count is None:
+            count = command.count * (self.state.count or 1) * self.state.operatorCount
+            self.state.count = 0
 
-        bufferKeyEvent = {'details': self.keyMap['BUFFER_COMMANDS'].get(
-            self.keyPressBuffer, False), 'key': key}
+        #commands taking an argument are recorded once they have it
+        if argument is not None or not command.ARGUMENT:
+            #a change (ex: dw, x, i...<Esc>) starts in normal mode, see repeatChange
+            if command.changes and self.state.mode == self.NORMAL_MODE and \
+                    self.pendingChange is None and self.replayDepth == 0:
+                self.pendingChange = []
 
-        #if it's buffer specific functionality (ex: d or y)
-        if not bufferKeyEvent['details'] or \
-            not callable(bufferKeyEvent['details']['Function']):
+            self.recordEntry((COMMAND_ENTRY, command, count, argument))
 
-            bufferKeyEvent = {'details': self.keyMap.get(self.keyPressBuffer, False),
-                'key': key}
+        wasPending = self.state.mode in self.OPERATOR_MODES
 
-        if bufferKeyEvent['details'] and callable(bufferKeyEvent['details']['Function']):
-            success = bufferKeyEvent['details']['Function'](bufferKeyEvent)
-            self.keyPressBuffer = ''
-            self.switchMode({'details': self.keyMap[Qt.Key_Escape], 'key': Qt.Key_Escape})
+        if self.stats is not None:
+            arguments = (command, count) if argument is None else \
+                (command, count, argument)
+            success = self.stats.time(command.name, command.handler, *arguments)
 
+        elif argument is None:
+            success = command.handler(command, count)
         else:
-            success = None
+            success = command.handler(command, count, argument)
 
-        return success
+        #the commands replayed by a macro fail along with it
+        if success is False and not self.replayDepth:
+            self.failed = True
 
-# ==============================================================================
-# CUSTOM EVENT HANDLERS
-# ==============================================================================
+        #an operator is done once its motion ran, unless the command switched modes
+        #itself (ex: c{motion} to insert mode) or waits on its argument (ex: d'a)
+        if wasPending and self.state.mode in self.OPERATOR_MODES and \
+                self.state.pendingArgument is None:
+            self.switchMode(self.commands['Escape'])
 
-    # ==============================================================================
-    # BUFFER HANDLING
-    # ==============================================================================
+        #back in normal mode, the change is complete
+        if self.pendingChange is not None and self.state.mode == self.NORMAL_MODE:
+            self.lastChange = self.pendingChange
+            self.pendingChange = None
 
-    #TODO: Make the select function instances of this function as opposed to vimja
-    def bufferChars(self, event, bufferName=0):
-        ''' Selects the appropriate text then adds it to the appropriate buffer then
-        deletes it if it was cut event.
+        return success
 
-        @arg dict event containing a buffer dictionary created from the keyPressEvent and
-            it's corresponding keyMap json object
+    def coalesceRepeat(self, key):
+        ''' Gathers the autorepeat of a held motion key (ex: j) instead of moving the
+        cursor on each of them, see flushRepeat
 
-        @arg mixed bufferName the index for the buffer to be added to
+        @arg int key the key that was repeated
 
-        @ret mixed True if copy/cut was success False otherwise
+        @ret bool coalesced True if the key was gathered, False if it has to be
+            handled on its own
 
         '''
 
-        try:
-            #get the cursor and prepare to edit the file
-            cursor = self.editor.textCursor()
-            cursor.beginEditBlock()
+        if self.repeatCommand is None or key != self.repeatKey:
+            #only a lone motion key held in normal mode, nothing typed before it and
+            #neither a search nor the command line open (the key is typed there)
+            if self.state.mode != self.NORMAL_MODE or self.state.normalKeys is None or \
+                    not self.state.normalKeys.isIdle() or self.state.count or \
+                    self.state.pendingArgument is not None or self.state.isSearching or \
+                    self.state.commandLine is not None:
+                return False
 
-            #perform the appropriate selection
-            event['details']['MoveOperation'](cursor)
+            node = self.state.normalKeys.root.children.get(key)
+            if node is None or node.children or not isinstance(node.command, MoveCommand):
+                return False
 
-            #add the text to the buffer
-            self.copyPasteBuffer[bufferName]['text'] = cursor.selectedText()
+            if self.repeatCommand is not None:
+                self.flushRepeat()
 
-            #if the text was a full line special behaviour is expected for pasting
-            self.copyPasteBuffer[bufferName]['isLine'] = event['details']['isLine']
+            self.repeatKey = key
+            self.repeatCommand = node.command
 
-            logger.info('text: "{}"'.format(self.copyPasteBuffer[bufferName]['text']))
-            logger.info('isLine: {}'.format(
-                self.copyPasteBuffer[bufferName]['isLine']))
+        self.repeatCount += self.repeatCommand.count
 
-            #if we are in delete mode or key pressed was x remove the text
-            if self.mode == self.DELETE_MODE or event['key'] == Qt.Key_X:
-                cursor.removeSelectedText()
+        if not self.repeatTimer.isActive():
+            self.repeatTimer.start()
 
-                #if we are removing a whole line make sure to remove the new line chr
-                if event['details']['isLine']:
-                    cursor.deleteChar()
+        return True
+
+    def flushRepeat(self):
+        ''' Moves the cursor by all the autorepeats gathered since the last frame '''
+
+        self.repeatTimer.stop()
+
+        command = self.repeatCommand
+        count = self.repeatCount
+
+        self.repeatKey = None
+        self.repeatCommand = None
+        self.repeatCount = 0
+
+        try:
+            if command is not None and self.state.mode == self.NORMAL_MODE:
+                self.runCommand(command, count)
 
         except Exception:
-            logger.warning('copy/cut error: {}'.format(stackTrace()))
+            logger.warning('Error while applying repeated keys: {}'.format(stackTrace()))
 
-        cursor.endEditBlock()
+    def awaitArgument(self, command, count):
+        ''' Makes the next key the argument of the command
 
-    def selectLine(self, cursor):
-        ''' Selects the whole line
+        @arg Command command the command waiting on its argument
+        @arg int count the count the command will be run with
 
-        @arg QTextCursor cursor cursor being used
+        @ret bool success always True
 
         '''
 
-        cursor.movePosition(QTextCursor.StartOfLine, QTextCursor.MoveAnchor, 1)
-        cursor.movePosition(QTextCursor.EndOfLine, QTextCursor.KeepAnchor, 1)
+        self.state.pendingArgument = (command, count)
 
-    def selectChar(self, cursor):
-        ''' Selects the next character
+        return True
 
-        @arg QTextCursor cursor cursor being used
+    def expireKeySequence(self, keys):
+        ''' Runs the pending command of an ambiguous sequence once it has timed out
+
+        @arg KeySequenceTrie keys the trie that was waiting on more keys
 
         '''
 
-        cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor, 1)
+        command = keys.expire()
 
-    def paste(self, event, bufferName=0):
-        ''' Selects the appropriate text then adds it to the appropriate buffer then
-        deletes it if it was cut event.
+        if command is not None:
+            self.runCommand(command)
 
-        @arg dict event containing a buffer dictionary created from the keyPressEvent and
-            it's corresponding keyMap json object
+    def normalKeyEventMapper(self, key, text=''):
+        ''' Takes in the key event and determines what function should be called
+        in order to handle said event.
 
-        @arg mixed bufferName the index for the buffer to be added to
+        @arg int key KeyPressEvent that is used to determine the appropriate handler
+        @arg str text the text of the key that was pressed
 
-        @ret mixed True if copy/cut was success False otherwise
+        @ret mixed success Returns the exit status of the event handler (True or False) or
+            it returns None if no handler was found
 
         '''
 
-        try:
-            logger.info('pasting: {}'.format(self.copyPasteBuffer[bufferName]))
+        return self.dispatchKey(self.state.normalKeys, key, text)
+
+    def bufferKeyEventMapper(self, key, text=''):
+        ''' Takes in the key event and determines what function should be called
+        in order to handle said event if we are attempting to cut/copy.
 
-            #get the cursor and prepare to edit the file
-            cursor = self.editor.textCursor()
-            cursor.beginEditBlock()
+        @arg int key integer value of the key pressed, used to determine the
+            appropriate handler
+        @arg str text the text of the key that was pressed
 
-            #if we are pasting a whole line we need to create an empty line above/below
-            #the current line
-            if self.copyPasteBuffer[bufferName]['isLine']:
-                logger.info('in if')
+        @ret mixed success Returns the exit status of the event handler (True or False) or
+            it returns None if no handler was found
 
-                #if we are pasting before the cursor we need to move up so as to create
-                #an empty line above the current one
-                if not event['details']['after']:
-                    logger.info('in if not')
-                    self.move({'details': self.keyMap[Qt.Key_K], 'key': Qt.Key_K})
+        '''
 
-                #create a new line and move the cursor to the beginning of it to ignore
-                #the auto indentation
-                self.addNewLine(cursor)
-                cursor.movePosition(QTextCursor.StartOfLine, QTextCursor.MoveAnchor)
+        keys = self.state.bufferKeys
 
-            #if we are not pasting a whole line and are pasting after the cursor
-            #we need to move the cursor to the right
-            elif event['details']['after']:
-                cursor.movePosition(QTextCursor.Right, QTextCursor.MoveAnchor)
+        #like vim, a key that neither carries on nor starts a motion or text object
+        #(ex: dz, the x of dix) cancels the operator instead of running on its own
+        if self.state.pendingArgument is None and keys.pending is None and \
+                key not in keys.node.children and not self.isCountKey(keys, key):
+            keys.reset()
+            self.state.count = 0
+            self.switchMode(self.commands['Escape'])
+            self.failed = True
+            return False
 
-            #insert the buffered text into the file
-            cursor.insertText(self.copyPasteBuffer[bufferName]['text'])
+        return self.dispatchKey(keys, key, text)
 
-        except Exception:
-            logger.warning('pasting error: {}'.format(stackTrace()))
+    def isCountKey(self, keys, key):
+        ''' @ret bool True if the key is part of a count prefix (ex: the 500 of 500j),
+            0 only counts once a count was started '''
 
-        cursor.endEditBlock()
+        return keys.isIdle() and (Qt.Key_1 <= key <= Qt.Key_9 or
+            (key == Qt.Key_0 and bool(self.state.count)))
+
+# ==============================================================================
+# CUSTOM EVENT HANDLERS
+# ==============================================================================
 
     # ==============================================================================
-    # SEARCHING
+    # BUFFER HANDLING
     # ==============================================================================
 
-    #TODO: Implement search highlighting
-    def searchDocument(self, key):
-        ''' Searches the file for the current regex (case insensitive)
+    def selectRegister(self, command, count=1, name=None):
+        ''' Makes the next yank, delete or paste use the register ("a, "1...)
 
-        @arg int key the integer value of the key that was just pressed
+        @arg ArgumentCommand command the compiled command that was triggered
+        @arg int count the count typed before the register, kept for the next command
+        @arg str name the register's name
+
+        @ret bool success always True
 
         '''
 
-        if key == Qt.Key_Enter:
-            self.isSearching = False
-            pass
+        if name is None:
+            return self.awaitArgument(command, count)
 
-        elif key == Qt.Key_Backspace:
-            self.regexString = self.regexString[:-1]
+        self.state.register = name
 
-        else:
-            self.regexString += chr(key)
+        #3"ayy yanks 3 lines
+        self.state.count = count if count > 1 else 0
 
-            docText = self.editor.get_text().upper()
-            word = re.search(self.regexString, docText)
+        return True
 
-            self.editor.highlight_selected_word(word.string)
-            self.editor.set_cursor_position(word.start())
+    def takeRegister(self):
+        ''' @ret str name the register selected for this command, None for the
+            default one '''
 
-    # ==============================================================================
-    # MODE HANDLING
-    # ==============================================================================
+        register = self.state.register
+        self.state.register = None
 
-    #TODO: Remove the residual cursor size that occurs when changing from insert
-        #to command mode
-    def switchMode(self, event):
-        ''' Changes the mode of the editor
+        return register
 
-        @arg dict event containing a mode dictionary created from the keyPressEvent and
-            it's corresponding keyMap json object
+    #TODO: Make the select function instances of this function as opposed to vimja
+    def bufferChars(self, command, count=1):
+        ''' Selects the appropriate text then adds it to the appropriate register then
+        deletes it if it was cut event.
 
-        @ret bool success returns True if there were no errors, False otherwise
+        @arg BufferCommand command the compiled command that was triggered
+        @arg int count the number of lines/characters the command applies to
+
+        @ret mixed True if copy/cut was success False otherwise
 
         '''
 
-        success = True
+        cursor = self.getCursor()
 
-        try:
-            self.mode = event['details']['Mode']
-            self.defaultCursorMoveType = event['details']['Anchor']
-            self.editor.setCursorWidth(event['details']['CursorWidth'])
+        #perform the appropriate selection, counts included, so that the whole range
+        #is handled at once (text objects fail when there is nothing to select)
+        if command.select(cursor, count) is False:
+            return False
 
-        except Exception:
+        #if we are in delete/change mode or the command always cuts (ex: x) remove it
+        remove = self.state.mode in (self.DELETE_MODE, self.CHANGE_MODE) or command.remove
+
+        return self.operateRange(cursor, cursor.selectionStart(), cursor.selectionEnd(),
+            command.isLine, remove)
+
+    def operateRange(self, cursor, start, end, isLine, remove):
+        ''' Adds the text between the offsets to the register and removes it if needed,
+        all within a single edit block
+
+        @arg QTextCursor cursor cursor being used
+        @arg int start the document offset the range starts at
+        @arg int end the document offset the range ends at (exclusive)
+        @arg bool isLine True if the range is made up of whole lines
+        @arg bool remove True if the text is cut, False if it is copied
+
+        @ret bool success True if copy/cut was success False otherwise
+
+        '''
+
+        success = True
+        register = self.takeRegister()
+
+        #prepare to edit the file
+        cursor.beginEditBlock()
+
+        try:
+            cursor.setPosition(start)
+            cursor.setPosition(end, QTextCursor.KeepAnchor)
+
+            #add the text to the register, if the text was a full line special
+            #behaviour is expected for pasting
+            text = cursor.selectedText()
+
+            if remove:
+                self.registers.delete(text, isLine, register)
+            else:
+                self.registers.yank(text, isLine, register)
+
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('text: "%s"', self.loggedText(text))
+                logger.debug('isLine: %s', isLine)
+
+            if remove:
+                #whole lines take a new line chr with them, the one before them if
+                #they are at the end of the file (changed lines are kept empty)
+                if isLine and self.state.mode != self.CHANGE_MODE:
+                    if end < cursor.document().characterCount() - 1:
+                        cursor.setPosition(end + 1, QTextCursor.KeepAnchor)
+
+                    elif start > 0:
+                        cursor.setPosition(start - 1)
+                        cursor.setPosition(end, QTextCursor.KeepAnchor)
+
+                cursor.removeSelectedText()
+
+            else:
+                cursor.setPosition(start)
+
+        except Exception:
+            logger.warning('copy/cut error: {}'.format(stackTrace()))
+            success = False
+
+        cursor.endEditBlock()
+        self.setCursor(cursor)
+
+        #whatever was changed gets typed over
+        if success and remove and self.state.mode == self.CHANGE_MODE:
+            self.switchMode(self.commands['i'])
+
+        return success
+
+    def selectLine(self, cursor, count=1):
+        ''' Selects the whole line
+
+        @arg QTextCursor cursor cursor being used
+        @arg int count the number of lines to select, starting with the current one
+
+        '''
+
+        cursor.movePosition(QTextCursor.StartOfBlock, QTextCursor.MoveAnchor, 1)
+
+        if count > 1:
+            cursor.movePosition(QTextCursor.NextBlock, QTextCursor.KeepAnchor, count - 1)
+
+        cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor, 1)
+
+    def selectChar(self, cursor, count=1):
+        ''' Selects the next character
+
+        @arg QTextCursor cursor cursor being used
+        @arg int count the number of characters to select, stopping at the end of line
+
+        '''
+
+        block = cursor.block()
+        remaining = block.position() + block.length() - 1 - cursor.position()
+
+        cursor.movePosition(QTextCursor.Right, QTextCursor.KeepAnchor,
+            min(count, remaining))
+
+    def selectWord(self, inner, cursor, count=1):
+        ''' Selects the word under the cursor (iw), along with the blanks after it
+        (aw), or the ones before it when it ends the line
+
+        @arg bool inner True for the word alone, False to select the blanks as well
+        @arg QTextCursor cursor cursor being used
+        @arg int count the number of words to select, the blanks in between counting
+            as words for iw
+
+        @ret bool success False when the line doesn't have that many words left
+
+        '''
+
+        block = cursor.block()
+        text = block.text()
+        runs = [match.span() for match in TEXT_RUNS.finditer(text)]
+        column = min(cursor.position() - block.position(), len(text) - 1)
+
+        index = 0
+        while index < len(runs) and runs[index][1] <= column:
+            index += 1
+
+        if index == len(runs):
+            return False
+
+        def isBlank(index):
+            return 0 <= index < len(runs) and text[runs[index][0]].isspace()
+
+        last = index + count - 1
+        if not inner:
+            #each word takes the blanks after it, or the ones before it when the
+            #cursor is on blanks
+            blanksFirst = isBlank(index)
+            last = index - 1
+            for _ in range(count):
+                if blanksFirst and isBlank(last + 1):
+                    last += 1
+
+                last += 1
+
+                if not blanksFirst and isBlank(last + 1):
+                    last += 1
+
+        if last >= len(runs):
+            return False
+
+        start, end = runs[index][0], runs[last][1]
+
+        #a word without blanks after it takes the ones before it instead
+        if not inner and not isBlank(index) and not isBlank(last) and isBlank(index - 1):
+            start = runs[index - 1][0]
+
+        cursor.setPosition(block.position() + start)
+        cursor.setPosition(block.position() + end, QTextCursor.KeepAnchor)
+
+        return True
+
+    def selectBlock(self, bracket, inner, cursor, count=1):
+        ''' Selects the text between a pair of brackets around the cursor (i( a{...)
+
+        @arg str bracket one of the brackets of the pair
+        @arg bool inner True to leave the brackets out, False to select them as well
+        @arg QTextCursor cursor cursor being used
+        @arg int count 1 for the innermost pair, 2 for the one around it...
+
+        @ret bool success False when the cursor isn't inside such a pair
+
+        '''
+
+        index = self.state.bracketIndex
+        index.attach(cursor.document())
+
+        pair = index.enclosing(cursor.position(), bracket, count)
+        if pair is None:
+            return False
+
+        start, end = pair[0], pair[1] + 1
+
+        if inner:
+            start += 1
+            end -= 1
+
+            #brackets on lines of their own leave those lines (and the indentation
+            #of the closing one) alone, like vim does for blocks of code, the lines
+            #in between go as a whole (changing them leaves an empty line)
+            document = cursor.document()
+            first = document.findBlock(start)
+            if not first.text()[start - first.position():].strip() and \
+                    first.next().isValid() and first.next().position() <= end:
+                start = first.next().position()
+
+                last = document.findBlock(end)
+                if start < last.position() and \
+                        not last.text()[:end - last.position()].strip():
+                    end = last.position()
+                    if self.state.mode == self.CHANGE_MODE:
+                        end -= 1
+
+        cursor.setPosition(start)
+        cursor.setPosition(max(start, end), QTextCursor.KeepAnchor)
+
+        return True
+
+    def paste(self, command, count=1):
+        ''' Inserts the text of the selected register (the unnamed one by default)
+        before or after the cursor, count times over as a single edit
+
+        @arg PasteCommand command the compiled command that was triggered
+        @arg int count the number of copies of the register to insert
+
+        @ret mixed True if the paste was success False otherwise
+
+        '''
+
+        stored = self.registers.get(self.takeRegister())
+        if stored is None:
+            return False
+
+        text, isLine = stored
+        success = True
+
+        #a big paste is only painted once it is all in (replays paint once anyway)
+        deferred = len(text) * count >= PASTE_CHUNK_SIZE and self.replayCursor is None
+        if deferred:
+            self.editor.setUpdatesEnabled(False)
+
+        #get the cursor and prepare to edit the file, the document is only laid out
+        #again once the edit block ends
+        cursor = self.getCursor()
+        cursor.beginEditBlock()
+
+        try:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('pasting: "%s" isLine: %s', self.loggedText(text), isLine)
+
+            block = cursor.block()
+            end = block.position() + block.length() - 1
+
+            #whole lines go on lines of their own below/above the current one, each
+            #copy brings its own line break
+            if isLine and command.after:
+                first = end
+                pieces = ('\n', text)
+
+            elif isLine:
+                first = block.position()
+                pieces = (text, '\n')
+
+            #characters go after/before the cursor's character
+            else:
+                first = cursor.position()
+                if command.after and first < end:
+                    first += 1
+
+                pieces = (text,)
+
+            #the copies are never joined into one string, each one goes in front of
+            #the ones inserted before it (Qt inserts faster there than after them)
+            for _ in range(count):
+                cursor.setPosition(first)
+                for piece in pieces:
+                    self.insertChunks(cursor, piece)
+
+            #the cursor ends up on the first pasted line or the last pasted character
+            if isLine and command.after:
+                cursor.setPosition(first + 1)
+            elif isLine:
+                cursor.setPosition(first)
+            elif text:
+                cursor.setPosition(first + len(text) * count - 1)
+
+        except Exception:
+            logger.warning('pasting error: {}'.format(stackTrace()))
+            success = False
+
+        cursor.endEditBlock()
+        self.setCursor(cursor)
+
+        if deferred:
+            self.editor.setUpdatesEnabled(True)
+
+        return success
+
+    def insertChunks(self, cursor, text):
+        ''' Inserts the text at the cursor about PASTE_CHUNK_SIZE characters at a time,
+        so that Qt never holds a copy of all of a big text at once. The chunks end on
+        line breaks when there are any, a line split between two chunks is stored
+        in two pieces by the document.
+
+        @arg QTextCursor cursor cursor being used
+        @arg str text the text to be inserted
+
+        '''
+
+        start = 0
+        while len(text) - start > PASTE_CHUNK_SIZE:
+            end = text.rfind('\n', start, start + PASTE_CHUNK_SIZE) + 1
+            if end <= start:
+                end = start + PASTE_CHUNK_SIZE
+
+            cursor.insertText(text[start:end])
+            start = end
+
+        cursor.insertText(text[start:] if start else text)
+
+    # ==============================================================================
+    # SEARCHING
+    # ==============================================================================
+
+    def startSearch(self, command, count=1):
+        ''' Starts an incremental search from the current cursor position (/)
+
+        @arg Command command the compiled command that was triggered
+        @arg int count unused
+
+        '''
+
+        state = self.state
+        state.isSearching = True
+        state.regexString = ''
+        state.historyIndex = len(self.searchHistory)
+        state.searchOrigin = self.getCursor().position()
+        state.search.attach(self.editor.document())
+        state.matchIndex.clear()
+
+        return True
+
+    def searchDocument(self, key, text=''):
+        ''' Searches the file for the current regex (case insensitive) as it's typed
+
+        @arg int key the integer value of the key that was just pressed
+        @arg str text the text of the key that was just pressed
+
+        @ret bool success False if the search was confirmed without a match
+
+        '''
+
+        state = self.state
+
+        if key in (Qt.Key_Enter, Qt.Key_Return):
+            state.isSearching = False
+
+            #index and highlight every match in the background (large files may
+            #already be indexing it)
+            pattern = state.search.compile(state.regexString) if state.regexString \
+                else None
+            if pattern is not None and state.matchIndex.pattern is not pattern:
+                state.matchIndex.build(self.editor.document(), pattern)
+
+            if state.regexString:
+                history = self.searchHistory
+                if state.regexString in history:
+                    history.remove(state.regexString)
+
+                history.append(state.regexString)
+                del history[:-SEARCH_HISTORY_SIZE]
+
+            found = state.search.match is not None
+
+            #a large file may not have been searched beyond the viewport yet
+            if pattern is not None and not found and state.largeFile:
+                if state.matchIndex.isReady(pattern):
+                    found = state.matchIndex.count() > 0
+
+                else:
+                    match = state.search.find(pattern, state.searchOrigin + 1)
+                    if match is not None:
+                        self.selectMatch(match[0], match[1])
+                        found = True
+
+            #the confirmed search is highlighted by the match index from now on
+            highlightMatch(self.editor, None)
+
+            if self.getCursor().position() != state.searchOrigin:
+                self.recordJump(state.searchOrigin)
+
+            if state.regexString and not found:
+                self.showStatus('Pattern not found: {0}'.format(state.regexString))
+                return False
+
+            return True
+
+        if key == Qt.Key_Escape:
+            state.isSearching = False
+            state.matchIndex.clear()
+            highlightMatch(self.editor, None)
+            self.setCursorPosition(state.searchOrigin)
+            return True
+
+        #Up/Down go through the searches typed before, the query being typed is lost
+        if key in (Qt.Key_Up, Qt.Key_Down):
+            index = state.historyIndex + (1 if key == Qt.Key_Down else -1)
+            if not 0 <= index <= len(self.searchHistory):
+                return True
+
+            state.historyIndex = index
+            state.regexString = self.searchHistory[index] \
+                if index < len(self.searchHistory) else ''
+
+        elif key == Qt.Key_Backspace:
+            state.regexString = state.regexString[:-1]
+
+        elif text:
+            state.regexString += text
+
+        else:
+            return True
+
+        #replays don't wait on the background scan
+        if not state.largeFile or self.replayDepth:
+            match = state.search.incremental(state.regexString, state.searchOrigin)
+
+        else:
+            #only the visible lines are searched as the query is typed, the rest of the
+            #document is left to the match index (see searchIndexUpdated)
+            last = None
+            for last in visibleBlocks(self.editor):
+                pass
+
+            limit = last.position() + last.length() if last is not None else None
+            match = state.search.incremental(state.regexString, state.searchOrigin,
+                limit)
+
+            pattern = state.search.compile(state.regexString) if state.regexString \
+                else None
+            if match is not None or pattern is None:
+                state.matchIndex.clear()
+
+            elif state.matchIndex.pattern is not pattern:
+                state.matchIndex.build(self.editor.document(), pattern)
+
+        if match is not None:
+            self.selectMatch(match[0], match[1])
+
+        #nothing matches (yet), the cursor goes back to where the search started
+        else:
+            highlightMatch(self.editor, None)
+            self.setCursorPosition(state.searchOrigin)
+
+        return True
+
+    def selectMatch(self, start, end):
+        ''' Moves the cursor to the start of the match of the search being typed and
+        highlights the match. It isn't selected, the next command would act on the
+        selection.
+
+        @arg int start the document offset of the match
+        @arg int end the offset of its end
+
+        '''
+
+        self.setCursorPosition(start)
+
+        #replays only show where they end up
+        if not self.replayDepth:
+            highlightMatch(self.editor, (start, end))
+
+    def searchNext(self, command, count=1):
+        ''' Moves to the next/previous match of the last search (n/N)
+
+        @arg SearchCommand command the compiled command that was triggered
+        @arg int count the number of matches to step over
+
+        '''
+
+        state = self.state
+
+        if not state.regexString:
+            self.showStatus('No previous regular expression')
+            return False
+
+        position = self.getCursor().position()
+
+        if state.matchIndex.isReady(state.search.compile(state.regexString)):
+            match = state.matchIndex.step(position, command.forward, count)
+
+            if match is not None:
+                self.showStatus('/{0} [{1}/{2}]'.format(state.regexString, match[2],
+                    state.matchIndex.count()))
+
+        elif state.largeFile:
+            #go from match to match while the index is built in the background,
+            #rather than collecting every match of the document first
+            pattern = state.search.compile(state.regexString)
+            if pattern is None:
+                return False
+
+            if state.matchIndex.pattern is not pattern:
+                state.matchIndex.build(self.editor.document(), pattern)
+
+            state.search.attach(self.editor.document())
+            match = (position,)
+
+            for _ in range(count):
+                if command.forward:
+                    match = state.search.find(pattern, match[0] + 1)
+                else:
+                    match = state.search.findBefore(pattern, match[0])
+
+                if match is None:
+                    break
+
+        else:
+            state.search.attach(self.editor.document())
+            match = state.search.step(state.regexString, position, command.forward,
+                count)
+
+        if match is not None:
+            self.recordJump(position)
+            self.setCursorPosition(match[0])
+
+        return match is not None
+
+    def highlightSearch(self, *args):
+        ''' Highlights the matches of the confirmed search in the visible blocks '''
+
+        if self.editor is not None:
+            highlightViewport(self.editor, self.state.matchIndex)
+
+    def searchIndexUpdated(self):
+        ''' Refreshes the highlighting and the match count once the index changed
+        (the index of a background tab only matters once it's activated)
+
+        '''
+
+        if self.state is None:
+            return
+
+        self.highlightSearch()
+
+        state = self.state
+
+        #the search being typed in a large file had no match in the viewport, the
+        #first one after where it started is selected once the index has it
+        if state.isSearching and state.search.match is None and \
+                state.matchIndex.isReady(state.search.compile(state.regexString)) and \
+                state.matchIndex.count():
+            match = state.matchIndex.step(state.searchOrigin)
+
+            self.selectMatch(match[0], match[1])
+
+        if self.state.matchIndex.isReady():
+            self.showStatus('/{0} [{1} matches]'.format(self.state.regexString,
+                self.state.matchIndex.count()))
+
+    # ==============================================================================
+    # MODE HANDLING
+    # ==============================================================================
+
+    #TODO: Remove the residual cursor size that occurs when changing from insert
+        #to command mode
+    def switchMode(self, command, count=1):
+        ''' Changes the mode of the editor
+
+        @arg ModeCommand command the compiled command that was triggered
+        @arg int count the count typed before an operator (ex: the 3 of 3dd)
+
+        @ret bool success returns True if there were no errors, False otherwise
+
+        '''
+
+        success = True
+
+        try:
+            if self.stats is not None and not (self.state.normalKeys.isIdle() and
+                    self.state.bufferKeys.isIdle()):
+                self.stats.count('resets')
+
+            #any partially entered sequence belongs to the previous mode
+            self.state.normalKeys.reset()
+            self.state.bufferKeys.reset()
+            self.state.completion = None
+
+            self.state.mode = command.mode
+            self.state.defaultCursorMoveType = command.anchor
+
+            #a cancelled command (ex: "a<Esc>) drops its register
+            if self.state.mode == self.NORMAL_MODE:
+                self.state.register = None
+
+            self.editor.setCursorWidth(command.cursorWidth)
+
+            #the count typed before d or y multiplies the one typed after it (2d3d)
+            if self.state.mode in self.OPERATOR_MODES:
+                self.state.operatorCount = count
+            else:
+                self.state.operatorCount = 1
+
+        except Exception:
             logger.warning('Error while switching mode: {}'.format(stackTrace()))
             success = False
 
@@ -542,31 +1730,35 @@ class Vimja(plugin.Plugin):
     # MOVEMENT HANDLING
     # ==============================================================================
 
-    def move(self, event):
-        ''' Moves the cursor
+    def move(self, command, count=1):
+        ''' Moves the cursor, or applies the pending operator to the text the motion
+        moves over (d{motion}, y{motion}, c{motion})
 
-        @arg dict event containing a movement dictionary created from the keyPressEvent
-            and it's corresponding keyMap json object
+        @arg MoveCommand command the compiled command that was triggered
+        @arg int count the number of times the movement is applied
 
         @ret bool success True if the cursor was successfully moved
 
         '''
 
+        if self.state.mode in self.OPERATOR_MODES:
+            return self.applyOperator(command, count)
+
         success = True
 
         try:
+            anchor = command.anchor
+            if anchor is None:
+                anchor = self.state.defaultCursorMoveType
 
-            moveOperation = getattr(QTextCursor, event['details']['MoveOperation'], False)
+            cursor = self.getCursor()
 
-            if moveOperation is not False:
-                cursor = self.editor.textCursor()
-                cursor.movePosition(moveOperation, self.defaultCursorMoveType,
-                    event['details']['N'])
+            if command.jump:
+                self.recordJump(cursor.position())
 
-                self.editor.setTextCursor(cursor)
+            self.moveCursor(cursor, command, anchor, count)
 
-            else:
-                raise Exception('Invalid move operation: {}'.format(stackTrace()))
+            self.setCursor(cursor)
 
         except Exception:
             logger.warning('Error while moving: {}'.format(stackTrace()))
@@ -574,13 +1766,1131 @@ class Vimja(plugin.Plugin):
 
         return success
 
-# ==============================================================================
-# USELESS
-# ==============================================================================
+    def moveCursor(self, cursor, command, anchor, count):
+        ''' Applies the motion to the given cursor
 
-    def finish(self):
-        # Shutdown your plugin
-        logger.info('Shutting down Vimja\n')
+        @arg QTextCursor cursor cursor being used
+        @arg MoveCommand command the motion
+        @arg QTextCursor.MoveMode anchor whether or not the anchor is kept
+        @arg int count the number of times the movement is applied
+
+        '''
+
+        if command.custom:
+            command.operation(cursor, anchor, count)
+
+        elif self.state.largeFile and count > 1 and command.operation in (
+                QTextCursor.Up, QTextCursor.Down, QTextCursor.Left, QTextCursor.Right):
+            self.moveByOffset(cursor, command.operation, anchor, count)
+
+        else:
+            cursor.movePosition(command.operation, anchor, count)
+
+    def moveByOffset(self, cursor, operation, anchor, count):
+        ''' Moves the cursor count lines up/down (staying in its column) or count
+        characters left/right by computing the offset it ends up at, the lines in
+        between are neither walked nor laid out (large file mode)
+
+        @arg QTextCursor cursor cursor being used
+        @arg QTextCursor.MoveOperation operation Up, Down, Left or Right
+        @arg QTextCursor.MoveMode anchor whether or not the anchor is kept
+        @arg int count the number of lines/characters to move over
+
+        '''
+
+        document = cursor.document()
+
+        if operation in (QTextCursor.Up, QTextCursor.Down):
+            step = count if operation == QTextCursor.Down else -count
+            number = max(0, min(cursor.blockNumber() + step, document.blockCount() - 1))
+
+            block = document.findBlockByNumber(number)
+            position = block.position() + min(cursor.positionInBlock(),
+                block.length() - 1)
+
+        else:
+            step = count if operation == QTextCursor.Right else -count
+            position = max(0, min(cursor.position() + step,
+                document.characterCount() - 1))
+
+        cursor.setPosition(position, anchor)
+
+    def nextParagraph(self, cursor, anchor, count=1):
+        ''' Moves to the empty line after the current paragraph (})
+
+        @arg QTextCursor cursor cursor being used
+        @arg QTextCursor.MoveMode anchor whether or not the anchor is kept
+        @arg int count the number of paragraphs to move over
+
+        '''
+
+        #from a blank line the blank lines are skipped first, then the paragraph
+        block = cursor.block()
+        for _ in range(count):
+            while block.isValid() and block.length() == 1:
+                block = block.next()
+
+            while block.isValid() and block.length() > 1:
+                block = block.next()
+
+        if block.isValid():
+            cursor.setPosition(block.position(), anchor)
+        else:
+            cursor.movePosition(QTextCursor.End, anchor)
+
+    def getWordIndex(self):
+        ''' @ret WordIndex index the word boundaries of the current editor '''
+
+        index = self.state.wordIndex
+        index.attach(self.editor.document())
+
+        return index
+
+    def nextWord(self, cursor, anchor, count=1):
+        ''' Moves to the start of the next word (w)
+
+        @arg QTextCursor cursor cursor being used
+        @arg QTextCursor.MoveMode anchor whether or not the anchor is kept
+        @arg int count the number of words to move over
+
+        '''
+
+        cursor.setPosition(self.getWordIndex().nextStart(cursor.position(), count),
+            anchor)
+
+    def nextBigWord(self, cursor, anchor, count=1):
+        ''' Moves to the start of the next WORD, words being separated by blanks
+        only (W)
+
+        '''
+
+        cursor.setPosition(self.getWordIndex().nextStart(cursor.position(), count,
+            True), anchor)
+
+    def previousWord(self, cursor, anchor, count=1):
+        ''' Moves to the start of the previous word (b) '''
+
+        cursor.setPosition(self.getWordIndex().previousStart(cursor.position(), count),
+            anchor)
+
+    def previousBigWord(self, cursor, anchor, count=1):
+        ''' Moves to the start of the previous WORD (B) '''
+
+        cursor.setPosition(self.getWordIndex().previousStart(cursor.position(), count,
+            True), anchor)
+
+    def endOfWord(self, cursor, anchor, count=1):
+        ''' Moves to the last character of the word (e), or of the next one when
+        already there
+
+        '''
+
+        cursor.setPosition(self.getWordIndex().nextEnd(cursor.position(), count),
+            anchor)
+
+    def endOfBigWord(self, cursor, anchor, count=1):
+        ''' Moves to the last character of the WORD (E) '''
+
+        cursor.setPosition(self.getWordIndex().nextEnd(cursor.position(), count, True),
+            anchor)
+
+    def matchPair(self, cursor, anchor, count=1):
+        ''' Jumps to the bracket matching the first one at or after the cursor on its
+        line (%), staying put when there is none
+
+        @arg QTextCursor cursor cursor being used
+        @arg QTextCursor.MoveMode anchor whether or not the anchor is kept
+        @arg int count ignored, vim's N% jumps to a percentage of the file instead
+
+        '''
+
+        index = self.state.bracketIndex
+        index.attach(cursor.document())
+
+        position = index.match(cursor.position())
+        if position is not None:
+            cursor.setPosition(position, anchor)
+
+    def previousParagraph(self, cursor, anchor, count=1):
+        ''' Moves to the empty line before the current paragraph ({)
+
+        @arg QTextCursor cursor cursor being used
+        @arg QTextCursor.MoveMode anchor whether or not the anchor is kept
+        @arg int count the number of paragraphs to move over
+
+        '''
+
+        #from a blank line the blank lines are skipped first, then the paragraph
+        block = cursor.block()
+        for _ in range(count):
+            while block.isValid() and block.length() == 1:
+                block = block.previous()
+
+            while block.isValid() and block.length() > 1:
+                block = block.previous()
+
+        if block.isValid():
+            cursor.setPosition(block.position(), anchor)
+        else:
+            cursor.movePosition(QTextCursor.Start, anchor)
+
+    # ==============================================================================
+    # OPERATORS
+    # ==============================================================================
+
+    def motionRange(self, cursor, command, count):
+        ''' Computes the document offsets a motion moves over without moving the cursor
+        (or repainting) step by step
+
+        @arg QTextCursor cursor cursor being used
+        @arg MoveCommand command the motion
+        @arg int count the number of times the movement is applied
+
+        @ret tuple (start, end, isLine) the offsets of the range (end is exclusive) and
+            whether or not it is made up of whole lines
+
+        '''
+
+        target = QTextCursor(cursor)
+        target.clearSelection()
+
+        forwardWord = command.operation in (self.nextWord, self.nextBigWord)
+
+        #cw changes up to the end of the word (like ce), leaving the white space alone
+        if self.state.mode == self.CHANGE_MODE and forwardWord:
+            end = self.getWordIndex().nextEnd(cursor.position(), count,
+                command.operation == self.nextBigWord, True)
+
+            return cursor.position(), min(end + 1,
+                cursor.document().characterCount() - 1), False
+
+        self.moveCursor(target, command, QTextCursor.MoveAnchor, count)
+
+        #dw at the last word of a line stops at the end of the line instead of
+        #taking the line break and the next line's indentation with it
+        if forwardWord and target.blockNumber() > cursor.blockNumber() and \
+                not target.block().text()[:target.positionInBlock()].strip():
+            previous = target.block().previous()
+            target.setPosition(max(cursor.position(),
+                previous.position() + previous.length() - 1))
+
+        start, end = sorted((cursor.position(), target.position()))
+
+        if command.linewise:
+            document = cursor.document()
+            last = document.findBlock(end)
+
+            return (document.findBlock(start).position(),
+                last.position() + last.length() - 1, True)
+
+        if command.inclusive:
+            end = min(end + 1, cursor.document().characterCount() - 1)
+
+        return start, end, False
+
+    def applyOperator(self, command, count=1):
+        ''' Deletes/yanks/changes the text a motion moves over as a single edit
+
+        @arg MoveCommand command the motion
+        @arg int count the number of times the movement is applied
+
+        @ret bool success True if the operator was applied successfully
+
+        '''
+
+        try:
+            cursor = self.getCursor()
+            start, end, isLine = self.motionRange(cursor, command, count)
+
+        except Exception:
+            logger.warning('Error while computing range: {}'.format(stackTrace()))
+            return False
+
+        return self.operateRange(cursor, start, end, isLine,
+            self.state.mode in (self.DELETE_MODE, self.CHANGE_MODE))
+
+    # ==============================================================================
+    # MACROS
+    # ==============================================================================
+
+    def recordMacro(self, command, count=1, register=None):
+        ''' Starts recording the keys typed into a register (qa), or stops the
+        recording (q)
+
+        @arg ArgumentCommand command the compiled command that was triggered
+        @arg int count unused
+        @arg str register the register the macro is recorded into
+
+        @ret bool success True if the recording was started or stopped
+
+        '''
+
+        if self.recording is not None:
+            self.macros[self.recordingRegister] = self.recording
+            self.recording = None
+            self.showStatus('')
+            return True
+
+        if register is None:
+            return self.awaitArgument(command, count)
+
+        self.recording = []
+        self.recordingRegister = register
+        self.showStatus('recording @{}'.format(register))
+
+        return True
+
+    def replayMacro(self, command, count=1, register=None):
+        ''' Replays the macro of a register (@a), @@ replays the last one replayed
+
+        @arg ArgumentCommand command the compiled command that was triggered
+        @arg int count the number of times the macro is replayed
+        @arg str register the register of the macro
+
+        @ret bool success True if the macro was replayed successfully
+
+        '''
+
+        if register is None:
+            return self.awaitArgument(command, count)
+
+        if register == '@':
+            register = self.lastMacro
+
+        if register not in self.macros:
+            return False
+
+        self.lastMacro = register
+
+        return self.replay(self.macros[register], count)
+
+    def repeatChange(self, command, count=1):
+        ''' Repeats the last change (.)
+
+        @arg Command command the compiled command that was triggered
+        @arg int count the number of times the change is repeated
+
+        @ret bool success True if the change was repeated successfully
+
+        '''
+
+        if not self.lastChange:
+            return False
+
+        return self.replay(self.lastChange, count)
+
+    def replay(self, entries, count=1):
+        ''' Replays recorded entries on a single cursor and as a single edit, the
+        editor is only repainted (and undo only sees a change) once they are all done
+
+        @arg list entries the recorded entries
+        @arg int count the number of times the entries are replayed
+
+        @ret bool success True if every entry was replayed successfully
+
+        '''
+
+        if self.replayDepth >= MAX_REPLAY_DEPTH:
+            logger.warning('Replay depth exceeded')
+            return False
+
+        outermost = self.replayCursor is None
+        if outermost:
+            self.replayCursor = self.editor.textCursor()
+            self.editor.setUpdatesEnabled(False)
+            self.replayCursor.beginEditBlock()
+
+        self.replayDepth += 1
+        success = True
+
+        try:
+            for _ in range(count):
+                for entry in entries:
+                    if self.replayEntry(entry) is False:
+                        success = False
+                        break
+
+                if not success:
+                    break
+
+        except Exception:
+            logger.warning('Error while replaying: {}'.format(stackTrace()))
+            success = False
+
+        finally:
+            self.replayDepth -= 1
+
+            if outermost:
+                cursor = self.replayCursor
+                self.replayCursor = None
+                cursor.endEditBlock()
+                self.editor.setUpdatesEnabled(True)
+                self.editor.setTextCursor(cursor)
+
+        return success
+
+    def replayEntry(self, entry):
+        ''' Replays one recorded entry
+
+        @arg tuple entry (kind, ...) a command, an inserted key or a search key
+
+        @ret bool success False if the entry failed, which stops the replay
+
+        '''
+
+        kind, first, second, third = entry
+
+        if kind == COMMAND_ENTRY:
+            return self.runCommand(first, second, third)
+
+        if kind == SEARCH_ENTRY:
+            return self.searchDocument(first, second)
+
+        if kind == COMMAND_LINE_ENTRY:
+            return self.commandLineKey(first, second)
+
+        if kind == INSERT_ENTRY:
+            self.insertKey(first, second)
+
+        return True
+
+    def insertKey(self, key, text):
+        ''' Types a key recorded in insert mode on the replay cursor
+
+        @arg int key the integer value of the key
+        @arg str text the text of the key
+
+        '''
+
+        cursor = self.getCursor()
+
+        if key == Qt.Key_Backspace:
+            cursor.deletePreviousChar()
+
+        elif key == Qt.Key_Delete:
+            cursor.deleteChar()
+
+        elif key in (Qt.Key_Return, Qt.Key_Enter):
+            cursor.insertBlock()
+
+        elif key in INSERT_MOVES:
+            cursor.movePosition(INSERT_MOVES[key])
+
+        elif text:
+            cursor.insertText(text)
+
+    # ==============================================================================
+    # COMPLETION
+    # ==============================================================================
+
+    def complete(self, forward=True):
+        ''' Completes the keyword before the cursor with the keywords of the open
+        buffers (Ctrl-N/Ctrl-P), pressing it again cycles through them and back to
+        what was typed
+
+        @arg bool forward True for the next keyword (Ctrl-N), False for the previous
+            one (Ctrl-P)
+
+        @ret bool success False if there is nothing to complete
+
+        '''
+
+        state = self.state
+        cursor = self.getCursor()
+        position = cursor.position()
+
+        #the completion being cycled through, a new one unless the cursor is still
+        #at the end of the last one
+        completion = state.completion
+        if completion is None or completion.end != position:
+            block = cursor.block()
+            match = KEYWORD_PREFIX.search(block.text()[:position - block.position()])
+            if match is None:
+                return False
+
+            prefix = match.group()
+            candidates = self.completions(prefix)
+            if not candidates:
+                self.showStatus('No completion for {0}'.format(prefix))
+                return False
+
+            completion = state.completion = Completion(position, prefix, candidates)
+
+        start, end = completion.start, completion.end
+        prefix, candidates = completion.prefix, completion.candidates
+        index = (completion.index + (1 if forward else -1)) % (len(candidates) + 1)
+
+        suffix = candidates[index][len(prefix):] if index < len(candidates) else ''
+
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        cursor.insertText(suffix)
+        self.setCursor(cursor)
+
+        completion.index = index
+        completion.end = cursor.position()
+
+        #recorded as the keys typing it, for . and the macros
+        for _ in range(end - start):
+            self.recordEntry((INSERT_ENTRY, Qt.Key_Backspace, '', None))
+
+        if suffix:
+            self.recordEntry((INSERT_ENTRY, None, suffix, None))
+
+        if index < len(candidates):
+            self.showStatus('match {0} of {1}'.format(index + 1, len(candidates)))
+        else:
+            self.showStatus('back at original')
+
+        return True
+
+    def completions(self, prefix):
+        ''' Gets the keywords of the open buffers starting with the prefix
+
+        @arg str prefix the start of the keyword
+
+        @ret list words the current buffer's keywords, then the other buffers' ones
+            that aren't in it, alphabetically
+
+        '''
+
+        words = []
+        seen = set()
+
+        editors = [self.editor] + [editor for editor in list(self.states.keys())
+            if editor is not self.editor]
+
+        for editor in editors:
+            index = self.states[editor].completionIndex
+            index.attach(editor.document())
+
+            for word in index.complete(prefix):
+                if word not in seen:
+                    seen.add(word)
+                    words.append(word)
+
+        return words
+
+    # ==============================================================================
+    # MARKS
+    # ==============================================================================
+
+    def getMarks(self):
+        ''' @ret MarkIndex marks the marks and jumplist of the current editor '''
+
+        marks = self.state.marks
+        document = self.editor.document()
+
+        if marks.document is not document:
+            marks.attach(document)
+            self.restoreMarks(marks)
+
+        return marks
+
+    def restoreMarks(self, marks):
+        ''' Sets the marks the previous session left in the current editor's file
+
+        @arg MarkIndex marks the marks of the editor, just attached to its document
+
+        '''
+
+        self.ensureSession()
+
+        path = getattr(self.editor, 'ID', None)
+        if self.session is None or not path:
+            return
+
+        document = marks.document
+        for key, (line, column) in self.session.fileMarks(path).items():
+            block = document.findBlockByNumber(line)
+
+            #the file may have been edited outside of the IDE since
+            if block.isValid():
+                marks.set(key, block.position() + min(column, block.length() - 1))
+
+    def sessionMarks(self):
+        ''' @ret dict marks the path -> {mark: (line, column)} of the open files whose
+            marks were used, the jumplist left out
+
+        '''
+
+        marks = {}
+
+        for editor, state in list(self.states.items()):
+            path = getattr(editor, 'ID', None)
+            document = state.marks.document
+            if not path or document is None:
+                continue
+
+            fileMarks = {}
+            for key, position in state.marks.marks.items():
+                if isinstance(key, tuple):
+                    continue
+
+                block = document.findBlock(position)
+                fileMarks[key] = (block.blockNumber(), position - block.position())
+
+            marks[path] = fileMarks
+
+        return marks
+
+    def recordJump(self, position):
+        ''' Adds the position a jump leaves from to the jumplist and makes it the
+        context mark ('')
+
+        @arg int position the document offset jumped from
+
+        '''
+
+        marks = self.getMarks()
+        marks.pushJump(position)
+        marks.set(CONTEXT_MARK, position)
+
+    def setMark(self, command, count=1, mark=None):
+        ''' Sets the mark at the cursor (ma)
+
+        @arg ArgumentCommand command the compiled command that was triggered
+        @arg int count unused
+        @arg str mark the name of the mark
+
+        @ret bool success always True
+
+        '''
+
+        if mark is None:
+            return self.awaitArgument(command, count)
+
+        self.getMarks().set(mark, self.getCursor().position())
+
+        return True
+
+    def jumpToMark(self, command, count=1, mark=None):
+        ''' Jumps to the first non blank of the mark's line ('a) or to the mark itself
+        (`a), '' and `` going back to where the latest jump left from. After an
+        operator the text up to the mark is deleted/yanked/changed (ex: d'a, y`a).
+
+        @arg MarkCommand command the compiled command that was triggered
+        @arg int count unused
+        @arg str mark the name of the mark
+
+        @ret bool success False if the mark isn't set
+
+        '''
+
+        if mark is None:
+            return self.awaitArgument(command, count)
+
+        position = self.getMarks().get(CONTEXT_MARK if mark == '`' else mark)
+        if position is None:
+            self.showStatus('Mark not set: {0}'.format(mark))
+            return False
+
+        cursor = self.getCursor()
+        document = cursor.document()
+        position = min(position, document.characterCount() - 1)
+
+        if command.linewise:
+            block = document.findBlock(position)
+            text = block.text()
+            position = block.position() + len(text) - len(text.lstrip())
+
+        if self.state.mode in self.OPERATOR_MODES:
+            start, end = sorted((cursor.position(), position))
+
+            if command.linewise:
+                last = document.findBlock(end)
+                start = document.findBlock(start).position()
+                end = last.position() + last.length() - 1
+
+            return self.operateRange(cursor, start, end, command.linewise,
+                self.state.mode in (self.DELETE_MODE, self.CHANGE_MODE))
+
+        self.recordJump(cursor.position())
+        self.setCursorPosition(position)
+
+        return True
+
+    def jumpBack(self, command, count=1):
+        ''' Goes back to an older position of the jumplist (Ctrl-O)
+
+        @arg Command command the compiled command that was triggered
+        @arg int count the number of entries to go back
+
+        @ret bool success False if there is no older entry
+
+        '''
+
+        return self.walkJumplist(-count)
+
+    def jumpForward(self, command, count=1):
+        ''' Goes forward to a newer position of the jumplist (Ctrl-I) '''
+
+        return self.walkJumplist(count)
+
+    def walkJumplist(self, count):
+        ''' Moves to the entry of the jumplist count entries away from the current one
+
+        @arg int count negative to go back, positive to go forward
+
+        @ret bool success False if there is no such entry
+
+        '''
+
+        position = self.getMarks().jump(self.getCursor().position(), count)
+        if position is None:
+            return False
+
+        self.setCursorPosition(min(position, self.editor.document().characterCount() - 1))
+
+        return True
+
+    # ==============================================================================
+    # COMMAND LINE
+    # ==============================================================================
+
+    def startCommandLine(self, command, count=1):
+        ''' Opens the : command line
+
+        @arg Command command the compiled command that was triggered
+        @arg int count unused
+
+        @ret bool success always True
+
+        '''
+
+        self.state.commandLine = ''
+        self.showStatus(':')
+
+        return True
+
+    def commandLineKey(self, key, text=''):
+        ''' Adds the key to the command line, Enter runs it and Esc closes it
+
+        @arg int key the integer value of the key that was just pressed
+        @arg str text the text of the key that was just pressed
+
+        @ret bool success False if the command that was run failed
+
+        '''
+
+        if key in (Qt.Key_Enter, Qt.Key_Return):
+            line = self.state.commandLine
+            self.state.commandLine = None
+            return self.runExCommand(line)
+
+        if key == Qt.Key_Escape or \
+                (key == Qt.Key_Backspace and not self.state.commandLine):
+            self.state.commandLine = None
+            self.showStatus('')
+            return True
+
+        if key == Qt.Key_Backspace:
+            self.state.commandLine = self.state.commandLine[:-1]
+
+        elif text:
+            self.state.commandLine += text
+
+        self.showStatus(':' + self.state.commandLine)
+
+        return True
+
+    def runExCommand(self, line):
+        ''' Runs a command typed on the command line, along with its range (ex:
+        VimjaStats dump, %s/a/b/g, 3,7d, 42)
+
+        @arg str line the command line, without the :
+
+        @ret bool success True if the command ran successfully
+
+        '''
+
+        try:
+            document = self.editor.document()
+            lines, rest = parseRange(line, self.getCursor().blockNumber(),
+                document.blockCount() - 1)
+            name, argument = parseName(rest)
+
+        except ValueError as e:
+            self.showStatus(str(e))
+            return False
+
+        #a bare line number jumps to that line
+        if not name and not argument:
+            if lines is not None:
+                self.recordJump(self.getCursor().position())
+                self.setCursorPosition(document.findBlockByNumber(lines[1]).position())
+
+            return True
+
+        handler = self.exCommands.get(name)
+
+        if handler is None:
+            self.showStatus('Not an editor command: {0}'.format(rest.strip()))
+            return False
+
+        try:
+            return handler(argument, lines)
+
+        except ValueError as e:
+            self.showStatus(str(e))
+            return False
+
+        except Exception:
+            logger.warning('Error while running :{0} - trace:\n{1}'.format(line,
+                stackTrace()))
+            return False
+
+    def releaseIndices(self):
+        ''' Drops the word, bracket and match indices ahead of an edit touching a lot
+        of lines, so that they are rebuilt once instead of being updated per line
+
+        @ret SRE_Pattern pattern the pattern of the match index, to be rebuilt once
+            the edit is done (see rebuildIndices), or None
+
+        '''
+
+        state = self.state
+        state.wordIndex.detach()
+        state.bracketIndex.detach()
+        state.completionIndex.detach()
+
+        pattern = state.matchIndex.pattern
+        if pattern is not None:
+            state.matchIndex.clear()
+
+        return pattern
+
+    def rebuildIndices(self, pattern):
+        ''' Rebuilds the match index released by releaseIndices, if there was one '''
+
+        if pattern is not None:
+            self.state.matchIndex.build(self.editor.document(), pattern)
+
+    def exPattern(self, pattern, ignoreCase=False):
+        ''' Compiles the pattern of :s or :g, the last search's when it's empty
+
+        @arg str pattern the regular expression typed
+        @arg bool ignoreCase True to match regardless of the case
+
+        @ret SRE_Pattern pattern the compiled regular expression
+
+        '''
+
+        if not pattern:
+            pattern = self.state.regexString
+
+            if not pattern:
+                raise ValueError('No previous regular expression')
+
+        try:
+            return re.compile(pattern, re.UNICODE | (re.IGNORECASE if ignoreCase else 0))
+
+        except re.error as e:
+            raise ValueError('Invalid pattern: {0}'.format(e))
+
+    def substitute(self, argument, lines=None):
+        ''' :[range]s/pattern/replacement/[flags], replaces the first match of every
+        line of the range (the current line by default), all of them with the g flag,
+        ignoring the case with the i flag. No match is an error unless the e flag is
+        given.
+
+        The lines are streamed one block at a time within a single edit block (one
+        undo step), only the lines that changed are rewritten.
+
+        @arg str argument /pattern/replacement/flags
+        @arg tuple lines the (first, last) line numbers of the range or None
+
+        @ret bool success True if anything was replaced (or the e flag was given)
+
+        '''
+
+        pattern, replacement, flags = splitDelimited(argument, 2)
+        regex = self.exPattern(pattern, 'i' in flags)
+        template = replacementTemplate(replacement)
+        count = 0 if 'g' in flags else 1
+
+        cursor = self.getCursor()
+        document = cursor.document()
+        first, last = lines if lines is not None else (cursor.blockNumber(),) * 2
+
+        substitutions = 0
+        changedLines = 0
+        lastChanged = None
+
+        searchPattern = self.releaseIndices()
+        cursor.beginEditBlock()
+
+        try:
+            block = document.findBlockByNumber(first)
+            for number in range(first, last + 1):
+                following = block.next()
+                text = block.text()
+                replaced, found = regex.subn(template, text, count)
+
+                if found:
+                    if replaced != text:
+                        cursor.setPosition(block.position())
+                        cursor.setPosition(block.position() + block.length() - 1,
+                            QTextCursor.KeepAnchor)
+                        cursor.insertText(replaced)
+
+                    substitutions += found
+                    changedLines += 1
+                    lastChanged = block
+
+                block = following
+
+        finally:
+            cursor.endEditBlock()
+            self.rebuildIndices(searchPattern)
+
+        if lastChanged is None:
+            self.showStatus('Pattern not found: {0}'.format(regex.pattern))
+            return 'e' in flags
+
+        #the cursor ends on the first non blank of the last line changed
+        text = lastChanged.text()
+        self.setCursorPosition(lastChanged.position() + len(text) - len(text.lstrip()))
+        self.showStatus('{0} substitutions on {1} lines'.format(substitutions,
+            changedLines))
+
+        return True
+
+    def globalCommand(self, argument, lines=None, invert=False):
+        ''' :[range]g/pattern/d, deletes every line of the range (the whole file by
+        default) matching the pattern, :g!/pattern/d and :v/pattern/d the ones that
+        don't match it. The last line deleted goes to the registers.
+
+        @arg str argument /pattern/command, d being the only command supported
+        @arg tuple lines the (first, last) line numbers of the range or None
+        @arg bool invert True to delete the lines that don't match
+
+        @ret bool success True if any line was deleted
+
+        '''
+
+        pattern, command = splitDelimited(argument, 1)
+        if command.strip() not in ('d', 'delete'):
+            raise ValueError('Only :g/pattern/d is supported')
+
+        regex = self.exPattern(pattern)
+
+        cursor = self.getCursor()
+        document = cursor.document()
+        first, last = lines if lines is not None else (0, document.blockCount() - 1)
+
+        deleted = 0
+        deletedText = None
+        deletedAt = first
+
+        searchPattern = self.releaseIndices()
+        cursor.beginEditBlock()
+
+        try:
+            number = first
+            block = document.findBlockByNumber(first)
+            for _ in range(first, last + 1):
+                following = block.next()
+                text = block.text()
+
+                if (regex.search(text) is None) == invert:
+                    self.removeBlock(cursor, block)
+                    deleted += 1
+                    deletedText = text
+                    deletedAt = number
+
+                else:
+                    number += 1
+
+                block = following
+
+        finally:
+            cursor.endEditBlock()
+            self.rebuildIndices(searchPattern)
+
+        if deletedText is None:
+            self.showStatus('Pattern not found: {0}'.format(regex.pattern))
+            return False
+
+        self.registers.delete(deletedText, True, self.takeRegister())
+
+        #the cursor ends where the last line was deleted
+        block = document.findBlockByNumber(min(deletedAt, document.blockCount() - 1))
+        self.setCursorPosition(block.position())
+        self.showStatus('{0} fewer lines'.format(deleted))
+
+        return True
+
+    def vglobalCommand(self, argument, lines=None):
+        ''' :[range]v/pattern/d, deletes the lines that don't match the pattern '''
+
+        return self.globalCommand(argument, lines, True)
+
+    def removeBlock(self, cursor, block):
+        ''' Removes a line along with its line break (the one before it for the last
+        line of the document)
+
+        @arg QTextCursor cursor cursor being used
+        @arg QTextBlock block the line to remove
+
+        '''
+
+        start = block.position()
+        end = start + block.length() - 1
+
+        if block.next().isValid():
+            end += 1
+
+        elif start > 0:
+            start -= 1
+
+        cursor.setPosition(start)
+        cursor.setPosition(end, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
+
+    def deleteLines(self, argument, lines=None):
+        ''' :[range]d [x], cuts the lines of the range (the current line by default)
+        to the register x or the unnamed one
+
+        @arg str argument the register, if any
+        @arg tuple lines the (first, last) line numbers of the range or None
+
+        @ret bool success True if the lines were cut
+
+        '''
+
+        cursor = self.getCursor()
+        document = cursor.document()
+        first, last = lines if lines is not None else (cursor.blockNumber(),) * 2
+
+        if argument:
+            self.state.register = argument[0]
+
+        end = document.findBlockByNumber(last)
+
+        return self.operateRange(cursor, document.findBlockByNumber(first).position(),
+            end.position() + end.length() - 1, True, True)
+
+    # ==============================================================================
+    # STATS
+    # ==============================================================================
+
+    def vimjaStats(self, argument='', lines=None):
+        ''' :VimjaStats [on|off|reset|dump [path]|profile command [N]], shows the
+        slowest commands when no argument is given (the full report goes to the log)
+
+        @arg str argument the sub command and its arguments
+        @arg tuple lines unused
+
+        @ret bool success True if the sub command was successful
+
+        '''
+
+        words = argument.split()
+        action = words[0] if words else ''
+
+        if action in ('on', 'reset') or (action == 'profile' and self.stats is None):
+            self.stats = Stats()
+
+        elif action == 'off':
+            self.stats = None
+
+        if action in ('on', 'off', 'reset'):
+            self.showStatus('VimjaStats {0}'.format(action))
+            return True
+
+        if self.stats is None:
+            self.showStatus('VimjaStats are off (:VimjaStats on)')
+            return False
+
+        if action == 'dump':
+            path = words[1] if len(words) > 1 else os.path.join(PATH, '..', STATS_FILE)
+            self.stats.dump(path)
+            self.showStatus('VimjaStats written to {0}'.format(path))
+
+        elif action == 'profile':
+            if len(words) < 2:
+                self.showStatus('Usage: VimjaStats profile command [N]')
+                return False
+
+            invocations = int(words[2]) if len(words) > 2 else PROFILE_INVOCATIONS
+            self.stats.profile(words[1], invocations, self.profileFinished)
+            self.showStatus('Profiling the next {0} {1}'.format(invocations, words[1]))
+
+        elif not action:
+            for line in self.stats.report():
+                logger.info('stats: %s', line)
+
+            self.showStatus(' | '.join(self.stats.report(3)))
+
+        else:
+            self.showStatus('Unknown VimjaStats action: {0}'.format(action))
+            return False
+
+        return True
+
+    def profileFinished(self, name, profile):
+        ''' Writes out the profile of a command once all its invocations were made
+
+        @arg str name the command's name
+        @arg cProfile.Profile profile the profile
+
+        '''
+
+        fileName = PROFILE_FILE.format(''.join(char if char.isalnum() else '_'
+            for char in name))
+        path = os.path.join(PATH, '..', fileName)
+        profile.dump_stats(path)
+
+        report = StringIO()
+        pstats.Stats(profile, stream=report).sort_stats('cumulative').print_stats(20)
+        logger.info('profile of %s (%s):\n%s', name, path, report.getvalue())
+
+        self.showStatus('Profile of {0} written to {1}'.format(name, path))
+
+# ==============================================================================
+# USELESS
+# ==============================================================================
+
+    def finish(self):
+        # Shutdown your plugin
+        logger.info('Shutting down Vimja\n')
+
+        if self.keyMapWatcher is not None:
+            self.keyMapWatcher.stop()
+
+        self.saveSession()
+        self.detachEditors()
+
+        #write out whatever is left in the log's ring buffer
+        self.dumpLog()
+        logListener.stop()
+
+    def saveSession(self):
+        ''' Writes the registers, marks and searches for the next session, in the
+        background. Nothing is written unless the previous session was read, which
+        would otherwise be lost.
+
+        @ret Thread thread the thread writing the session, None if there is none
+
+        '''
+
+        if self.session is None:
+            return None
+
+        def failed(error):
+            logger.warning('The session could not be written: %s', error)
+
+        return self.session.save(self.registers.entries(), self.sessionMarks(),
+            self.searchHistory, failed)
+
+    def dumpLog(self):
+        ''' Writes the log records kept in memory to the log file, the write itself
+        happens on the logging thread
+
+        '''
+
+        logListener.call(logRing.dump)
 
     def get_preferences_widget(self):
         # Return a widget for customize your plugin
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+''' Vim's word boundaries, indexed per block of a QTextDocument.
+
+A word is either a run of keyword characters (letters, digits and _) or a run of
+other non blank characters, a WORD is a run of non blank characters and an empty
+line counts as a word too. The start and end offsets of both are computed once per
+block and kept until the block changes (its revision moves or an edit touches it),
+so a counted motion (ex: 500w) is a bisect per block instead of a cursor step per
+word.
+
+'''
+
+import re
+
+from bisect import bisect_left
+from bisect import bisect_right
+
+WORD = re.compile(r'\w+|[^\w\s]+', re.UNICODE)
+BIG_WORD = re.compile(r'\S+', re.UNICODE)
+
+
+def wordSpans(pattern, text):
+    ''' @ret tuple (starts, ends) the offsets of the first and last characters of the
+        words of the text, an empty text being a word without an end '''
+
+    if not text:
+        return [0], []
+
+    starts = []
+    ends = []
+    for match in pattern.finditer(text):
+        starts.append(match.start())
+        ends.append(match.end() - 1)
+
+    return starts, ends
+
+
+class WordIndex(object):
+    ''' Word boundaries of the blocks of a document. '''
+
+    def __init__(self):
+        self.document = None
+
+        #(revision, words, bigWords) of each block, None until it is needed
+        self.blocks = []
+
+    def attach(self, document):
+        ''' Indexes the given document from now on
+
+        @arg QTextDocument document the document to be indexed
+
+        '''
+
+        if document is self.document:
+            return
+
+        self.detach()
+
+        self.document = document
+        self.blocks = [None] * document.blockCount()
+        document.contentsChange.connect(self.documentChanged)
+
+    def detach(self):
+        ''' Stops following the document and drops its index (ex: ahead of an edit
+        touching most of its lines, the next lookup indexes it again)
+
+        '''
+
+        if self.document is not None:
+            try:
+                self.document.contentsChange.disconnect(self.documentChanged)
+
+            except (TypeError, RuntimeError):
+                pass
+
+        self.document = None
+        self.blocks = []
+
+    def documentChanged(self, position, removed, added):
+        ''' Keeps the entries aligned with the blocks, dropping the edited ones '''
+
+        document = self.document
+        first = document.findBlock(position).blockNumber()
+
+        #lines added or removed by the edit are right after the edited block
+        delta = document.blockCount() - len(self.blocks)
+        if delta > 0:
+            self.blocks[first + 1:first + 1] = [None] * delta
+
+        elif delta < 0:
+            del self.blocks[first + 1:first + 1 - delta]
+
+        end = min(position + added, document.characterCount() - 1)
+        last = document.findBlock(end).blockNumber()
+        self.blocks[first:last + 1] = [None] * (last + 1 - first)
+
+    def spans(self, block, big=False):
+        ''' Gets the word boundaries of a block, indexing it if needed
+
+        @arg QTextBlock block the block
+        @arg bool big True for WORDs, False for words
+
+        @ret tuple (starts, ends) the sorted offsets within the block
+
+        '''
+
+        number = block.blockNumber()
+        if number >= len(self.blocks):
+            self.blocks.extend([None] * (number + 1 - len(self.blocks)))
+
+        entry = self.blocks[number]
+        revision = block.revision()
+
+        if entry is None or entry[0] != revision:
+            text = block.text()
+            entry = (revision, wordSpans(WORD, text), wordSpans(BIG_WORD, text))
+            self.blocks[number] = entry
+
+        return entry[2] if big else entry[1]
+
+    def nextStart(self, position, count=1, big=False):
+        ''' @ret int position the start of the count'th word after the position (w),
+            the end of the document if there are not that many '''
+
+        return self.forward(position, count, big, 0)
+
+    def nextEnd(self, position, count=1, big=False, current=False):
+        ''' @ret int position the last character of the count'th word ending after
+            the position (e), or at it when current is True (the end of the word the
+            position is in), the end of the document if there are not that many '''
+
+        return self.forward(position, count, big, 1, current)
+
+    def forward(self, position, count, big, side, current=False):
+        ''' Steps over the starts (side 0) or the ends (side 1) after the position '''
+
+        block = self.document.findBlock(position)
+        offset = position - block.position() - (1 if current else 0)
+
+        while block.isValid():
+            offsets = self.spans(block, big)[side]
+            index = bisect_right(offsets, offset)
+
+            if count <= len(offsets) - index:
+                return block.position() + offsets[index + count - 1]
+
+            count -= len(offsets) - index
+            block = block.next()
+            offset = -1
+
+        return self.document.characterCount() - 1
+
+    def previousStart(self, position, count=1, big=False):
+        ''' @ret int position the start of the count'th word before the position (b),
+            the start of the document if there are not that many '''
+
+        block = self.document.findBlock(position)
+        offset = position - block.position()
+
+        while block.isValid():
+            starts = self.spans(block, big)[0]
+            index = bisect_left(starts, offset)
+
+            if count <= index:
+                return block.position() + starts[index - count]
+
+            count -= index
+            block = block.previous()
+            offset = block.length()
+
+        return 0